@@ -1,8 +1,10 @@
-from typing import List
+from typing import List, Optional
+import asyncpg
 from fastapi import APIRouter, HTTPException, Depends, Query
 from core.config import settings
-from schemas.customers_scrapper import CustomerwithInvoices, DataPSB
+from schemas.customers_scrapper import CustomerwithInvoices, DataPSB, FiberSearchResponse
 from services.biling_scaper import BillingScraper, NOCScrapper
+from services.data_fiber import DataFiberRepository, get_fiber_repository
 
 router = APIRouter()
 
@@ -38,4 +40,27 @@ def get_fast_customer_details(
             invoice_payload = billing_scraper.get_invoice_data(detail_url)
             customer.update(invoice_payload)
             customer["detail_url"] = detail_url
-    return customers
\ No newline at end of file
+    return customers
+
+# Endpoint search data_fiber (imported from the fiber workbook)
+@router.get("/fiber", response_model=FiberSearchResponse)
+async def search_fiber_customers(
+    olt: Optional[str] = Query(None, description="OLT name, e.g. BEJI"),
+    port: Optional[str] = Query(None, description="OLT port as stored, e.g. 1/1/1"),
+    sn: Optional[str] = Query(None, description="Exact ONU serial number"),
+    name: Optional[str] = Query(None, min_length=2),
+    address: Optional[str] = Query(None, min_length=2),
+    fuzzy: bool = Query(False, description="Trigram similarity instead of substring match for name/address"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(50, ge=1, le=200),
+    repo: DataFiberRepository = Depends(get_fiber_repository),
+):
+    try:
+        items, next_cursor = await repo.search(
+            olt_name=olt, olt_port=port, onu_sn=sn, name=name, alamat=address,
+            fuzzy=fuzzy, after=cursor, limit=limit,
+        )
+    except asyncpg.UndefinedFunctionError:
+        raise HTTPException(status_code=501, detail="Fuzzy search needs the pg_trgm extension on the database")
+    return {"items": items, "count": len(items), "next_cursor": next_cursor}
+
@@ -1,26 +1,71 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from services.exceltopostgress import ExcelHandler
+import shutil
+import tempfile
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query
+from services.exceltopostgress import ExcelHandler, import_jobs
 
 router = APIRouter()
 
 # Handle ExceltoDatabases
 @router.post("/exceltodb")
-def upload_excel(file: UploadFile = File(...)):
+def upload_excel(
+    file: UploadFile = File(...),
+    bulk: bool = Query(False, description="COPY into a staging table and merge in one statement"),
+    force: bool = Query(False, description="Re-import every sheet and row, ignoring change detection"),
+):
     """
     Upload an Excel file (.xlsx) to sync fiber customer data.
+    Unchanged sheets are skipped and only changed rows are written; the
+    response lists new customers, moved ports and SN swaps.
     """
     if not file.filename.endswith(('.xls', '.xlsx')):
         raise HTTPException(status_code=400, detail="Invalid file type. Please upload .xlsx or .xls")
 
     try:
         # Pass the file-like object directly to pandas
-        total_rows = ExcelHandler.process_file(file.file)
+        stats = ExcelHandler.process_file(file.file, bulk=bulk, force=force)
         
         return {
             "status": "success",
             "filename": file.filename,
-            "rows_processed": total_rows,
+            **stats,
             "message": "Data upserted successfully"
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Processing error: {str(e)}")
+
+
+@router.post("/exceltodb/stream", status_code=202)
+def upload_excel_stream(
+    file: UploadFile = File(...),
+    bulk: bool = Query(False, description="COPY into a staging table and merge in one statement"),
+):
+    """
+    Start a memory-bounded import of a large .xlsx in a worker process.
+    Poll /exceltodb/jobs/{job_id} for progress.
+    """
+    if not file.filename.endswith('.xlsx'):
+        raise HTTPException(status_code=400, detail="Invalid file type. Streaming import supports .xlsx only")
+
+    try:
+        # The worker process reads from disk, not from the request's spooled file
+        with tempfile.NamedTemporaryFile(delete=False, suffix=".xlsx") as tmp:
+            shutil.copyfileobj(file.file, tmp)
+        job_id = import_jobs.submit(tmp.name, bulk=bulk, filename=file.filename)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Could not start import: {str(e)}")
+
+    return {
+        "status": "accepted",
+        "filename": file.filename,
+        "job_id": job_id,
+    }
+
+
+@router.get("/exceltodb/jobs/{job_id}")
+def get_import_job(job_id: str):
+    """Progress of a streaming import: current sheet, rows read and written."""
+    job = import_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Import job '{job_id}' not found")
+    return job
+
@@ -1,14 +1,23 @@
-from fastapi import APIRouter, HTTPException, Depends
-from fastapi.responses import PlainTextResponse
+from fastapi import APIRouter, HTTPException, Depends, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import PlainTextResponse, Response
+from typing import List, Optional
 import re
+import time
 import asyncio
 from core.config import settings
 from schemas.onu_handler import (
     OnuDetailRequest, OnuDetailResponse, OnuFullResponse
 )
 
-from services.telnet import TelnetClient
-from services.connection_manager import olt_manager
+from services.connection_manager import olt_manager, CircuitOpenError
+from services.rate_limit import OltBusyError, CHEAP_SHOW, EXPENSIVE_SHOW, CONFIG
+from services.data_fiber import DataFiberRepository, get_fiber_repository
+from services.reconciliation import reconciliation_manager
+from services.pon_survey import dba_survey
+from services.optical_power import rx_collector
+from services.rx_analytics import analyze_rx
+from services.outage import outage_engine
+from services.olt_events import olt_events, onu_matches
 from core.olt_config import OLT_OPTIONS
 
 router = APIRouter()
@@ -32,6 +41,16 @@ async def cek_onu(olt_name: str, request: OnuDetailRequest):
     if not olt_info:
         raise HTTPException(status_code=404, detail=f"OLT {olt_name} tidak ditemukan!")
     
+    # ONU on a port with an open mass outage: answer from the incident, no OLT query
+    incident = outage_engine.incident_for(target_olt, request.interface)
+    if incident:
+        onu = incident["affected"][re.search(r"\d+/\d+/\d+:\d+", request.interface).group(0)]
+        return OnuFullResponse(
+            detail_data=f"Gangguan massal di {target_olt} {incident['port']} sejak {incident['opened_at']:%Y-%m-%d %H:%M:%S} UTC, penyebab ONU: {onu['cause']}",
+            attenuation_data="N/A",
+            incident={k: v for k, v in incident.items() if k != "affected"} | {"onu": onu},
+        )
+
     try:
         handler = await olt_manager.get_connection(
             host=olt_info["ip"],
@@ -40,13 +59,20 @@ async def cek_onu(olt_name: str, request: OnuDetailRequest):
             is_c600=olt_info["c600"]
         )
             
-        detail_data = await handler.get_onu_detail(request.interface)
-        attenuation = await handler.get_attenuation(request.interface)
+        # Shared with the outage poller, rx collector and catalog refresher
+        async with handler.session(CHEAP_SHOW):
+            detail_data = await handler.get_onu_detail(request.interface)
+            attenuation = await handler.get_attenuation(request.interface)
         
         return OnuFullResponse(
             detail_data=detail_data,
             attenuation_data=attenuation)
     
+    except CircuitOpenError:
+        raise  # 503 + Retry-After via the app handler
+    
+    except OltBusyError:
+        raise  # 429 + Retry-After via the app handler
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Proses cek gagal: {e}")
     
@@ -63,16 +89,21 @@ async def reboot_onu(olt_name: str, request: OnuDetailRequest = Depends()):
             detail=f"OLT {olt_name} tidak ditemukan!")
     
     try:
-        async with TelnetClient(
-            host = olt_info["ip"],  
+        handler = await olt_manager.get_connection(
+            host=olt_info["ip"],
             username=settings.OLT_USERNAME,
             password=settings.OLT_PASSWORD,
-            is_c600=olt_info["c600"],
-        ) as handler:
+            is_c600=olt_info["c600"]
+        )
+        async with handler.session(CONFIG):
             data = await handler.send_reboot_command(request.interface)
         
         return OnuDetailResponse(result=data)
     
+    except CircuitOpenError:
+        raise  # 503 + Retry-After via the app handler
+    except OltBusyError:
+        raise  # 429 + Retry-After via the app handler
     except (ConnectionError, asyncio.TimeoutError) as e:
         raise HTTPException(status_code=504, detail=f"Gagal terhubung atau timeout: {e}")
     except LookupError as e:
@@ -91,17 +122,27 @@ async def no_onu(olt_name: str, request: OnuDetailRequest = Depends()):
             status_code=404, 
             detail=f"OLT {olt_name} tidak ditemukan!")
     
+    match = re.search(r"(\d+/\d+/\d+):(\d+)", request.interface)
+    if not match:
+        raise HTTPException(status_code=422, detail=f"Format interface tidak valid: {request.interface}")
+    olt_port, onu_id = match.group(1), int(match.group(2))
+
     try:
-        async with TelnetClient(
-            host = olt_info["ip"],  
+        handler = await olt_manager.get_connection(
+            host=olt_info["ip"],
             username=settings.OLT_USERNAME,
             password=settings.OLT_PASSWORD,
-            is_c600=olt_info["c600"],
-        ) as handler:
-            data = await handler.send_no_onu(request.interface)
+            is_c600=olt_info["c600"]
+        )
+        async with handler.session(CONFIG):
+            data = await handler.send_no_onu(olt_port, olt_port, onu_id)
         
         return OnuDetailResponse(result=data)
     
+    except CircuitOpenError:
+        raise  # 503 + Retry-After via the app handler
+    except OltBusyError:
+        raise  # 429 + Retry-After via the app handler
     except (ConnectionError, asyncio.TimeoutError) as e:
         raise HTTPException(status_code=504, detail=f"Gagal terhubung atau timeout: {e}")
     except LookupError as e:
@@ -125,10 +166,16 @@ async def cek_1_port(olt_name: str, request: OnuDetailRequest):
         )
         
         base_interface = _parse_interface(request.interface)
-        data = await handler.get_gpon_onu_state(base_interface)
+        async with handler.session(CHEAP_SHOW):
+            data = await handler.get_gpon_onu_state(base_interface)
 
         return PlainTextResponse(content=data)
 
+    except CircuitOpenError:
+        raise  # 503 + Retry-After via the app handler
+
+    except OltBusyError:
+        raise  # 429 + Retry-After via the app handler
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
@@ -148,9 +195,217 @@ async def cek_1_port_rx(olt_name: str, request: OnuDetailRequest):
         )
         
         base_interface = _parse_interface(request.interface)
-        data = await handler.get_onu_rx(base_interface)
+        async with handler.session(EXPENSIVE_SHOW):
+            data = await handler.get_onu_rx(base_interface)
 
         return PlainTextResponse(content=data)
 
+    except CircuitOpenError:
+        raise  # 503 + Retry-After via the app handler
+
+    except OltBusyError:
+        raise  # 429 + Retry-After via the app handler
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/reconcile", status_code=202)
+async def start_reconciliation(
+    olt: Optional[List[str]] = Query(None, description="OLT names to scan; all OLTs if omitted"),
+    repo: DataFiberRepository = Depends(get_fiber_repository),
+):
+    """
+    Bandingkan data_fiber (workbook) dengan ONU yang benar-benar terdaftar di OLT.
+    Poll /reconcile/{job_id}, lalu unduh /reconcile/{job_id}/report.
+    """
+    unknown = [name for name in (olt or []) if name.upper() not in OLT_OPTIONS]
+    if unknown:
+        raise HTTPException(status_code=404, detail=f"OLT {', '.join(unknown)} tidak ditemukan!")
+
+    job_id = reconciliation_manager.start(repo, olt)
+    return {"status": "accepted", "job_id": job_id}
+
+
+@router.get("/reconcile/{job_id}")
+async def get_reconciliation(job_id: str):
+    job = reconciliation_manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Reconciliation job '{job_id}' not found")
+    return job
+
+
+@router.get("/reconcile/{job_id}/report")
+async def download_reconciliation_report(job_id: str, format: str = Query("csv", pattern="^(csv|json)$")):
+    """Mismatch report: sn_moved, sn_mismatch, ghost_row, unregistered_onu."""
+    report = reconciliation_manager.report(job_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail=f"No report for job '{job_id}' (yet)")
+
+    if format == "json":
+        return report.astype(object).where(report.notna(), None).to_dict(orient="records")
+
+    return Response(
+        content=report.to_csv(index=False),
+        media_type="text/csv",
+        headers={"Content-Disposition": f'attachment; filename="reconciliation_{job_id}.csv"'},
+    )
+
+
+@router.post("/pon/survey", status_code=202)
+async def start_dba_survey(
+    olt: Optional[List[str]] = Query(None, description="OLT names to survey; all OLTs if omitted"),
+    port: Optional[List[str]] = Query(None, description="Ports like 1/1/1; every PON port of the OLT if omitted"),
+):
+    """
+    Survey utilisasi DBA semua port PON secara paralel per OLT.
+    Poll /pon/survey/{job_id}, lalu lihat /pon/utilization.
+    """
+    unknown = [name for name in (olt or []) if name.upper() not in OLT_OPTIONS]
+    if unknown:
+        raise HTTPException(status_code=404, detail=f"OLT {', '.join(unknown)} tidak ditemukan!")
+    olts = [name.upper() for name in olt] if olt else list(OLT_OPTIONS)
+
+    # Without explicit ports every OLT lists its own PON ports from its card layout
+    ports_by_olt = {name: port or None for name in olts}
+    job_id = dba_survey.start(ports_by_olt)
+    return {"status": "accepted", "job_id": job_id}
+
+
+@router.get("/pon/survey/{job_id}")
+async def get_dba_survey(job_id: str):
+    job = dba_survey.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Survey job '{job_id}' not found")
+    return job
+
+
+@router.get("/pon/utilization")
+async def get_pon_utilization(olt: Optional[str] = None):
+    """Tabel utilisasi DBA terbaru per OLT, port tersibuk di atas."""
+    return dba_survey.ranked(olt.upper() if olt else None)
+
+
+@router.get("/pon/utilization/{olt_name}/history")
+async def get_pon_utilization_history(
+    olt_name: str,
+    interface: Optional[str] = None,
+    hours: float = Query(24, gt=0, le=24 * 90),
+):
+    """Time series sampel DBA dari Postgres."""
+    if olt_name.upper() not in OLT_OPTIONS:
+        raise HTTPException(status_code=404, detail=f"OLT {olt_name} tidak ditemukan!")
+    try:
+        return await dba_survey.history(olt_name.upper(), interface, hours)
+    except ConnectionError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+@router.post("/rx/collect")
+async def collect_rx_power(
+    olt: Optional[List[str]] = Query(None, description="OLT names; all OLTs with known ports if omitted"),
+):
+    """Jalankan satu siklus koleksi rx power sekarang (di luar jadwal periodik)."""
+    unknown = [name for name in (olt or []) if name.upper() not in OLT_OPTIONS]
+    if unknown:
+        raise HTTPException(status_code=404, detail=f"OLT {', '.join(unknown)} tidak ditemukan!")
+    try:
+        known = await dba_survey.known_ports()
+    except ConnectionError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    ports_by_olt = {name: ports for name, ports in known.items() if not olt or name in {n.upper() for n in olt}}
+    return await rx_collector.collect(olt_manager, ports_by_olt)
+
+
+@router.get("/rx/status")
+async def get_rx_collector_status():
+    store = rx_collector.store
+    return {
+        "last_cycle": rx_collector.last_cycle,
+        "onus": len(store.keys),
+        "slots": store.slots,
+        "cycles": store.cycles,
+        "buffer_bytes": store.nbytes,
+    }
+
+
+@router.post("/outage/poll")
+async def poll_outages():
+    """Ambil snapshot status ONU semua port sekarang dan diff dengan snapshot sebelumnya."""
+    try:
+        return await outage_engine.poll(olt_manager)
+    except ConnectionError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+@router.get("/outage/incidents")
+async def list_outage_incidents(status: Optional[str] = Query(None, pattern="^(open|resolved)$")):
+    return [
+        {k: v for k, v in incident.items() if k != "affected"} | {"affected_count": len(incident["affected"])}
+        for incident in outage_engine.list_incidents(status)
+    ]
+
+
+@router.get("/outage/incidents/{incident_id}")
+async def get_outage_incident(incident_id: str):
+    """Detail insiden termasuk daftar pelanggan terdampak."""
+    incident = outage_engine.incidents.get(incident_id)
+    if not incident:
+        raise HTTPException(status_code=404, detail=f"Incident '{incident_id}' not found")
+    return {**incident, "affected": list(incident["affected"].values())}
+
+
+@router.get("/events/state")
+async def get_event_state(olt: Optional[str] = None, interface: Optional[str] = None):
+    """Status ONU terakhir yang diketahui dari syslog OLT (tanpa query ke OLT)."""
+    items = [
+        event for (olt_name, onu), event in olt_events.onu_states.items()
+        if (not olt or olt_name == olt.upper()) and (not interface or onu_matches(onu, interface))
+    ]
+    return {"stats": olt_events.stats, "items": items}
+
+
+@router.websocket("/events/ws")
+async def olt_event_stream(websocket: WebSocket):
+    """Push event ONU online/offline/LOS/dying-gasp dari syslog ke client secara realtime."""
+    await websocket.accept()
+    queue = olt_events.subscribe()
+    try:
+        while True:
+            event = await queue.get()
+            await websocket.send_json({**event, "received_at": event["received_at"].isoformat()})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        olt_events.unsubscribe(queue)
+
+
+@router.get("/rx/analytics")
+async def get_rx_analytics(
+    olt: Optional[str] = Query(None, description="Satu OLT; semua OLT jika kosong"),
+    hours: float = Query(24 * 7, gt=0, description="Jendela untuk slope degradasi"),
+    limit: int = Query(50, ge=1, le=1000),
+):
+    """ONU dengan sinyal terlemah / menurun: threshold, z-score per port, dan slope dB/hari."""
+    if olt and olt.upper() not in OLT_OPTIONS:
+        raise HTTPException(status_code=404, detail=f"OLT {olt} tidak ditemukan!")
+    return analyze_rx(rx_collector.store, olt.upper() if olt else None, hours=hours, limit=limit)
+
+
+@router.get("/rx/{olt_name}/history")
+async def get_rx_history(olt_name: str, interface: str, hours: float = Query(24, gt=0)):
+    """Riwayat rx power (dBm) satu ONU, contoh interface: gpon-onu_1/1/1:5."""
+    olt_name = olt_name.upper()
+    if olt_name not in OLT_OPTIONS:
+        raise HTTPException(status_code=404, detail=f"OLT {olt_name} tidak ditemukan!")
+    samples = rx_collector.store.history(olt_name, interface, since=time.time() - hours * 3600)
+    return {"olt_name": olt_name, "interface": interface, "samples": samples}
+
+
+@router.get("/rx/{olt_name}/ports")
+async def get_rx_port_percentiles(olt_name: str, hours: float = Query(24, gt=0)):
+    """Persentil rx power (p5/p50/p95) per port PON dalam jendela waktu."""
+    olt_name = olt_name.upper()
+    if olt_name not in OLT_OPTIONS:
+        raise HTTPException(status_code=404, detail=f"OLT {olt_name} tidak ditemukan!")
+    return rx_collector.store.port_percentiles(olt_name, since=time.time() - hours * 3600)
+
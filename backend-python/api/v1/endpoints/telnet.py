@@ -1,8 +1,10 @@
 #/api/v1/endpoints/config
 
 from fastapi import APIRouter, HTTPException
-from typing import List
+from fastapi.responses import StreamingResponse
+from typing import List, Any, AsyncIterator, Dict
 import asyncio
+import json
 
 from core.config import settings
 from schemas.config_handler import (
@@ -11,12 +13,81 @@ from schemas.config_handler import (
     CongigurationBridgeResponse, BatchConfigurationRequest, 
     BatchItemResult, BatchConfigurationResponse
 )
-from services.telnet import TelnetClient
-from services.connection_manager import olt_manager
+from services.telnet import TelnetClient, retry_stats
+from services.connection_manager import olt_manager, CircuitOpenError
+from services.rate_limit import OltBusyError, command_limiter, CONFIG, EXPENSIVE_SHOW
+from services.profile_catalog import profile_catalog, ProfileValidationError
 from core.olt_config import OLT_OPTIONS, MODEM_OPTIONS, PACKAGE_OPTIONS
 
 router = APIRouter()
 
+def _sse(event: Dict[str, Any]) -> str:
+    """Format one provisioning event as a Server-Sent Events frame."""
+    return f"event: {event['event']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+async def _provisioning_stream(handler: TelnetClient, items: List[ConfigurationRequest], vlan: str, verify: bool = False) -> AsyncIterator[str]:
+    """
+    Runs each item on the pooled session and forwards its events as they happen.
+    All ONTs of one OLT share a CLI context, so items run back-to-back and the
+    client demultiplexes by the SN on every event. One failed ONT emits an
+    'error' event and the batch continues; 'done' always closes the stream.
+    """
+    success_count = 0
+    try:
+        async with handler.session(CONFIG):
+            for item in items:
+                try:
+                    async for event in handler.stream_configuration(item, vlan=vlan, verify=verify):
+                        yield _sse(event)
+                    success_count += 1
+                except Exception as e:
+                    yield _sse({"event": "error", "sn": item.sn, "message": str(e)})
+    except OltBusyError as e:
+        # The queue filled up between the check in _stream_response and here
+        for item in items:
+            yield _sse({"event": "error", "sn": item.sn, "message": str(e)})
+    yield _sse({
+        "event": "done", "total": len(items),
+        "success_count": success_count, "fail_count": len(items) - success_count,
+    })
+
+def _configuration_summary(summary: Dict[str, Any]) -> ConfigurationSummary:
+    """Map the summary of TelnetClient.apply_configuration onto the response schema."""
+    return ConfigurationSummary(
+        serial_number=summary["Serial Number"],
+        name=summary["Nama Pelanggan"],
+        pppoe_user=summary["ID Pelanggan"],
+        location=summary["OLT dan ONU"],
+        profile=summary["Profil yang dipakai"],
+    )
+
+async def _stream_response(olt_name: str, items: List[ConfigurationRequest], verify: bool = False) -> StreamingResponse:
+    olt_info = OLT_OPTIONS.get(olt_name.upper())
+    if not olt_info:
+        raise HTTPException(status_code=404, detail=f"OLT '{olt_name}' tidak ditemukan.")
+
+    # Connect and check the queue before the stream starts so failures still map to 504 / 429
+    try:
+        handler = await olt_manager.get_connection(
+            host=olt_info["ip"],
+            username=settings.OLT_USERNAME,
+            password=settings.OLT_PASSWORD,
+            is_c600=olt_info["c600"]
+        )
+        command_limiter.check(handler.host, handler.is_c600, CONFIG)
+    except CircuitOpenError:
+        raise  # 503 + Retry-After via the app handler
+    except OltBusyError:
+        raise  # 429 + Retry-After via the app handler
+    except (ConnectionError, asyncio.TimeoutError) as e:
+        raise HTTPException(status_code=504, detail=f"Gagal terhubung ke OLT: {e}")
+
+    return StreamingResponse(
+        _provisioning_stream(handler, items, olt_info["vlan"], verify),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @router.get("/api/options", response_model=OptionsResponse)
 async def get_options():
     """Mengembalikan semua opsi yang dibutuhkan untuk form di frontend."""
@@ -26,6 +97,16 @@ async def get_options():
         "package_options": list(PACKAGE_OPTIONS.keys())
     }
 
+@router.get("/api/olts/status")
+async def get_olt_status():
+    """Status circuit breaker dan session pool per OLT."""
+    return olt_manager.breaker_status()
+
+@router.get("/api/olts/sessions")
+async def get_olt_sessions():
+    """Umur, idle time dan keepalive tiap session OLT di pool, retry command setelah session putus, dan rate limit per OLT."""
+    return {**olt_manager.keepalive.metrics(), "retries": retry_stats, "rate_limits": command_limiter.status()}
+
 @router.get("/api/olts/{olt_name}/detect-onts", response_model=List[UnconfiguredOnt])
 async def detect_uncfg_onts(olt_name: str):
     """Mendeteksi semua unconfigured ONT pada OLT yang dipilih."""
@@ -41,45 +122,82 @@ async def detect_uncfg_onts(olt_name: str):
             is_c600=olt_info["c600"]
         )
         
-        ont_list = await handler.find_unconfigured_onts()
+        async with handler.session(EXPENSIVE_SHOW):
+            ont_list = await handler.find_unconfigured_onts()
         return ont_list
+    except CircuitOpenError:
+        raise  # 503 + Retry-After via the app handler
+    except OltBusyError:
+        raise  # 429 + Retry-After via the app handler
     except ConnectionError as e:
         raise HTTPException(status_code=504, detail=f"Gagal terhubung ke OLT: {e}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Terjadi error internal: {e}")
 
+@router.get("/api/olts/{olt_name}/catalog")
+async def get_profile_catalog(olt_name: str, refresh: bool = False):
+    """Katalog profil tcont/traffic/qos dan VLAN yang dipakai untuk validasi sebelum provisioning."""
+    olt_info = OLT_OPTIONS.get(olt_name.upper())
+    if not olt_info:
+        raise HTTPException(status_code=404, detail=f"OLT '{olt_name}' tidak ditemukan.")
+
+    entry = profile_catalog.get(olt_info["ip"])
+    if refresh or entry is None:
+        try:
+            handler = await olt_manager.get_connection(
+                host=olt_info["ip"],
+                username=settings.OLT_USERNAME,
+                password=settings.OLT_PASSWORD,
+                is_c600=olt_info["c600"]
+            )
+            entry = await profile_catalog.load(handler)
+        except CircuitOpenError:
+            raise  # 503 + Retry-After via the app handler
+        except OltBusyError:
+            raise  # 429 + Retry-After via the app handler
+        except (ConnectionError, asyncio.TimeoutError) as e:
+            raise HTTPException(status_code=504, detail=f"Gagal terhubung ke OLT: {e}")
+
+    return {"olt_name": olt_name.upper(), **{kind: sorted(values) if isinstance(values, set) else values for kind, values in entry.items()}}
+
 @router.post("/api/olts/{olt_name}/configure", response_model=ConfigurationResponse)
-async def run_configuration(olt_name: str, request: ConfigurationRequest):
-    """Menjalankan proses konfigurasi untuk satu ONT."""
+async def run_configuration(olt_name: str, request: ConfigurationRequest, verify: bool = False):
+    """Menjalankan proses konfigurasi untuk satu ONT; verify=true membaca ulang running-config."""
     olt_info = OLT_OPTIONS.get(olt_name.upper())
     if not olt_info:
         raise HTTPException(status_code=404, detail=f"OLT '{olt_name}' tidak ditemukan.")
         
     try:
-        async with TelnetClient(
+        handler = await olt_manager.get_connection(
             host=olt_info["ip"],
             username=settings.OLT_USERNAME,
             password=settings.OLT_PASSWORD,
             is_c600=olt_info["c600"]
-        ) as handler:
-            logs, summary = await handler.apply_configuration(request, vlan=olt_info["vlan"])
-            logs.append("INFO < Database save functionality not yet implemented.")
-            
-            return ConfigurationResponse(
-                message="Konfigurasi berhasil.",
-                summary=ConfigurationSummary(**summary),
-                logs=logs
-            )
+        )
+        async with handler.session(CONFIG):
+            logs, summary = await handler.apply_configuration(request, vlan=olt_info["vlan"], verify=verify)
+        logs.append("INFO < Database save functionality not yet implemented.")
 
-            # ---
+        return ConfigurationResponse(
+            message="Konfigurasi berhasil.",
+            summary=_configuration_summary(summary),
+            logs=logs,
+            verification=summary.get("Verifikasi")
+        )
+    except CircuitOpenError:
+        raise  # 503 + Retry-After via the app handler
+    except OltBusyError:
+        raise  # 429 + Retry-After via the app handler
     except (ConnectionError, asyncio.TimeoutError) as e:
         raise HTTPException(status_code=504, detail=f"Gagal terhubung atau timeout saat koneksi ke OLT: {e}")
+    except ProfileValidationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except LookupError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Proses konfigurasi gagal: {e}")
     
-@router.post("api/olts/{olt_name}/config_bridge", response_model=CongigurationBridgeResponse)
+@router.post("/api/olts/{olt_name}/config_bridge", response_model=ConfigurationResponse)
 async def run_configuration_bridge(olt_name: str, request: ConfigurationBridgeRequest):
     "Menjalankan konfigurasi bridge"
     olt_info = OLT_OPTIONS.get(olt_name.upper())
@@ -87,24 +205,30 @@ async def run_configuration_bridge(olt_name: str, request: ConfigurationBridgeRe
         raise HTTPException(status_code=404, detail=f"OLT '{olt_name}' tidak ditemukan.")
     
     try:
-        async with TelnetClient(
+        handler = await olt_manager.get_connection(
             host=olt_info["ip"],
             username=settings.OLT_USERNAME,
             password=settings.OLT_PASSWORD,
             is_c600=olt_info["c600"]
-
-        ) as handler: 
-            logs, summary = await handler.config_bridge(request)
-            logs.append("INFO < Database save functionality not yet implemented.")
+        )
+        async with handler.session(CONFIG):
+            logs, summary = await handler.config_bridge(request, vlan=request.vlan)
+        logs.append("INFO < Database save functionality not yet implemented.")
             
         return ConfigurationResponse(
             message="Konfigurasi Berhasil",
-            summary=ConfigurationSummary(**summary),
+            summary=_configuration_summary(summary),
             logs=logs
         )
     
+    except CircuitOpenError:
+        raise  # 503 + Retry-After via the app handler
+    except OltBusyError:
+        raise  # 429 + Retry-After via the app handler
     except (ConnectionError, asyncio.TimeoutError) as e:
         raise HTTPException(status_code=504, detail=f"Gagal terhubung atau timeout saat koneksi ke OLT: {e}")
+    except ProfileValidationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except LookupError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
@@ -125,13 +249,14 @@ async def run_batch_configuration(olt_name: str, batch: BatchConfigurationReques
     fail_count = 0
 
     try:
-        # 2. Open Telnet Connection ONCE
-        async with TelnetClient(
+        # 2. Take the pooled session ONCE for the whole batch
+        handler = await olt_manager.get_connection(
             host=olt_info["ip"],
             username=settings.OLT_USERNAME,
             password=settings.OLT_PASSWORD,
             is_c600=olt_info["c600"]
-        ) as handler:
+        )
+        async with handler.session(CONFIG):
             
             # 3. Loop through the batch items using the SAME handler
             for request_item in batch.items:
@@ -161,6 +286,10 @@ async def run_batch_configuration(olt_name: str, batch: BatchConfigurationReques
                         logs=[f"Error processing {item_id}: {str(e)}"]
                     ))
 
+    except CircuitOpenError:
+        raise  # 503 + Retry-After via the app handler
+    except OltBusyError:
+        raise  # 429 + Retry-After via the app handler
     except (ConnectionError, asyncio.TimeoutError) as e:
         # If the MAIN connection fails, the whole batch fails
         raise HTTPException(status_code=504, detail=f"Critical: Gagal koneksi ke OLT: {e}")
@@ -173,4 +302,14 @@ async def run_batch_configuration(olt_name: str, batch: BatchConfigurationReques
         success_count=success_count,
         fail_count=fail_count,
         results=results
-    )
\ No newline at end of file
+    )
+
+@router.post("/api/olts/{olt_name}/configure/stream")
+async def stream_configuration(olt_name: str, request: ConfigurationRequest, verify: bool = False):
+    """Konfigurasi satu ONT; setiap command dan output OLT dikirim langsung via SSE."""
+    return await _stream_response(olt_name, [request], verify)
+
+@router.post("/api/olts/{olt_name}/configure/batch/stream")
+async def stream_batch_configuration(olt_name: str, batch: BatchConfigurationRequest, verify: bool = False):
+    """Konfigurasi banyak ONT via SSE; setiap event diberi tag SN."""
+    return await _stream_response(olt_name, batch.items, verify)
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional, Dict
+from typing import Optional, Dict, List
 
 class Settings(BaseSettings):
     # --- PostgreSQL Database ---
@@ -8,6 +8,10 @@ class Settings(BaseSettings):
     DB_NAME: str
     DB_USER: str
     DB_PASS: str
+    DB_POOL_MIN_SIZE: int = 2
+    DB_POOL_MAX_SIZE: int = 10
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    DB_COMMAND_TIMEOUT: float = 10.0
 
     # --- Credentials ---
     OLT_USERNAME: str
@@ -20,6 +24,58 @@ class Settings(BaseSettings):
 
     # --- Services ---
     TELNET_TIMEOUT: int = 15
+    OLT_BREAKER_FAILURE_THRESHOLD: int = 3  # consecutive connect/login failures before fast-fail
+    OLT_BREAKER_BACKOFF_SECONDS: float = 5.0  # first open period, doubled on every failed probe
+    OLT_BREAKER_MAX_BACKOFF_SECONDS: float = 300.0
+    OLT_WARMUP_ENABLED: bool = True
+    OLT_WARMUP_OLTS: List[str] = []  # OLTs pre-connected at startup; empty = every OLT
+    OLT_WARMUP_WAIT_SECONDS: float = 10.0  # startup waits this long, slower OLTs finish in the background
+    OLT_KEEPALIVE_INTERVAL_SECONDS: float = 60.0  # Enter after this long without any traffic
+    OLT_KEEPALIVE_READ_TIMEOUT_SECONDS: float = 5.0
+    OLT_SESSION_MAX_IDLE_SECONDS: float = 1800.0  # log out sessions without commands this long; 0 = never
+    OLT_RETRY_DEADLINE_SECONDS: float = 30.0  # a show retried after a dropped session must finish within this, counted from the first try
+    OLT_RESYNC_ALWAYS: bool = True  # marker round trip before every command; False = only when stale bytes are pending
+    OLT_DRAIN_TIMEOUT_SECONDS: float = 0.02  # with OLT_RESYNC_ALWAYS off: wait this long for pending bytes
+    # Commands/second per OLT and command class, by model; a missing class is not limited
+    OLT_COMMAND_RATES: Dict[str, Dict[str, float]] = {
+        "c300": {"show": 4.0, "show_heavy": 0.5, "config": 5.0},
+        "c600": {"show": 10.0, "show_heavy": 2.0, "config": 10.0},
+    }
+    OLT_COMMAND_BURST_SECONDS: float = 2.0  # bucket holds rate x this many tokens
+    OLT_COMMAND_MAX_QUEUE: int = 10  # commands waiting per OLT and class before 429
+    OLT_EXPENSIVE_SHOW_PREFIXES: List[str] = [
+        "show pon bandwidth dba", "show running-config", "show onu running config",
+        "show gpon onu uncfg", "show pon onu uncfg", "show gpon onu baseinfo", "show pon power onu-rx",
+    ]
+    PROFILE_CATALOG_REFRESH_SECONDS: int = 3600
+    # 'show card' types of GPON line cards; the survey walks every port of these cards
+    OLT_PON_CARD_PREFIXES: List[str] = ["GTG", "GFG"]
+    DBA_SURVEY_INTERVAL_SECONDS: int = 0  # 0 = survey only on request
+    DBA_CACHE_MAX_AGE_SECONDS: int = 1800
+    RX_POLL_INTERVAL_SECONDS: int = 900  # 0 = collect only on request
+    RX_RETENTION_DAYS: int = 30
+    RX_SPILL_TO_DB: bool = True
+    RX_WEAK_DBM: float = -25.0
+    RX_CRITICAL_DBM: float = -27.0
+    RX_ZSCORE_OUTLIER: float = 2.0
+    RX_DEGRADATION_DB_PER_DAY: float = 0.1
+    OUTAGE_POLL_INTERVAL_SECONDS: int = 120  # 0 = poll only on request
+    OUTAGE_MIN_ONUS: int = 4
+    OUTAGE_MIN_FRACTION: float = 0.5
+    OUTAGE_RECOVERY_FRACTION: float = 0.8
+    OUTAGE_CAUSE_SAMPLES: int = 3
+    OUTAGE_EVENT_DEBOUNCE_SECONDS: float = 1.0
+    SYSLOG_HOST: str = "0.0.0.0"
+    SYSLOG_PORT: int = 5514  # 0 = disabled
+    SYSLOG_SUBSCRIBER_QUEUE: int = 1000
+    SYSLOG_IP_ALIASES: Dict[str, str] = {}  # extra source IP -> OLT name, e.g. for the replay script
+    OLT_READ_BACKEND_DEFAULT: str = "telnet"  # "telnet" or "snmp" for read-only ONU queries
+    OLT_READ_BACKEND: Dict[str, str] = {}  # per-OLT override, e.g. {"BEJI": "snmp"}
+    SNMP_COMMUNITY: str = "public"
+    SNMP_PORT: int = 161
+    SNMP_TIMEOUT: float = 2.0
+    SNMP_RETRIES: int = 1
+    SNMP_MAX_REPETITIONS: int = 32
     BOT_TOKEN: str
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
@@ -0,0 +1,64 @@
+import logging
+from typing import Optional
+
+import asyncpg
+
+from core.config import settings
+
+# Application-wide pool, created in the FastAPI lifespan (see main.py)
+_pool: Optional[asyncpg.Pool] = None
+
+
+def connection_params() -> dict:
+    """
+    DB_* settings as connect() keywords. asyncpg and psycopg2 both accept
+    these names, so the pool and the Excel import writer reach one database.
+    """
+    return {
+        "host": settings.DB_HOST or None,
+        "port": settings.DB_PORT,
+        "database": settings.DB_NAME,
+        "user": settings.DB_USER,
+        "password": settings.DB_PASS,
+    }
+
+
+async def init_pool() -> Optional[asyncpg.Pool]:
+    """
+    Create the shared asyncpg pool from the DB_* settings.
+    A database outage must not stop the OLT endpoints from booting, so a
+    failure is logged and the pool stays unavailable.
+    """
+    global _pool
+    if _pool is not None:
+        return _pool
+
+    try:
+        _pool = await asyncpg.create_pool(
+            **connection_params(),
+            min_size=settings.DB_POOL_MIN_SIZE,
+            max_size=settings.DB_POOL_MAX_SIZE,
+            # Repeated queries are prepared once per connection and reused
+            statement_cache_size=settings.DB_STATEMENT_CACHE_SIZE,
+            command_timeout=settings.DB_COMMAND_TIMEOUT,
+        )
+        logging.info(
+            f"🗄️ Postgres pool ready ({settings.DB_POOL_MIN_SIZE}-{settings.DB_POOL_MAX_SIZE} connections)"
+        )
+    except Exception as e:
+        logging.error(f"Gagal membuat Postgres pool: {e}")
+        _pool = None
+    return _pool
+
+
+async def close_pool() -> None:
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+
+
+def get_pool() -> asyncpg.Pool:
+    if _pool is None:
+        raise ConnectionError("Postgres pool is not available.")
+    return _pool
@@ -1,13 +1,58 @@
+import logging
 import uvicorn
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from api.v1.api import api_router
+from core.config import settings
+from core.database import init_pool, close_pool
+from services.data_fiber import DataFiberRepository
+from services.provisioning_templates import template_registry
+from services.profile_catalog import profile_catalog
+from services.pon_survey import dba_survey
+from services.optical_power import rx_collector
+from services.outage import outage_engine
+from services.olt_events import olt_events
+from services.connection_manager import olt_manager, CircuitOpenError
+from services.rate_limit import OltBusyError
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Template syntax errors must stop the boot, not the first provisioning
+    template_registry.load()
+    # Shared Postgres pool for every request handler
+    pool = await init_pool()
+    if pool is not None:
+        try:
+            await DataFiberRepository(pool).ensure_schema()
+        except Exception as e:
+            logging.error(f"Gagal menyiapkan tabel data_fiber: {e}")
+    # Pooled OLT sessions up front, so the first operator request skips connect + login
+    if settings.OLT_WARMUP_ENABLED:
+        await olt_manager.warm_up(settings.OLT_WARMUP_OLTS or None, wait=settings.OLT_WARMUP_WAIT_SECONDS)
+    # Profile catalog loads in the background; unreachable OLTs never block the boot
+    profile_catalog.start(olt_manager)
+    dba_survey.start_periodic()
+    rx_collector.start(olt_manager)
+    outage_engine.start(olt_manager)
+    await olt_events.start()
+    yield
+    olt_events.stop()
+    await outage_engine.stop()
+    await rx_collector.stop()
+    await dba_survey.stop()
+    await profile_catalog.stop()
+    await olt_manager.close_all()
+    await close_pool()
 
 # [FIX] Removed docs_url=None and redoc_url=None to enable default public docs
 app = FastAPI(
     title="Lexxadata Customer Scraper API",
     description="A structured API to search and scrape customer data from the NMS portal.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
 # --- FIX: Define specific origins ---
@@ -27,6 +72,17 @@ app.add_middleware(
 
 app.include_router(api_router, prefix="/api/v1")
 
+
+@app.exception_handler(CircuitOpenError)
+async def circuit_open_handler(request: Request, exc: CircuitOpenError):
+    """OLT with an open circuit: fail fast with 503 and tell the client when to retry."""
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": str(exc.retry_after)})
+
+@app.exception_handler(OltBusyError)
+async def olt_busy_handler(request: Request, exc: OltBusyError):
+    """Command queue of the OLT is full: shed the request with 429 instead of piling onto the OLT CPU."""
+    return JSONResponse(status_code=429, content={"detail": str(exc)}, headers={"Retry-After": str(exc.retry_after)})
+
 # --- YOUR API ROUTERS ---
 @app.get("/")
 def root():
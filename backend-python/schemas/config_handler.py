@@ -28,10 +28,26 @@ class ConfigurationSummary(BaseModel):
     location: str
     profile: str
 
+class VerificationLine(BaseModel):
+    section: str  # 'interface' atau 'onu'
+    line: str
+    passed: bool
+    matched: Optional[str] = None
+
+class VerificationResult(BaseModel):
+    interface: str
+    passed: bool
+    pass_count: int
+    fail_count: int
+    unchecked: int
+    lines: List[VerificationLine]
+    seconds: float
+
 class ConfigurationResponse(BaseModel):
     message: str
     summary: Optional[ConfigurationSummary] = None
     logs: List[str]
+    verification: Optional[VerificationResult] = None
 
 class OptionsResponse(BaseModel):
     olt_options: List[str]
@@ -1,4 +1,4 @@
-from . import BaseModel, Optional, List, HttpUrl
+from . import BaseModel, Optional, List, HttpUrl, datetime
 
 class Customer(BaseModel):
     id: str
@@ -32,4 +32,22 @@ class CustomerwithInvoices(Customer):
     invoices: List[BillingSummary] = None
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class FiberCustomer(BaseModel):
+    user_pppoe: str
+    name: Optional[str] = None
+    alamat: Optional[str] = None
+    olt_name: Optional[str] = None
+    olt_port: Optional[str] = None
+    onu_sn: Optional[str] = None
+    interface: Optional[str] = None
+    onu_id: Optional[str] = None
+    sheet: Optional[str] = None
+    paket: Optional[str] = None
+    updated_at: Optional[datetime.datetime] = None
+
+class FiberSearchResponse(BaseModel):
+    items: List[FiberCustomer]
+    count: int
+    next_cursor: Optional[str] = None
@@ -61,6 +61,7 @@ class OnuDetailResponse(BaseModel):
 class OnuFullResponse(BaseModel):
     detail_data:str
     attenuation_data: str
+    incident: Optional[dict] = None  # diisi jika ONU termasuk insiden massal yang masih open
     
 class CustomerOnuDetail(BaseModel):
     """
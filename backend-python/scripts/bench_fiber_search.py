@@ -0,0 +1,110 @@
+"""
+Benchmark for the /customer/fiber search queries.
+
+Seeds N synthetic rows into a separate table (default data_fiber_bench),
+creates the same indexes as data_fiber and reports p50/p95/p99 latency
+per filter type through DataFiberRepository.search.
+
+    python -m scripts.bench_fiber_search --rows 100000 --iterations 500
+"""
+
+import argparse
+import asyncio
+import random
+import string
+import time
+
+import asyncpg
+
+from core.config import settings
+from services.data_fiber import DataFiberRepository
+
+OLTS = ["BOYOLANGU", "BEJI", "DURENAN", "KALIDAWIR", "KAUMAN", "KEDIRI", "CAMPUR BARU", "BLITAR", "GANDUSARI"]
+FIRST = ["BUDI", "SITI", "AGUS", "DEWI", "EKO", "SRI", "ADI", "RINA", "JOKO", "WATI", "HADI", "NUR"]
+LAST = ["SANTOSO", "RAHAYU", "WIBOWO", "LESTARI", "SAPUTRA", "HIDAYAT", "PRATAMA", "KURNIA"]
+STREETS = ["JL MAWAR", "JL MELATI", "JL SUDIRMAN", "JL DIPONEGORO", "DSN KRAJAN", "JL PAHLAWAN"]
+
+
+def synthetic_rows(n: int, seed: int = 7) -> list[tuple]:
+    rnd = random.Random(seed)
+    rows = []
+    for i in range(n):
+        olt = OLTS[i % len(OLTS)]
+        port = f"1/{rnd.randint(1, 4)}/{rnd.randint(1, 16)}"
+        onu_id = str(rnd.randint(1, 128))
+        sn = "ZTEG" + "".join(rnd.choices(string.hexdigits.upper(), k=8))
+        rows.append((
+            f"bench{i:07d}",
+            f"{rnd.choice(FIRST)} {rnd.choice(LAST)} {i}",
+            f"{rnd.choice(STREETS)} NO {rnd.randint(1, 300)} RT {rnd.randint(1, 9)}",
+            olt, port, sn, None, f"{port}:{onu_id}", onu_id, f"{olt} {port}", "20M",
+        ))
+    return rows
+
+
+async def seed(pool: asyncpg.Pool, repo: DataFiberRepository, n: int) -> list[tuple]:
+    async with pool.acquire() as conn:
+        await conn.execute(f"DROP TABLE IF EXISTS {repo.table}")
+    await repo.ensure_schema()
+    rows = synthetic_rows(n)
+    async with pool.acquire() as conn:
+        await conn.copy_records_to_table(
+            repo.table,
+            records=rows,
+            columns=["user_pppoe", "name", "alamat", "olt_name", "olt_port", "onu_sn",
+                     "pppoe_password", "interface", "onu_id", "sheet", "paket"],
+        )
+        await conn.execute(f"ANALYZE {repo.table}")
+    return rows
+
+
+async def measure(label: str, iterations: int, make_call) -> None:
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await make_call()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    pct = lambda p: samples[min(len(samples) - 1, int(len(samples) * p))]
+    print(f"{label:<22} p50={pct(0.50):6.2f}ms  p95={pct(0.95):6.2f}ms  p99={pct(0.99):6.2f}ms")
+
+
+async def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=100_000)
+    ap.add_argument("--iterations", type=int, default=500)
+    ap.add_argument("--table", default="data_fiber_bench")
+    args = ap.parse_args()
+
+    pool = await asyncpg.create_pool(
+        host=settings.DB_HOST or None, port=settings.DB_PORT, database=settings.DB_NAME,
+        user=settings.DB_USER, password=settings.DB_PASS, min_size=1, max_size=2,
+    )
+    repo = DataFiberRepository(pool, table=args.table)
+    try:
+        start = time.perf_counter()
+        rows = await seed(pool, repo, args.rows)
+        print(f"Seeded {len(rows)} rows into {args.table} in {time.perf_counter() - start:.1f}s")
+
+        rnd = random.Random(1)
+        pick = lambda: rnd.choice(rows)
+        page = {"cursor": None}
+
+        async def next_page():
+            items, page["cursor"] = await repo.search(olt_name="BEJI", after=page["cursor"], limit=50)
+
+        await measure("by sn", args.iterations, lambda: repo.search(onu_sn=pick()[5]))
+        await measure("by olt+port", args.iterations, lambda: (lambda r: repo.search(olt_name=r[3], olt_port=r[4]))(pick()))
+        await measure("by name (substring)", args.iterations, lambda: repo.search(name=pick()[1].split()[1][:5], limit=50))
+        await measure("by address (substring)", args.iterations, lambda: repo.search(alamat=pick()[2][:10], limit=50))
+        try:
+            await measure("by name (fuzzy)", args.iterations, lambda: repo.search(name=pick()[1], fuzzy=True, limit=50))
+        except asyncpg.UndefinedFunctionError:
+            print("by name (fuzzy)        skipped: pg_trgm not installed")
+        await measure("olt keyset paging", args.iterations, next_page)
+    finally:
+        await pool.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
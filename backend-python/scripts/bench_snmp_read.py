@@ -0,0 +1,192 @@
+"""
+Benchmark of the read-only ONU queries: Telnet CLI vs SNMP GETBULK.
+
+Builds one synthetic C300 (P ports x N ONUs) and serves it twice:
+- as an snmpsim recording (.snmprec of the ZXAN ONU tables) through
+  snmpsim-command-responder,
+- as a minimal Telnet CLI that answers 'show gpon onu state' and
+  'show pon power onu-rx' with the same data,
+then reads every port through SnmpClient and TelnetClient and reports
+ports/s and ONUs/s per backend.
+
+The stand-ins answer instantly, so --cli-delay models the seconds a real
+OLT spends rendering a 'show' on a loaded port. SNMP walks of several ports
+can run in parallel (--concurrency); the Telnet session is one VTY and
+serializes every command.
+
+    pip install snmpsim
+    python -m scripts.bench_snmp_read --ports 16 --onus 64 --rounds 5 --cli-delay 0.3
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import tempfile
+import time
+
+import telnetlib3
+
+from services.olt_reader import parse_onu_rx, parse_onu_states
+from services.snmp import PHASE_STATES, ZTE_C300_OIDS, SnmpClient, port_ifindex
+from services.telnet import TelnetClient
+
+COMMUNITY = "bench"
+PHASE_WEIGHTS = {4: 0.9, 2: 0.04, 5: 0.03, 7: 0.03}
+
+
+def synthetic_olt(ports: int, onus: int, seed: int = 7) -> dict:
+    """port '1/1/p' -> [(onu_id, phase code, rx raw, sn hex)]"""
+    rnd = random.Random(seed)
+    olt = {}
+    for p in range(1, ports + 1):
+        rows = []
+        for onu_id in range(1, onus + 1):
+            phase = rnd.choices(list(PHASE_WEIGHTS), weights=list(PHASE_WEIGHTS.values()))[0]
+            rx = int((rnd.uniform(-28.0, -15.0) + 30.0) / 0.002) if phase == 4 else 65535
+            rows.append((onu_id, phase, rx, f"{rnd.getrandbits(32):08X}"))
+        olt[f"1/{1 + (p - 1) // 16}/{1 + (p - 1) % 16}"] = rows
+    return olt
+
+
+def snmprec(olt: dict) -> str:
+    records = []
+    for port, rows in olt.items():
+        ifindex = port_ifindex(port)
+        for onu_id, phase, rx, sn in rows:
+            records += [
+                (f"{ZTE_C300_OIDS['onu_type']}.{ifindex}.{onu_id}", "4", "ZTE-F609"),
+                (f"{ZTE_C300_OIDS['onu_name']}.{ifindex}.{onu_id}", "4", f"ONU-{port}-{onu_id}"),
+                (f"{ZTE_C300_OIDS['onu_sn']}.{ifindex}.{onu_id}", "4x", b"ZTEG".hex() + sn.lower()),
+                (f"{ZTE_C300_OIDS['onu_phase']}.{ifindex}.{onu_id}", "2", str(phase)),
+                (f"{ZTE_C300_OIDS['onu_rx']}.{ifindex}.{onu_id}.1", "2", str(rx)),
+            ]
+    # snmpsim needs the records in OID order
+    records.sort(key=lambda r: tuple(int(x) for x in r[0].split(".")))
+    return "\n".join("|".join(r) for r in records) + "\n"
+
+
+def cli_output(olt: dict, command: str) -> str:
+    port = command.rsplit("_", 1)[-1]
+    rows = olt.get(port, [])
+    if command.startswith("show gpon onu state"):
+        lines = ["OnuIndex   Admin State  OMCC State  Phase State  Channel", "-" * 60]
+        lines += [f"{port}:{onu_id}  enable  enable  {PHASE_STATES[phase]}  1(GPON)" for onu_id, phase, _, _ in rows]
+    else:
+        lines = ["Onu                 Rx power", "-" * 40]
+        lines += [
+            f"gpon-onu_{port}:{onu_id}  {rx * 0.002 - 30.0:.3f}(dbm)" if rx != 65535 else f"gpon-onu_{port}:{onu_id}  N/A"
+            for onu_id, _, rx, _ in rows
+        ]
+    return "\r\n".join(lines)
+
+
+async def serve_cli(olt: dict, port: int, delay: float):
+    async def shell(reader, writer):
+        writer.write("Username:")
+        await reader.readline()
+        writer.write("Password:")
+        await reader.readline()
+        writer.write("\r\nOLT-BENCH#")
+        while True:
+            line = (await reader.readline()).strip()
+            if not line and reader.at_eof():
+                break
+            output = ""
+            if line.startswith("show"):
+                await asyncio.sleep(delay)
+                output = cli_output(olt, line)
+            writer.write(f"{line}\r\n{output}\r\nOLT-BENCH#")
+
+    return await telnetlib3.create_server(host="127.0.0.1", port=port, shell=shell)
+
+
+async def bench_snmp(olt: dict, port: int, rounds: int, concurrency: int) -> float:
+    client = SnmpClient("127.0.0.1", False, community=COMMUNITY, port=port)
+    limit = asyncio.Semaphore(concurrency)
+
+    async def read(p: str) -> None:
+        async with limit:
+            states, rx = await asyncio.gather(client.get_onu_states(p), client.get_onu_rx(p))
+        assert len(states) == len(olt[p])
+
+    started = time.perf_counter()
+    for _ in range(rounds):
+        await asyncio.gather(*(read(p) for p in olt))
+    return time.perf_counter() - started
+
+
+async def bench_telnet(olt: dict, port: int, rounds: int) -> float:
+    client = TelnetClient("127.0.0.1", "bench", "bench", False, port=port)
+    await client.connect()
+    try:
+        started = time.perf_counter()
+        for _ in range(rounds):
+            for p in olt:
+                async with client.lock:
+                    states = parse_onu_states(await client._execute_command(f"show gpon onu state gpon-olt_{p}"))
+                    rx = parse_onu_rx(await client._execute_command(f"show pon power onu-rx gpon-olt_{p}"))
+                assert len(states) == len(olt[p])
+        return time.perf_counter() - started
+    finally:
+        await client.close()
+
+
+async def wait_for_agent(port: int, timeout: float = 20.0) -> None:
+    client = SnmpClient("127.0.0.1", False, community=COMMUNITY, port=port)
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            await client.get_onu_states("1/1/1")
+            return
+        except Exception:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.5)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ports", type=int, default=16)
+    parser.add_argument("--onus", type=int, default=64)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--cli-delay", type=float, default=0.0, help="seconds per 'show' on the Telnet stand-in")
+    parser.add_argument("--concurrency", type=int, default=4, help="ports walked in parallel over SNMP")
+    parser.add_argument("--snmp-port", type=int, default=11161)
+    parser.add_argument("--telnet-port", type=int, default=12323)
+    args = parser.parse_args()
+
+    olt = synthetic_olt(args.ports, args.onus)
+    total_onus = args.ports * args.onus * args.rounds
+    with tempfile.TemporaryDirectory() as data_dir:
+        with open(os.path.join(data_dir, f"{COMMUNITY}.snmprec"), "w") as f:
+            f.write(snmprec(olt))
+        command = ["snmpsim-command-responder", f"--data-dir={data_dir}",
+                   f"--agent-udpv4-endpoint=127.0.0.1:{args.snmp_port}", "--log-level=error"]
+        if os.geteuid() == 0:
+            # snmpsim refuses to run as root; the recording must be readable after dropping privileges
+            os.chmod(data_dir, 0o755)
+            command += ["--process-user=nobody", "--process-group=nogroup"]
+        agent = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        server = await serve_cli(olt, args.telnet_port, args.cli_delay)
+        try:
+            await wait_for_agent(args.snmp_port)
+            results = {
+                "snmp": await bench_snmp(olt, args.snmp_port, args.rounds, args.concurrency),
+                "telnet": await bench_telnet(olt, args.telnet_port, args.rounds),
+            }
+        finally:
+            server.close()
+            agent.terminate()
+            agent.wait()
+
+    print(f"{args.ports} port x {args.onus} ONU x {args.rounds} ronde (state + rx per port), "
+          f"cli-delay {args.cli_delay}s, snmp concurrency {args.concurrency}")
+    for backend, seconds in results.items():
+        print(f"  {backend:7s} {seconds:7.2f}s  {args.ports * args.rounds / seconds:8.1f} port/s  "
+              f"{total_onus / seconds:9.0f} ONU/s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,50 @@
+"""
+Replays captured OLT syslog lines to the event listener over UDP.
+
+The listener maps the source IP to an OLT, so when replaying from this host
+start the backend with an alias for the loopback address:
+
+    SYSLOG_IP_ALIASES='{"127.0.0.1": "BEJI"}' python main.py
+    python -m scripts.replay_syslog captured.log --delay 0.05
+
+Without a file a few sample ZTE messages are sent.
+"""
+
+import argparse
+import socket
+import time
+
+SAMPLES = [
+    "<190>GPON: gpon-onu_1/2/3:5 dying gasp",
+    "<190>GPON: gpon-onu_1/2/3:6 LOS alarm raised",
+    "<190>GPON: gpon-onu_1/2/3:7 OffLine",
+    "<190>GPON: gpon-onu_1/2/3:5 OnLine authpass",
+]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("file", nargs="?", help="captured syslog, one message per line")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5514)
+    parser.add_argument("--delay", type=float, default=0.0, help="seconds between messages")
+    args = parser.parse_args()
+
+    if args.file:
+        with open(args.file, encoding="utf-8", errors="replace") as f:
+            lines = [line.rstrip("\n") for line in f if line.strip()]
+    else:
+        lines = SAMPLES
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    started = time.perf_counter()
+    for line in lines:
+        sock.sendto(line.encode("utf-8"), (args.host, args.port))
+        if args.delay:
+            time.sleep(args.delay)
+    sock.close()
+    print(f"{len(lines)} pesan dikirim ke udp/{args.host}:{args.port} dalam {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
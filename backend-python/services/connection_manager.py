@@ -1,86 +1,411 @@
 # connection_manager.py
 
 import asyncio
-from typing import Dict
+import datetime as dt
+import heapq
+import itertools
+import math
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
 import logging
+from core.config import settings
+from core.olt_config import OLT_OPTIONS
 from services.telnet import TelnetClient
 
-# Import TelnetClient Anda di sini
-# from your_script import TelnetClient 
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(ConnectionError):
+    """OLT is known to be unreachable; raised without touching the network."""
+
+    def __init__(self, host: str, retry_after: float, last_error: Optional[str] = None):
+        self.host = host
+        self.retry_after = max(1, math.ceil(retry_after))
+        self.last_error = last_error
+        super().__init__(
+            f"OLT {host} sedang tidak bisa dihubungi (circuit open), coba lagi dalam {self.retry_after} detik"
+            + (f": {last_error}" if last_error else "")
+        )
+
+
+class CircuitBreaker:
+    """
+    Connect/login failures of one OLT. After OLT_BREAKER_FAILURE_THRESHOLD
+    consecutive failures the circuit opens and callers fail fast; once the
+    backoff has passed a single caller probes (half-open). A failed probe
+    reopens it with the backoff doubled, up to OLT_BREAKER_MAX_BACKOFF_SECONDS.
+    """
+
+    def __init__(self, host: str):
+        self.host = host
+        self.state = CLOSED
+        self.failures = 0
+        self.trips = 0  # consecutive times opened, drives the backoff
+        self.opened_at: Optional[dt.datetime] = None
+        self.retry_at = 0.0
+        self.last_error: Optional[str] = None
+
+    def backoff(self) -> float:
+        base = settings.OLT_BREAKER_BACKOFF_SECONDS * 2 ** max(self.trips - 1, 0)
+        return min(base, settings.OLT_BREAKER_MAX_BACKOFF_SECONDS)
+
+    def check(self) -> None:
+        """Raises CircuitOpenError while open or probing; unlike before_connect it never claims the probe."""
+        now = time.monotonic()
+        if self.state == OPEN and now < self.retry_at:
+            raise CircuitOpenError(self.host, self.retry_at - now, self.last_error)
+        if self.state == HALF_OPEN:
+            raise CircuitOpenError(self.host, settings.OLT_BREAKER_BACKOFF_SECONDS, self.last_error)
+
+    def before_connect(self) -> None:
+        """Raises CircuitOpenError unless this caller may try to connect."""
+        now = time.monotonic()
+        if self.state == OPEN:
+            if now < self.retry_at:
+                raise CircuitOpenError(self.host, self.retry_at - now, self.last_error)
+            self.state = HALF_OPEN  # this caller is the probe
+        elif self.state == HALF_OPEN:
+            raise CircuitOpenError(self.host, settings.OLT_BREAKER_BACKOFF_SECONDS, self.last_error)
+
+    def record_success(self) -> None:
+        if self.state != CLOSED:
+            logging.info(f"✅ Circuit {self.host} tertutup kembali")
+        self.state = CLOSED
+        self.failures = 0
+        self.trips = 0
+        self.opened_at = None
+        self.last_error = None
+
+    def record_failure(self, error: BaseException) -> None:
+        self.failures += 1
+        self.last_error = str(error) or type(error).__name__
+        if self.state == HALF_OPEN or self.failures >= settings.OLT_BREAKER_FAILURE_THRESHOLD:
+            self.trips += 1
+            self.state = OPEN
+            self.opened_at = dt.datetime.now(dt.timezone.utc)
+            self.retry_at = time.monotonic() + self.backoff()
+            logging.warning(f"⛔ Circuit {self.host} terbuka selama {self.backoff():g}s: {self.last_error}")
+
+    def abort_probe(self) -> None:
+        """Probe cancelled before it finished: let the next caller probe."""
+        if self.state == HALF_OPEN:
+            self.state = OPEN
+            self.retry_at = time.monotonic()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "trips": self.trips,
+            "opened_at": self.opened_at,
+            "retry_after": max(0, math.ceil(self.retry_at - time.monotonic())) if self.state == OPEN else 0,
+            "last_error": self.last_error,
+        }
+
+
+class KeepaliveScheduler:
+    """
+    One task keeps every pooled session alive. Sessions sit in a heap keyed
+    by when they next need attention. At that point a session that ran a
+    command recently is simply rescheduled. A quiet one gets an Enter, and
+    the echoed prompt is read back so nothing piles up in the reader. A
+    session without commands for OLT_SESSION_MAX_IDLE_SECONDS is logged out
+    to free the OLT's VTY line.
+    """
+
+    def __init__(self, manager: "ConnectionManager"):
+        self.manager = manager
+        self._heap: List[Tuple[float, int, TelnetClient]] = []
+        self._seq = itertools.count()
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._pings: Set[asyncio.Task] = set()
+        self.stats = {"keepalives": 0, "failures": 0, "evicted": 0}
+
+    def _push(self, client: TelnetClient, due: float) -> None:
+        heapq.heappush(self._heap, (due, next(self._seq), client))
+        self._wake.set()
+
+    def register(self, client: TelnetClient) -> None:
+        if self._wake is None:
+            self._wake = asyncio.Event()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        self._push(client, client.last_activity + settings.OLT_KEEPALIVE_INTERVAL_SECONDS)
+
+    async def stop(self) -> None:
+        tasks = [*self._pings, *([self._task] if self._task else [])]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+        self._heap.clear()
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            self._wake.clear()
+            if not self._heap:
+                await self._wake.wait()
+                continue
+            delay = self._heap[0][0] - loop.time()
+            if delay > 0:
+                # A newly registered session may be due earlier: wake on push
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            _, _, client = heapq.heappop(self._heap)
+            try:
+                self._due(client, loop.time())
+            except Exception as e:
+                logging.error(f"Keepalive scheduler error pada {client.host}: {e}")
+
+    def _due(self, client: TelnetClient, now: float) -> None:
+        if self.manager._connections.get(client.host) is not client:
+            return  # replaced or closed since it was scheduled
+        if not client.writer or client.writer.is_closing():
+            self.manager.discard(client)
+            return
+
+        interval = settings.OLT_KEEPALIVE_INTERVAL_SECONDS
+        if client.lock.locked():
+            # A command is running, which resets the OLT's idle timer by itself
+            self._push(client, now + interval)
+            return
+        max_idle = settings.OLT_SESSION_MAX_IDLE_SECONDS
+        if max_idle and now - client.last_activity >= max_idle:
+            self.manager.discard(client)
+            self.stats["evicted"] += 1
+            logging.info(f"💤 Session {client.host} idle {now - client.last_activity:.0f}s, ditutup")
+            self._spawn(self.manager.logout(client))
+            return
+        quiet_since = max(client.last_activity, client.last_keepalive)
+        if now - quiet_since < interval:
+            self._push(client, quiet_since + interval)
+            return
+        self._spawn(self._ping(client))
+
+    def _spawn(self, coro) -> None:
+        task = asyncio.create_task(coro)
+        self._pings.add(task)
+        task.add_done_callback(self._pings.discard)
+
+    async def _ping(self, client: TelnetClient) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            async with client.lock:
+                if not client.writer or client.writer.is_closing():
+                    self.manager.discard(client)
+                    return
+                client.writer.write("\n")
+                await asyncio.wait_for(client.writer.drain(), timeout=10)
+                # Read the echoed prompt back so it never lands in the next command's output
+                await client._read_until_prompt(timeout=settings.OLT_KEEPALIVE_READ_TIMEOUT_SECONDS)
+                client.last_keepalive = loop.time()
+                client.keepalives += 1
+            self.stats["keepalives"] += 1
+            self._push(client, client.last_keepalive + settings.OLT_KEEPALIVE_INTERVAL_SECONDS)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.stats["failures"] += 1
+            logging.warning(f"Keepalive {client.host} gagal, session dibuang: {e or type(e).__name__}")
+            if self.manager.discard(client):
+                await client.close()
+
+    def metrics(self) -> Dict[str, Any]:
+        now = asyncio.get_event_loop().time()
+        names = {info["ip"]: name for name, info in OLT_OPTIONS.items()}
+        due = {id(client): at for at, _, client in self._heap}
+        return {
+            **self.stats,
+            "scheduled": len(self._heap),
+            "sessions": [
+                {
+                    "olt_name": names.get(client.host),
+                    "host": client.host,
+                    "age_seconds": round(now - client.connected_at, 1),
+                    "idle_seconds": round(now - client.last_activity, 1),
+                    "since_keepalive_seconds": round(now - client.last_keepalive, 1) if client.keepalives else None,
+                    "keepalives": client.keepalives,
+                    "resyncs": client.resyncs,
+                    "busy": client.lock.locked(),
+                    "next_check_in": round(due[id(client)] - now, 1) if id(client) in due else None,
+                }
+                for client in self.manager._connections.values()
+            ],
+        }
+
 
 class ConnectionManager:
     def __init__(self):
         self._connections: Dict[str, TelnetClient] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._connect_locks: Dict[str, asyncio.Lock] = {}
+        self._warmup_tasks: List[asyncio.Task] = []
+        self.warmup: Dict[str, Dict[str, Any]] = {}
+        self.keepalive = KeepaliveScheduler(self)
         # Jangan buat lock/task di sini!
 
+    def breaker(self, host: str) -> CircuitBreaker:
+        if host not in self._breakers:
+            self._breakers[host] = CircuitBreaker(host)
+        return self._breakers[host]
+
+    def breaker_status(self) -> List[Dict[str, Any]]:
+        """Circuit state of every OLT in OLT_OPTIONS plus whether a pooled session is up."""
+        result = []
+        for name, info in OLT_OPTIONS.items():
+            client = self._connections.get(info["ip"])
+            result.append({
+                "olt_name": name,
+                "host": info["ip"],
+                "connected": bool(client and client.writer and not client.writer.is_closing()),
+                **self.breaker(info["ip"]).status(),
+                "warmup": self.warmup.get(name),
+            })
+        return result
+
+    def _alive(self, host: str) -> Optional[TelnetClient]:
+        client = self._connections.get(host)
+        # Cek apakah fisik koneksinya masih hidup
+        if client and client.writer and not client.writer.is_closing():
+            return client
+        # Kalau sudah mati, hapus dari memori
+        self._connections.pop(host, None)
+        return None
+
     async def get_connection(self, host, username, password, is_c600) -> TelnetClient:
         # Cek apakah sudah ada koneksi tersimpan
-        if host in self._connections:
-            client = self._connections[host]
-            # Cek apakah fisik koneksinya masih hidup
-            if client.writer and not client.writer.is_closing():
+        client = self._alive(host)
+        if client:
+            return client
+
+        # OLT down atau sedang di-probe: tolak sekarang, jangan antre di belakang connect yang lambat
+        self.breaker(host).check()
+
+        # Satu proses connect per OLT; pemanggil lain menunggu dan memakai session yang sama
+        if host not in self._connect_locks:
+            self._connect_locks[host] = asyncio.Lock()
+        async with self._connect_locks[host]:
+            client = self._alive(host)
+            if client:
                 return client
-            else:
-                # Kalau sudah mati, hapus dari memori
-                del self._connections[host]
+            return await self._connect(host, username, password, is_c600)
+
+    async def _connect(self, host, username, password, is_c600) -> TelnetClient:
+        # OLT yang sedang down langsung ditolak, tanpa menunggu timeout connect/login
+        breaker = self.breaker(host)
+        breaker.before_connect()
 
         # Buat object baru
         logging.info(f"✨ Membuat session object baru untuk {host}")
         client = TelnetClient(host, username, password, is_c600)
         
         # Konek (Lock akan dibuat otomatis di dalam sini karena property lazy load)
-        await client.connect()
+        try:
+            await client.connect()
+        except asyncio.CancelledError:
+            breaker.abort_probe()
+            raise
+        except Exception as e:
+            breaker.record_failure(e)
+            raise
+        breaker.record_success()
         
         # Simpan ke dictionary global
+        client.pool = self
         self._connections[host] = client
         
-        # Jalankan Keepalive di background (Fire and Forget)
-        asyncio.create_task(self._keepalive_worker(client))
+        # Keepalive dijadwalkan oleh satu scheduler untuk semua session
+        self.keepalive.register(client)
         
         return client
 
-    async def _keepalive_worker(self, client: TelnetClient):
-            """
-            Mengirim Enter setiap 60 detik agar tidak ditendang OLT.
-            VERSI FIX: Tidak melakukan read() agar tidak bentrok dengan main thread.
-            """
+    def discard(self, client: TelnetClient) -> bool:
+        """Drops `client` from the pool if it is still the pooled session of its host."""
+        if self._connections.get(client.host) is client:
+            del self._connections[client.host]
+            return True
+        return False
+
+    @staticmethod
+    async def logout(client: TelnetClient, timeout: float = 5.0) -> None:
+        """Logs out and closes one session; a running command gets `timeout` seconds to finish."""
+        try:
+            await asyncio.wait_for(client.lock.acquire(), timeout=timeout)
+            acquired = True
+        except asyncio.TimeoutError:
+            acquired = False
+        try:
+            if client.writer and not client.writer.is_closing():
+                client.writer.write("exit\n")
+                await asyncio.wait_for(client.writer.drain(), timeout=timeout)
+        except Exception as e:
+            logging.debug(f"Logout {client.host} gagal: {e}")
+        finally:
+            await client.close()
+            if acquired:
+                client.lock.release()
+
+    async def warm_up(self, olt_names: Optional[List[str]] = None, wait: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Opens the pooled session of the given OLTs (default all) concurrently
+        and waits at most `wait` seconds. OLTs still connecting after that keep
+        going in the background and update `self.warmup`, so one unreachable
+        OLT never holds up the startup.
+        """
+        names = [name for name in (olt_names or OLT_OPTIONS) if name in OLT_OPTIONS]
+
+        async def connect(name: str) -> None:
+            info = OLT_OPTIONS[name]
+            entry = self.warmup[name] = {"status": "connecting", "seconds": None, "error": None}
+            started = time.perf_counter()
             try:
-                while True:
-                    await asyncio.sleep(60)
-                    
-                    # 1. Cek jika koneksi sudah mati/diclose manual, hentikan worker
-                    if not client.writer or client.writer.is_closing():
-                        break
-
-                    # 2. Cek idle time (apakah user aktif dalam 50 detik terakhir?)
-                    now = asyncio.get_event_loop().time()
-                    if now - client.last_activity > 50:
-                        
-                        # Gunakan Lock agar tidak menulis saat command lain sedang jalan
-                        if client.lock.locked():
-                            # Jika sedang ada command jalan, kita tidak perlu kirim keepalive
-                            # karena aktivitas itu sendiri sudah mereset timer OLT.
-                            continue
-
-                        async with client.lock:
-                            if client.writer and not client.writer.is_closing():
-                                try:
-                                    # Cukup kirim ENTER saja untuk reset timer OLT
-                                    client.writer.write("\n")
-                                    await client.writer.drain()
-                                    
-                                    # --- HAPUS BAGIAN READ DI SINI ---
-                                    # await client.reader.read(...) <--- INI PENYEBAB CRASH
-                                    # Kita tidak peduli balasan dari keepalive.
-                                    
-                                    # Update last activity agar loop berikutnya menunggu 60 detik lagi
-                                    client.last_activity = asyncio.get_event_loop().time()
-                                    
-                                except Exception as e:
-                                    logging.warning(f"Gagal kirim keepalive: {e}")
-                                    break
+                await self.get_connection(
+                    host=info["ip"],
+                    username=settings.OLT_USERNAME,
+                    password=settings.OLT_PASSWORD,
+                    is_c600=info["c600"]
+                )
+                entry["status"] = "connected"
+            except asyncio.CancelledError:
+                entry["status"] = "cancelled"
+                raise
             except Exception as e:
-                logging.error(f"Keepalive Worker Crash pada {client.host}: {e}")
+                entry.update(status="failed", error=str(e))
+                logging.warning(f"Warm-up {name} gagal: {e}")
+            finally:
+                entry["seconds"] = round(time.perf_counter() - started, 2)
+
+        self._warmup_tasks = [asyncio.create_task(connect(name)) for name in names]
+        if self._warmup_tasks:
+            await asyncio.wait(self._warmup_tasks, timeout=wait)
+        by_status: Dict[str, List[str]] = {}
+        for name in names:
+            by_status.setdefault(self.warmup[name]["status"], []).append(
+                f"{name} ({self.warmup[name]['seconds']}s)" if self.warmup[name]["seconds"] is not None else name
+            )
+        logging.info("🔥 Warm-up OLT: " + "; ".join(f"{status}: {', '.join(items)}" for status, items in by_status.items()))
+        return self.warmup
+
+    async def close_all(self, timeout: float = 5.0) -> None:
+        """Cancels pending warm-ups, stops the keepalive scheduler and logs out of every pooled session."""
+        for task in self._warmup_tasks:
+            task.cancel()
+        await asyncio.gather(*self._warmup_tasks, return_exceptions=True)
+        self._warmup_tasks = []
+        await self.keepalive.stop()
+
+        clients = list(self._connections.values())
+        self._connections.clear()
+        await asyncio.gather(*(self.logout(client, timeout) for client in clients), return_exceptions=True)
+        if clients:
+            logging.info(f"🔌 {len(clients)} session OLT ditutup")
 
 # Global Instance
 olt_manager = ConnectionManager()
\ No newline at end of file
@@ -0,0 +1,107 @@
+# services/data_fiber.py
+
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+import asyncpg
+from fastapi import HTTPException
+
+from core.database import get_pool
+from services.exceltopostgress import TABLE_NAME, fiber_table_ddl, fiber_index_ddl
+
+FIBER_COLUMNS = (
+    "user_pppoe, name, alamat, olt_name, olt_port, onu_sn, "
+    "pppoe_password, interface, onu_id, sheet, paket, updated_at"
+)
+
+
+def _like_escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+class DataFiberRepository:
+    """
+    Read access to the data_fiber table through the shared pool.
+    Queries are built from a fixed set of texts, so asyncpg prepares each
+    one once per pooled connection and reuses it from the statement cache.
+    """
+
+    def __init__(self, pool: asyncpg.Pool, table: str = TABLE_NAME):
+        self.pool = pool
+        self.table = table
+
+    async def ensure_schema(self) -> None:
+        """Create the table and its search indexes (pg_trgm ones are best effort)."""
+        async with self.pool.acquire() as conn:
+            await conn.execute(fiber_table_ddl(self.table))
+            for ddl in fiber_index_ddl(self.table):
+                try:
+                    await conn.execute(ddl)
+                except asyncpg.PostgresError as e:
+                    logging.warning(f"Skipping index DDL ({e.sqlstate}): {ddl}")
+
+    async def list_placements(self) -> List[Dict[str, Any]]:
+        """Where every customer's ONU is supposed to be (for reconciliation)."""
+        rows = await self.pool.fetch(
+            f"SELECT user_pppoe, name, olt_name, olt_port, interface, onu_sn FROM {self.table}"
+        )
+        return [dict(r) for r in rows]
+
+    async def search(
+        self,
+        olt_name: Optional[str] = None,
+        olt_port: Optional[str] = None,
+        onu_sn: Optional[str] = None,
+        name: Optional[str] = None,
+        alamat: Optional[str] = None,
+        fuzzy: bool = False,
+        after: Optional[str] = None,
+        limit: int = 50,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Filtered search with keyset pagination on user_pppoe.
+        `after` is the cursor returned by the previous page; returns
+        (rows, next_cursor).
+        """
+        clauses: List[str] = []
+        args: List[Any] = []
+
+        def add(template: str, value: Any):
+            args.append(value)
+            clauses.append(template.format(f"${len(args)}"))
+
+        if olt_name:
+            add("olt_name = upper({})", olt_name)
+        if olt_port:
+            add("olt_port = {}", olt_port)
+        if onu_sn:
+            add("onu_sn = upper({})", onu_sn)
+        # Substring (ILIKE) or similarity (%) matching, both served by the trigram GIN indexes
+        if name:
+            add("name % {}" if fuzzy else "name ILIKE '%' || {} || '%'", name if fuzzy else _like_escape(name))
+        if alamat:
+            add("alamat % {}" if fuzzy else "alamat ILIKE '%' || {} || '%'", alamat if fuzzy else _like_escape(alamat))
+        if after:
+            add("user_pppoe > {}", after)
+
+        args.append(limit + 1)
+        where = " AND ".join(clauses) or "TRUE"
+        sql = (
+            f"SELECT {FIBER_COLUMNS} FROM {self.table} "
+            f"WHERE {where} ORDER BY user_pppoe LIMIT ${len(args)}"
+        )
+        rows = [dict(r) for r in await self.pool.fetch(sql, *args)]
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = rows[-1]["user_pppoe"]
+        return rows, next_cursor
+
+
+def get_fiber_repository() -> DataFiberRepository:
+    """FastAPI dependency."""
+    try:
+        return DataFiberRepository(get_pool())
+    except ConnectionError as e:
+        raise HTTPException(status_code=503, detail=f"Database unavailable: {e}")
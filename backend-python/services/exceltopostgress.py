@@ -1,17 +1,72 @@
+import io
 import os
+import hashlib
+import logging
 import re
+import time
+import uuid
+import queue
+import itertools
+import threading
+import zipfile
+import multiprocessing as mp
 import datetime as dt
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, Callable, Iterator, Optional
+import openpyxl
 import pandas as pd
 import psycopg2
+from xml.etree import ElementTree
 from psycopg2.extras import execute_batch
 
+from core.database import connection_params
+
 # --- Configuration ---
-POSTGRES_URI = os.getenv(
-    "POSTGRES_URI",
-    "dbname=data user=root password=Noclex1965 host=localhost port=5435"
-)
+# Connection comes from the DB_* settings (core.database.connection_params), like the asyncpg pool
 TABLE_NAME  = os.getenv("POSTGRES_TABLE", "data_fiber")
 BATCH_SIZE  = int(os.getenv("BATCH_SIZE", "1000"))
+STAGING_TABLE = f"{TABLE_NAME}_staging"
+SHEET_HASH_TABLE = f"{TABLE_NAME}_sheet_hash"
+
+# Max entries per list in the import change summary (counts are always complete)
+CHANGE_LIST_LIMIT = int(os.getenv("CHANGE_LIST_LIMIT", "500"))
+# Max batches buffered between the sheet reader and the DB writer in streaming mode
+STREAM_QUEUE_SIZE = int(os.getenv("STREAM_QUEUE_SIZE", "4"))
+# Processes used to parse sheets in parallel (1 = parse in-process)
+SHEET_WORKERS = int(os.getenv("SHEET_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+
+def fiber_table_ddl(table: str = TABLE_NAME) -> str:
+    return f"""
+    CREATE TABLE IF NOT EXISTS {table} (
+        user_pppoe TEXT PRIMARY KEY,
+        name TEXT,
+        alamat TEXT,
+        olt_name TEXT,
+        olt_port TEXT,
+        onu_sn TEXT,
+        pppoe_password TEXT,
+        interface TEXT,
+        onu_id TEXT,
+        sheet TEXT,
+        paket TEXT,
+        updated_at TIMESTAMP
+    );
+    """
+
+
+def fiber_index_ddl(table: str = TABLE_NAME) -> list[str]:
+    """
+    Indexes behind the /customer/fiber search. The pg_trgm statements may
+    fail without the extension; callers treat each statement independently.
+    """
+    return [
+        f"CREATE INDEX IF NOT EXISTS {table}_onu_sn_idx ON {table} (onu_sn);",
+        f"CREATE INDEX IF NOT EXISTS {table}_olt_port_onu_idx ON {table} (olt_name, olt_port, onu_id);",
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm;",
+        f"CREATE INDEX IF NOT EXISTS {table}_name_trgm_idx ON {table} USING gin (name gin_trgm_ops);",
+        f"CREATE INDEX IF NOT EXISTS {table}_alamat_trgm_idx ON {table} USING gin (alamat gin_trgm_ops);",
+    ]
 
 
 class ExcelHandler:
@@ -43,10 +98,31 @@ class ExcelHandler:
             return n.upper(), None
         return m.group("olt").strip().upper(), m.group("port").strip()
 
+    # Column order shared by the record tuples and the upsert statement.
+    COLUMNS = (
+        "user_pppoe", "name", "alamat", "olt_name", "olt_port", "onu_sn",
+        "pppoe_password", "interface", "onu_id", "sheet", "paket", "updated_at",
+    )
+    # Fields whose change makes a row worth rewriting (and bumping updated_at)
+    FINGERPRINT_FIELDS = (
+        "name", "alamat", "olt_name", "olt_port", "onu_sn",
+        "pppoe_password", "interface", "onu_id", "paket",
+    )
+
     @staticmethod
-    def norm_cols(df: pd.DataFrame) -> pd.DataFrame:
-        """Normalize column names to lowercase stripped strings."""
-        return df.rename(columns=lambda c: str(c).strip().lower() if c else "")
+    def norm_cols(columns) -> list[str]:
+        """Normalize column names to lowercase stripped strings, de-duplicated like pandas does."""
+        seen: dict[str, int] = {}
+        names = []
+        for c in columns:
+            name = str(c).strip().lower() if c else ""
+            if name in seen:
+                seen[name] += 1
+                name = f"{name}.{seen[name]}"
+            else:
+                seen[name] = 0
+            names.append(name)
+        return names
 
     @staticmethod
     def pick(df: pd.DataFrame, keys: list[str]) -> str | None:
@@ -56,100 +132,372 @@ class ExcelHandler:
                 return k
         return None
 
+    @staticmethod
+    def find_header_row(raw: pd.DataFrame, max_rows: int = 20) -> int:
+        """Return the index of the header row within the first rows, or -1."""
+        head = raw.head(max_rows).fillna("").astype(str)
+        row_strs = head.agg(" ".join, axis=1).str.lower()
+        # Heuristic: Header row must contain 'nama' and either 'pppoe' or 'alamat'
+        hits = row_strs.str.contains("nama", regex=False) & (
+            row_strs.str.contains("pppoe", regex=False) | row_strs.str.contains("alamat", regex=False)
+        )
+        return int(hits.values.argmax()) if hits.any() else -1
+
+    @staticmethod
+    def _blank_to_none(s: pd.Series) -> pd.Series:
+        return s.astype(object).where(s != "", None)
+
     @classmethod
-    def docs_from_sheet(cls, xl: pd.ExcelFile, sheet: str):
-        olt_name, olt_port = cls.parse_sheet_name(sheet)
-        if not olt_name:
-            return
+    def records_from_sheet(cls, xl: pd.ExcelFile, sheet: str, warnings: list[str] | None = None) -> list[tuple]:
+        """Parse one sheet once and return record tuples in `COLUMNS` order."""
+        return list(zip(*cls.columns_from_sheet(xl, sheet, warnings)))
+
+    @classmethod
+    def columns_from_sheet(cls, xl: pd.ExcelFile, sheet: str, warnings: list[str] | None = None) -> list[list]:
+        """Parse one sheet once and return one list per column in `COLUMNS` order."""
+        warnings = warnings if warnings is not None else []
+        if not cls.parse_sheet_name(sheet)[0]:
+            return []
+        raw = cls.read_raw_sheet(xl, sheet, warnings)
+        if raw is None:
+            return []
+        return cls.columns_from_raw(raw, sheet, warnings)
 
+    @staticmethod
+    def read_raw_sheet(xl: pd.ExcelFile, sheet: str, warnings: list[str]) -> pd.DataFrame | None:
         try:
-            # 1. Detect Header Row
-            temp_df = xl.parse(sheet, header=None)
-            header_row_index = -1
-
-            for i, row in temp_df.head(20).iterrows():
-                row_str = ' '.join(str(s).lower() for s in row.dropna())
-                # Heuristic: Header row must contain 'nama' and either 'pppoe' or 'alamat'
-                if "nama" in row_str and ("pppoe" in row_str or "alamat" in row_str):
-                    header_row_index = i
-                    break
+            # Single parse; the header row is sliced out in memory
+            return xl.parse(sheet, header=None, dtype=str)
+        except Exception as e:
+            warnings.append(f"Error reading '{sheet}': {e}")
+            return None
 
-            if header_row_index == -1:
-                print(f"[WARN] Could not find valid header in '{sheet}'. Skipping.")
-                return
+    @staticmethod
+    def sheet_content_hash(raw: pd.DataFrame) -> str:
+        """Content hash of a raw (header=None) sheet, computed with vectorized row hashing."""
+        row_hashes = pd.util.hash_pandas_object(raw.fillna(""), index=False)
+        return hashlib.sha1(f"{raw.shape}".encode() + row_hashes.values.tobytes()).hexdigest()
 
-            # 2. Parse Actual Data
-            df = xl.parse(sheet, header=header_row_index, dtype=str).fillna("")
+    @classmethod
+    def columns_from_raw(cls, raw: pd.DataFrame, sheet: str, warnings: list[str]) -> list[list]:
+        olt_name, olt_port = cls.parse_sheet_name(sheet)
 
-        except Exception as e:
-            print(f"[WARN] Error reading '{sheet}': {e}")
-            return
+        # Detect Header Row
+        header_row_index = cls.find_header_row(raw)
+        if header_row_index == -1:
+            warnings.append(f"Could not find valid header in '{sheet}'. Skipping.")
+            return []
 
-        df = cls.norm_cols(df)
+        df = raw.iloc[header_row_index + 1:].fillna("")
+        df.columns = cls.norm_cols(raw.iloc[header_row_index].fillna("").tolist())
         cols = {k: cls.pick(df, v) for k, v in cls.CANDIDATE_COLS.items()}
 
         # Validation: Must have Name + (PPPoE OR Address)
         required_ok = (cols["name"] and (cols["pppoe"] or cols["address"]))
         if not required_ok:
+            warnings.append(f"Missing name/pppoe/alamat columns in '{sheet}'. Skipping.")
+            return []
+
+        return cls.frame_columns(df, cols, olt_name, olt_port, sheet)
+
+    @classmethod
+    def frame_records(cls, df: pd.DataFrame, cols: dict, olt_name: str, olt_port: str | None, sheet: str) -> list[tuple]:
+        """Turn a frame of string cells (normalized columns) into record tuples."""
+        return list(zip(*cls.frame_columns(df, cols, olt_name, olt_port, sheet)))
+
+    @classmethod
+    def frame_columns(cls, df: pd.DataFrame, cols: dict, olt_name: str, olt_port: str | None, sheet: str) -> list[list]:
+        """Turn a frame of string cells (normalized columns) into column lists in `COLUMNS` order."""
+        empty = pd.Series("", index=df.index, dtype=object)
+
+        def col(key: str) -> pd.Series:
+            return df[cols[key]].astype(str).str.strip() if cols[key] else empty
+
+        # Vectorized column ops; skip empty rows
+        name, pppoe, addr = col("name"), col("pppoe"), col("address")
+        keep = (name != "") | (pppoe != "") | (addr != "")
+        if not keep.any():
+            return []
+        name, pppoe, addr = name[keep], pppoe[keep], addr[keep]
+        paket = col("paket")[keep]
+        onu_port = col("onu_port")[keep]
+        onu_sn = col("onu_sn")[keep].str.upper()
+        password = col("password")[keep]
+
+        # Handle interface splitting (e.g., "1/1/1:5")
+        parts = onu_port.str.partition(":")
+        has_onu_id = parts[1] == ":"
+        final_olt_port = parts[0].astype(object).where(has_onu_id, olt_port)
+        onu_id = parts[2].astype(object).where(has_onu_id, None)
+
+        n = len(name)
+        updated_at = dt.datetime.utcnow()
+        return [
+            pppoe.tolist(),
+            name.tolist(),
+            addr.tolist(),
+            [olt_name] * n,
+            final_olt_port.tolist(),
+            cls._blank_to_none(onu_sn).tolist(),
+            cls._blank_to_none(password).tolist(),
+            cls._blank_to_none(onu_port).tolist(),
+            onu_id.tolist(),
+            [sheet] * n,
+            paket.tolist(),
+            [updated_at] * n,
+        ]
+
+    @classmethod
+    def parse_sheet_report(cls, xl: pd.ExcelFile, sheet: str, known_hash: str | None = None) -> dict:
+        """
+        Parse one sheet and report its column arrays, row count, timing and warnings.
+        When the sheet's content hash equals `known_hash` the sheet is marked
+        unchanged and no columns are built.
+        """
+        start = time.perf_counter()
+        warnings: list[str] = []
+        report = {"sheet": sheet, "rows": 0, "unchanged": False, "content_hash": None, "warnings": warnings, "columns": []}
+
+        raw = cls.read_raw_sheet(xl, sheet, warnings) if cls.parse_sheet_name(sheet)[0] else None
+        if raw is not None:
+            report["content_hash"] = cls.sheet_content_hash(raw)
+            if report["content_hash"] == known_hash:
+                report["unchanged"] = True
+            else:
+                report["columns"] = cls.columns_from_raw(raw, sheet, warnings)
+                report["rows"] = len(report["columns"][0]) if report["columns"] else 0
+
+        report["seconds"] = round(time.perf_counter() - start, 3)
+        return report
+
+    @staticmethod
+    def sheet_names(data: bytes) -> list[str]:
+        """
+        Sheet names in workbook order, read from xl/workbook.xml only: no
+        shared strings and no sheet XML are parsed.
+        """
+        try:
+            with zipfile.ZipFile(io.BytesIO(data)) as zf:
+                root = ElementTree.fromstring(zf.read("xl/workbook.xml"))
+            return [el.get("name") for el in root.iter() if el.tag.rsplit("}", 1)[-1] == "sheet"]
+        except (zipfile.BadZipFile, KeyError, ElementTree.ParseError):
+            # Not a plain xlsx package: let the full reader deal with it
+            return pd.ExcelFile(io.BytesIO(data)).sheet_names
+
+    @classmethod
+    def parse_sheets(cls, data: bytes, sheet_names: list[str], known_hashes: dict | None = None) -> Iterator[dict]:
+        """
+        Parse sheets in a process pool (each OLT/port sheet is independent).
+        Reports are yielded in workbook order so duplicate pppoe rows resolve
+        the same way as a serial import. Every worker opens the workbook once
+        (read-only) and only parses the sheets it is handed.
+        """
+        known_hashes = known_hashes or {}
+        hashes = [known_hashes.get(sheet) for sheet in sheet_names]
+        workers = min(SHEET_WORKERS, len(sheet_names))
+        if workers <= 1:
+            xl = pd.ExcelFile(io.BytesIO(data))
+            for sheet, known_hash in zip(sheet_names, hashes):
+                yield cls.parse_sheet_report(xl, sheet, known_hash)
             return
 
-        # 3. Yield Rows
-        for _, r in df.iterrows():
-            name = r.get(cols["name"], "").strip() if cols["name"] else ""
-            pppoe = r.get(cols["pppoe"], "").strip() if cols["pppoe"] else ""
-            addr = r.get(cols["address"], "").strip() if cols["address"] else ""
-            paket = r.get(cols["paket"], "").strip() if cols["paket"] else ""
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=mp.get_context("spawn"),
+            initializer=_init_sheet_worker,
+            initargs=(data,),
+        ) as pool:
+            yield from pool.map(_parse_sheet_worker, sheet_names, hashes)
 
-            # Skip empty rows
-            if not (name or pppoe or addr):
-                continue
+    @staticmethod
+    def _cell_str(v) -> str:
+        """Stringify an openpyxl cell value the same way a dtype=str pandas parse does."""
+        if v is None:
+            return ""
+        if isinstance(v, float) and v.is_integer():
+            return str(int(v))
+        return str(v)
 
-            onu_port_val = (r.get(cols["onu_port"], "").strip() if cols["onu_port"] else None) or None
-            final_olt_port = olt_port
-            onu_id_val = None
-
-            # Handle interface splitting (e.g., "1/1/1:5")
-            if onu_port_val and ":" in onu_port_val:
-                parts = onu_port_val.split(':', 1)
-                final_olt_port = parts[0]
-                if len(parts) > 1:
-                    onu_id_val = parts[1]
-
-            yield {
-                "user_pppoe": pppoe,
-                "name": name,
-                "alamat": addr,
-                "olt_name": olt_name,
-                "olt_port": final_olt_port,
-                "onu_sn": (r.get(cols["onu_sn"], "").strip().upper() if cols["onu_sn"] else None) or None,
-                "pppoe_password": (r.get(cols["password"], "").strip() if cols["password"] else None) or None,
-                "interface": onu_port_val,
-                "onu_id": onu_id_val,
-                "sheet": sheet,
-                "paket": paket,
-                "updated_at": dt.datetime.utcnow(),
-            }
+    @classmethod
+    def stream_batches(
+        cls, path: str, batch_size: int = BATCH_SIZE, progress: Optional[Callable[[dict], None]] = None
+    ) -> Iterator[list[tuple]]:
+        """
+        Yield record batches from an .xlsx using openpyxl read_only iteration,
+        so at most one batch of rows per sheet is materialized at a time.
+        """
+        wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+        rows_read = 0
+        try:
+            sheet_names = wb.sheetnames
+            for sheet_index, sheet in enumerate(sheet_names, 1):
+                if progress:
+                    progress({"event": "sheet", "sheet": sheet, "sheet_index": sheet_index, "sheet_count": len(sheet_names)})
+
+                olt_name, olt_port = cls.parse_sheet_name(sheet)
+                if not olt_name:
+                    continue
+
+                rows = wb[sheet].iter_rows(values_only=True)
+                head = [[cls._cell_str(v) for v in r] for r in itertools.islice(rows, 20)]
+                header_row_index = cls.find_header_row(pd.DataFrame(head)) if head else -1
+                if header_row_index == -1:
+                    if progress:
+                        progress({"event": "warning", "warning": f"Could not find valid header in '{sheet}'. Skipping."})
+                    continue
+
+                header = cls.norm_cols(head[header_row_index])
+                cols = {k: cls.pick(pd.DataFrame(columns=header), v) for k, v in cls.CANDIDATE_COLS.items()}
+                if not (cols["name"] and (cols["pppoe"] or cols["address"])):
+                    if progress:
+                        progress({"event": "warning", "warning": f"Missing name/pppoe/alamat columns in '{sheet}'. Skipping."})
+                    continue
+
+                width = len(header)
+                data_rows = itertools.chain(
+                    head[header_row_index + 1:],
+                    ([cls._cell_str(v) for v in r] for r in rows),
+                )
+                while True:
+                    batch = [(r + [""] * width)[:width] for r in itertools.islice(data_rows, batch_size)]
+                    if not batch:
+                        break
+                    rows_read += len(batch)
+                    records = cls.frame_records(pd.DataFrame(batch, columns=header), cols, olt_name, olt_port, sheet)
+                    if progress:
+                        progress({"event": "read", "sheet": sheet, "rows_read": rows_read})
+                    if records:
+                        yield records
+        finally:
+            wb.close()
 
     @staticmethod
     def init_db(cur):
-        """Create table if it doesn't exist."""
+        """Create table and search indexes if they don't exist."""
+        cur.execute(fiber_table_ddl())
+        for ddl in fiber_index_ddl():
+            cur.execute("SAVEPOINT fiber_index;")
+            try:
+                cur.execute(ddl)
+                cur.execute("RELEASE SAVEPOINT fiber_index;")
+            except psycopg2.Error as e:
+                cur.execute("ROLLBACK TO SAVEPOINT fiber_index;")
+                logging.warning(f"Skipping index DDL ({e.pgcode}): {ddl}")
+
+    @staticmethod
+    def init_sheet_hashes(cur):
+        """Create the per-sheet content hash table if it doesn't exist."""
         cur.execute(f"""
-        CREATE TABLE IF NOT EXISTS {TABLE_NAME} (
-            user_pppoe TEXT PRIMARY KEY,
-            name TEXT,
-            alamat TEXT,
-            olt_name TEXT,
-            olt_port TEXT,
-            onu_sn TEXT,
-            pppoe_password TEXT,
-            interface TEXT,
-            onu_id TEXT,
-            sheet TEXT,
-            paket TEXT,
+        CREATE TABLE IF NOT EXISTS {SHEET_HASH_TABLE} (
+            sheet TEXT PRIMARY KEY,
+            content_hash TEXT NOT NULL,
+            row_count INTEGER,
             updated_at TIMESTAMP
         );
         """)
 
+    @staticmethod
+    def load_sheet_hashes(cur) -> dict:
+        cur.execute(f"SELECT sheet, content_hash FROM {SHEET_HASH_TABLE};")
+        return dict(cur.fetchall())
+
+    @staticmethod
+    def save_sheet_hashes(cur, reports: list[dict]):
+        """Remember the content hash of every sheet that was (re)imported."""
+        rows = [
+            (r["sheet"], r["content_hash"], r["rows"], dt.datetime.utcnow())
+            for r in reports if r["content_hash"] and not r["unchanged"]
+        ]
+        if not rows:
+            return
+        execute_batch(cur, f"""
+        INSERT INTO {SHEET_HASH_TABLE} (sheet, content_hash, row_count, updated_at)
+        VALUES (%s, %s, %s, %s)
+        ON CONFLICT (sheet) DO UPDATE SET
+            content_hash = EXCLUDED.content_hash,
+            row_count = EXCLUDED.row_count,
+            updated_at = EXCLUDED.updated_at;
+        """, rows)
+
+    @staticmethod
+    def row_fingerprint(row: tuple) -> str:
+        """Fingerprint of a row's business fields (`FINGERPRINT_FIELDS`, in order)."""
+        joined = "\x1f".join("" if v is None else str(v) for v in row)
+        return hashlib.blake2b(joined.encode(), digest_size=16).hexdigest()
+
+    @classmethod
+    def changed_rows(
+        cls, cur, rows: list[tuple], changes: dict,
+        sheet_order: dict | None = None, skipped_sheets: set | None = None,
+    ) -> list[tuple]:
+        """
+        Drop rows whose business fields match what is already stored and
+        record new customers, moved ports and SN swaps into `changes`.
+        `rows` must cover every parsed sheet. A stored row that came from a
+        sheet skipped by hash (`skipped_sheets`) and sits later in the
+        workbook (`sheet_order`) still wins over an incoming row.
+        """
+        if not rows:
+            return []
+
+        idx = {c: i for i, c in enumerate(cls.COLUMNS)}
+        fp_idx = [idx[c] for c in cls.FINGERPRINT_FIELDS]
+        sheet_order = sheet_order or {}
+        skipped_sheets = skipped_sheets or set()
+
+        # Last occurrence of a pppoe wins, like the upsert itself
+        latest = {row[0]: row for row in rows}
+        cur.execute(
+            f"SELECT user_pppoe, sheet, {', '.join(cls.FINGERPRINT_FIELDS)} FROM {TABLE_NAME} WHERE user_pppoe = ANY(%s);",
+            (list(latest),),
+        )
+        existing = {r[0]: (r[1], r[2:]) for r in cur.fetchall()}
+
+        changed = []
+        for pppoe, row in latest.items():
+            stored = existing.get(pppoe)
+            if stored is None:
+                changes["new_customers"].append({
+                    "user_pppoe": pppoe, "name": row[idx["name"]],
+                    "olt_name": row[idx["olt_name"]], "interface": row[idx["interface"]],
+                })
+                changed.append(row)
+                continue
+
+            sheet, old = stored
+            if sheet in skipped_sheets and sheet_order.get(sheet, -1) > sheet_order.get(row[idx["sheet"]], -1):
+                continue  # a later sheet that was not re-parsed already holds this pppoe
+            if cls.row_fingerprint(old) == cls.row_fingerprint(tuple(row[i] for i in fp_idx)):
+                continue
+            changed.append(row)
+
+            prev = dict(zip(cls.FINGERPRINT_FIELDS, old))
+            old_place = (prev["olt_name"], prev["olt_port"], prev["interface"])
+            new_place = (row[idx["olt_name"]], row[idx["olt_port"]], row[idx["interface"]])
+            if old_place != new_place:
+                changes["moved_ports"].append({
+                    "user_pppoe": pppoe, "name": row[idx["name"]],
+                    "from": f"{old_place[0]} {old_place[2] or old_place[1]}",
+                    "to": f"{new_place[0]} {new_place[2] or new_place[1]}",
+                })
+            if prev["onu_sn"] and prev["onu_sn"] != row[idx["onu_sn"]]:
+                changes["sn_swaps"].append({
+                    "user_pppoe": pppoe, "name": row[idx["name"]],
+                    "old_sn": prev["onu_sn"], "new_sn": row[idx["onu_sn"]],
+                })
+
+        changes["rows_changed"] += len(changed)
+        changes["rows_unchanged"] += len(latest) - len(changed)
+        return changed
+
+    @staticmethod
+    def summarize_changes(changes: dict) -> dict:
+        summary = {"rows_changed": changes["rows_changed"], "rows_unchanged": changes["rows_unchanged"]}
+        for key in ("new_customers", "moved_ports", "sn_swaps"):
+            summary[f"{key}_count"] = len(changes[key])
+            summary[key] = changes[key][:CHANGE_LIST_LIMIT]
+        return summary
+
     @staticmethod
     def upsert_rows(cur, rows):
         """Batch upsert into Postgres."""
@@ -180,49 +528,169 @@ class ExcelHandler:
         """
         execute_batch(cur, sql, rows, page_size=1000)
 
+    @staticmethod
+    def _copy_value(v) -> str:
+        """Encode one value for COPY ... FROM STDIN (text format)."""
+        if v is None:
+            return r"\N"
+        if isinstance(v, dt.datetime):
+            return v.isoformat()
+        return (
+            str(v).replace("\\", "\\\\").replace("\t", "\\t")
+            .replace("\n", "\\n").replace("\r", "\\r")
+        )
+
+    @classmethod
+    def init_staging(cls, cur):
+        """Create (once) and empty the unlogged staging table used by the bulk mode."""
+        cols = ",\n            ".join(f"{c} TEXT" for c in cls.COLUMNS if c != "updated_at")
+        cur.execute(f"""
+        CREATE UNLOGGED TABLE IF NOT EXISTS {STAGING_TABLE} (
+            seq BIGSERIAL,
+            {cols},
+            updated_at TIMESTAMP
+        );
+        """)
+        # Serialize concurrent bulk imports; released on commit/rollback
+        cur.execute(f"LOCK TABLE {STAGING_TABLE} IN EXCLUSIVE MODE;")
+        cur.execute(f"TRUNCATE {STAGING_TABLE} RESTART IDENTITY;")
+
+    @classmethod
+    def copy_rows(cls, cur, rows):
+        """Stream record tuples into the staging table with COPY."""
+        if not rows:
+            return
+        buf = io.StringIO()
+        for row in rows:
+            buf.write("\t".join(cls._copy_value(v) for v in row))
+            buf.write("\n")
+        buf.seek(0)
+        cur.copy_expert(
+            f"COPY {STAGING_TABLE} ({', '.join(cls.COLUMNS)}) FROM STDIN",
+            buf,
+        )
+
     @classmethod
-    def process_file(cls, file_obj) -> int:
-        """Main entry point: reads file object, writes to DB, returns row count."""
+    def merge_staging(cls, cur) -> dict:
+        """
+        One set-based upsert from staging into the target table.
+        Rows whose business fields are identical are left untouched.
+        Returns inserted / updated / unchanged counts.
+        """
+        cols = ", ".join(cls.COLUMNS)
+        fields = [c for c in cls.COLUMNS if c not in ("user_pppoe", "updated_at")]
+        set_clause = ",\n            ".join(f"{c} = EXCLUDED.{c}" for c in fields + ["updated_at"])
+        current = ", ".join(f"{TABLE_NAME}.{c}" for c in fields)
+        incoming = ", ".join(f"EXCLUDED.{c}" for c in fields)
+
+        # DISTINCT ON keeps the last occurrence of a duplicated pppoe, like the batch path
+        cur.execute(f"""
+        WITH latest AS (
+            SELECT DISTINCT ON (user_pppoe) {cols}
+            FROM {STAGING_TABLE}
+            ORDER BY user_pppoe, seq DESC
+        ),
+        upserted AS (
+            INSERT INTO {TABLE_NAME} ({cols})
+            SELECT {cols} FROM latest
+            ON CONFLICT (user_pppoe)
+            DO UPDATE SET
+            {set_clause}
+            WHERE ({current}) IS DISTINCT FROM ({incoming})
+            RETURNING (xmax = 0) AS inserted
+        )
+        SELECT
+            (SELECT count(*) FROM latest),
+            count(*) FILTER (WHERE inserted),
+            count(*) FILTER (WHERE NOT inserted)
+        FROM upserted;
+        """)
+        staged, inserted, updated = cur.fetchone()
+        cur.execute(f"TRUNCATE {STAGING_TABLE};")
+        return {
+            "inserted": inserted,
+            "updated": updated,
+            "unchanged": staged - inserted - updated,
+        }
+
+    @classmethod
+    def process_file(cls, file_obj, bulk: bool = False, force: bool = False) -> dict:
+        """
+        Main entry point: reads file object, writes to DB, returns row stats
+        plus a per-sheet report (rows, parse seconds, warnings).
+        Sheets are parsed in parallel; this process is the single DB writer.
+        Sheets whose content hash is unchanged since the last import are
+        skipped. Rows of all other sheets are collected first (the last
+        occurrence of a pppoe wins) and diffed against the table once, so
+        only rows whose business fields changed are written (`force=True`
+        rewrites everything).
+        With `bulk=True` rows are COPY-ed into a staging table and merged in a
+        single statement, which also reports inserted/updated/unchanged counts.
+        """
         try:
-            conn = psycopg2.connect(POSTGRES_URI)
+            conn = psycopg2.connect(**connection_params())
             cur = conn.cursor()
             
             # 1. Init DB
             cls.init_db(cur)
+            cls.init_sheet_hashes(cur)
             conn.commit()
+            known_hashes = {} if force else cls.load_sheet_hashes(cur)
+            if bulk:
+                cls.init_staging(cur)
 
             # 2. Parse Excel
-            # Using file_obj directly works if it's a binary file-like object
-            xl = pd.ExcelFile(file_obj)
-            sheet_count = len(xl.sheet_names)
-            print(f"Processing {sheet_count} sheets...")
-
-            rows_buffer = []
-            total_upserted = 0
-
-            for sheet in xl.sheet_names:
-                for doc in cls.docs_from_sheet(xl, sheet) or []:
-                    rows_buffer.append((
-                        doc["user_pppoe"], doc["name"], doc["alamat"], doc["olt_name"],
-                        doc["olt_port"], doc["onu_sn"], doc["pppoe_password"], doc["interface"],
-                        doc["onu_id"], doc["sheet"], doc["paket"], doc["updated_at"]
-                    ))
-
-                    if len(rows_buffer) >= BATCH_SIZE:
-                        cls.upsert_rows(cur, rows_buffer)
-                        total_upserted += len(rows_buffer)
-                        rows_buffer.clear()
-                        conn.commit()
-
-            # 3. Flush remaining rows
-            if rows_buffer:
-                cls.upsert_rows(cur, rows_buffer)
-                total_upserted += len(rows_buffer)
-                conn.commit()
+            data = file_obj.read()
+            sheet_names = cls.sheet_names(data)
+
+            latest = {}  # pppoe -> row; a later sheet overrides an earlier one
+            total_parsed = 0
+            sheets = []
+            changes = {"rows_changed": 0, "rows_unchanged": 0, "new_customers": [], "moved_ports": [], "sn_swaps": []}
+
+            for report in cls.parse_sheets(data, sheet_names, known_hashes):
+                rows = list(zip(*report.pop("columns")))
+                total_parsed += len(rows)
+                latest.update((row[0], row) for row in rows)
+                sheets.append(report)
+
+            # 3. Diff once against the table, then write
+            start = time.perf_counter()
+            rows = list(latest.values())
+            if not force:
+                rows = cls.changed_rows(
+                    cur, rows, changes,
+                    sheet_order={sheet: i for i, sheet in enumerate(sheet_names)},
+                    skipped_sheets={r["sheet"] for r in sheets if r["unchanged"]},
+                )
+
+            if bulk:
+                cls.copy_rows(cur, rows)
+            else:
+                for i in range(0, len(rows), BATCH_SIZE):
+                    cls.upsert_rows(cur, rows[i:i + BATCH_SIZE])
+                    conn.commit()
+
+            stats = cls.merge_staging(cur) if bulk else {}
+            if bulk and not force:
+                # Unchanged rows never reach staging; the diff is the one source for that count
+                stats["unchanged"] = changes["rows_unchanged"]
+            cls.save_sheet_hashes(cur, sheets)
+            conn.commit()
 
             cur.close()
             conn.close()
-            return total_upserted
+            return {
+                "rows_processed": total_parsed,
+                "rows_written": len(rows),
+                "write_seconds": round(time.perf_counter() - start, 3),
+                **stats,
+                "sheet_count": len(sheet_names),
+                "sheets_skipped": sum(1 for r in sheets if r["unchanged"]),
+                "sheets": sheets,
+                "warnings": [w for report in sheets for w in report["warnings"]],
+                "changes": None if force else cls.summarize_changes(changes),
+            }
 
         except Exception as e:
             # Clean up connection if it exists
@@ -230,4 +698,154 @@ class ExcelHandler:
             if 'conn' in locals() and conn: conn.close()
             raise e
 
+    @classmethod
+    def process_stream(cls, path: str, bulk: bool = False, progress: Optional[Callable[[dict], None]] = None) -> dict:
+        """
+        Memory-bounded import: a reader thread parses the workbook batch by batch
+        and hands batches to this (writer) thread through a bounded queue.
+        """
+        batches: queue.Queue = queue.Queue(maxsize=STREAM_QUEUE_SIZE)
+        done = object()
+
+        def _reader():
+            try:
+                for records in cls.stream_batches(path, progress=progress):
+                    batches.put(records)
+            except Exception as e:
+                batches.put(e)
+            finally:
+                batches.put(done)
+
+        try:
+            conn = psycopg2.connect(**connection_params())
+            cur = conn.cursor()
+
+            cls.init_db(cur)
+            conn.commit()
+            if bulk:
+                cls.init_staging(cur)
+
+            threading.Thread(target=_reader, daemon=True).start()
+
+            total_written = 0
+            while (records := batches.get()) is not done:
+                if isinstance(records, Exception):
+                    raise records
+                if bulk:
+                    cls.copy_rows(cur, records)
+                else:
+                    cls.upsert_rows(cur, records)
+                    conn.commit()
+                total_written += len(records)
+                if progress:
+                    progress({"event": "write", "rows_written": total_written})
+
+            stats = cls.merge_staging(cur) if bulk else {}
+            if bulk and not force:
+                # Unchanged rows never reach staging; the diff is the one source for that count
+                stats["unchanged"] = changes["rows_unchanged"]
+            conn.commit()
+
+            cur.close()
+            conn.close()
+            return {"rows_processed": total_written, **stats}
+
+        except Exception as e:
+            if 'cur' in locals() and cur: cur.close()
+            if 'conn' in locals() and conn: conn.close()
+            raise e
+
+
+# Per-process workbook for the sheet-parsing pool, loaded once by the initializer
+_worker_xl: pd.ExcelFile | None = None
+
+
+def _init_sheet_worker(data: bytes) -> None:
+    global _worker_xl
+    _worker_xl = pd.ExcelFile(io.BytesIO(data))
+
+
+def _parse_sheet_worker(sheet: str, known_hash: str | None = None) -> dict:
+    return ExcelHandler.parse_sheet_report(_worker_xl, sheet, known_hash)
+
+
+def _run_import_job(path: str, bulk: bool, events) -> None:
+    """Worker-process entry point; reports progress through `events`."""
+    try:
+        result = ExcelHandler.process_stream(path, bulk=bulk, progress=events.put)
+        events.put({"event": "done", "result": result})
+    except Exception as e:
+        events.put({"event": "error", "error": str(e)})
+
+
+class ImportJobManager:
+    """
+    Runs streaming Excel imports in a separate process and keeps their
+    progress (current sheet, rows read/written) for the status endpoint.
+    """
+
+    def __init__(self):
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+
+    def submit(self, path: str, bulk: bool = False, filename: str | None = None) -> str:
+        job_id = uuid.uuid4().hex
+        ctx = mp.get_context("spawn")
+        events = ctx.Queue()
+        proc = ctx.Process(target=_run_import_job, args=(path, bulk, events), daemon=True)
+
+        self._jobs[job_id] = {
+            "job_id": job_id,
+            "filename": filename,
+            "status": "running",
+            "sheet": None,
+            "sheet_index": 0,
+            "sheet_count": 0,
+            "rows_read": 0,
+            "rows_written": 0,
+            "warnings": [],
+            "result": None,
+            "error": None,
+            "started_at": dt.datetime.utcnow(),
+            "finished_at": None,
+        }
+        proc.start()
+        threading.Thread(target=self._pump, args=(job_id, proc, events, path), daemon=True).start()
+        return job_id
+
+    def _pump(self, job_id: str, proc, events, path: str) -> None:
+        """Fold worker events into the job record until the worker finishes."""
+        job = self._jobs[job_id]
+        while True:
+            try:
+                event = events.get(timeout=1)
+            except queue.Empty:
+                if not proc.is_alive():
+                    job.update(status="error", error=f"Import worker exited with code {proc.exitcode}")
+                    break
+                continue
+
+            kind = event.pop("event")
+            if kind == "done":
+                job.update(status="success", result=event["result"])
+                break
+            if kind == "error":
+                job.update(status="error", error=event["error"])
+                break
+            if kind == "warning":
+                job["warnings"].append(event["warning"])
+                continue
+            job.update(event)
+
+        job["finished_at"] = dt.datetime.utcnow()
+        proc.join(timeout=5)
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self._jobs.get(job_id)
+
 
+# Global Instance
+import_jobs = ImportJobManager()
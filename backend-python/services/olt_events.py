@@ -0,0 +1,144 @@
+# services/olt_events.py
+
+import asyncio
+import datetime as dt
+import logging
+import re
+from typing import Any, Dict, Optional, Set, Tuple
+
+from core.config import settings
+from core.olt_config import OLT_OPTIONS
+from services.outage import outage_engine
+
+ONLINE = "online"
+OFFLINE = "offline"
+LOS = "los"
+DYING_GASP = "dying_gasp"
+
+# Compiled once; checked in this order, first hit wins
+_ONU_RE = re.compile(r"gpon[-_]onu[-_](\d+/\d+/\d+):(\d+)", re.IGNORECASE)
+_EVENT_PATTERNS = (
+    (DYING_GASP, re.compile(r"dying[\s_-]*gasp", re.IGNORECASE)),
+    (LOS, re.compile(r"\bLOSi?\b|loss of (?:signal|frame)", re.IGNORECASE)),
+    (OFFLINE, re.compile(r"off-?line|\bonu\s+down\b|deregist", re.IGNORECASE)),
+    (ONLINE, re.compile(r"on-?line|authpass|\bonu\s+up\b|\bworking\b", re.IGNORECASE)),
+)
+_PRI_RE = re.compile(r"^<\d{1,3}>")
+_FILTER_RE = re.compile(r"(\d+/\d+/\d+)(:\d+)?")
+
+
+def parse_syslog_line(message: str) -> Optional[Tuple[str, str, str]]:
+    """ZTE ONU syslog line -> (port '1/1/1', onu '1/1/1:5', state) or None if not an ONU state message."""
+    onu = _ONU_RE.search(message)
+    if not onu:
+        return None
+    for state, pattern in _EVENT_PATTERNS:
+        if pattern.search(message):
+            return onu.group(1), f"{onu.group(1)}:{onu.group(2)}", state
+    return None
+
+
+def onu_matches(onu: str, interface: str) -> bool:
+    """
+    '1/1/1:5' against an ONU filter ('gpon-onu_1/1/1:5' or '1/1/1:5', exact)
+    or a port filter ('gpon-olt_1/1/1' or '1/1/1', every ONU on it).
+    """
+    match = _FILTER_RE.search(interface)
+    if not match:
+        return False
+    if match.group(2):
+        return onu == match.group(0)
+    return onu.startswith(match.group(1) + ":")
+
+
+class OltEventHub:
+    """
+    Receives OLT syslog over UDP, keeps the last known state of every ONU it
+    hears about, marks the outage engine's snapshot of that port stale and
+    pushes each event to subscribed clients.
+    """
+
+    def __init__(self):
+        self.onu_states: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self.stats = {"received": 0, "parsed": 0, "unknown_source": 0}
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._transport: Optional[asyncio.DatagramTransport] = None
+        self._olt_by_ip = {info["ip"]: name for name, info in OLT_OPTIONS.items()}
+        self._olt_by_ip.update(settings.SYSLOG_IP_ALIASES)
+
+    # --- Subscribers ---
+
+    def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=settings.SYSLOG_SUBSCRIBER_QUEUE)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self._subscribers.discard(queue)
+
+    def publish(self, event: Dict[str, Any]) -> None:
+        for queue in self._subscribers:
+            if queue.full():
+                # Slow client: drop its oldest event rather than block the listener
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    # --- Ingest ---
+
+    def handle_datagram(self, data: bytes, source_ip: str) -> Optional[Dict[str, Any]]:
+        self.stats["received"] += 1
+        olt_name = self._olt_by_ip.get(source_ip)
+        if olt_name is None:
+            self.stats["unknown_source"] += 1
+            return None
+
+        message = _PRI_RE.sub("", data.decode("utf-8", errors="replace").strip())
+        parsed = parse_syslog_line(message)
+        if parsed is None:
+            return None
+        port, onu, state = parsed
+        self.stats["parsed"] += 1
+
+        event = {
+            "olt_name": olt_name, "port": port, "interface": onu, "state": state,
+            "received_at": dt.datetime.now(dt.timezone.utc), "message": message,
+        }
+        self.onu_states[(olt_name, onu)] = event
+        outage_engine.mark_stale(olt_name, port)
+
+        self.publish(event)
+        return event
+
+    # --- UDP listener ---
+
+    async def start(self) -> None:
+        if settings.SYSLOG_PORT <= 0 or self._transport is not None:
+            return
+        loop = asyncio.get_running_loop()
+        try:
+            self._transport, _ = await loop.create_datagram_endpoint(
+                lambda: _SyslogProtocol(self), local_addr=(settings.SYSLOG_HOST, settings.SYSLOG_PORT),
+            )
+            logging.info(f"📡 Syslog listener aktif di udp/{settings.SYSLOG_HOST}:{settings.SYSLOG_PORT}")
+        except OSError as e:
+            logging.error(f"Syslog listener gagal bind udp/{settings.SYSLOG_PORT}: {e}")
+
+    def stop(self) -> None:
+        if self._transport is not None:
+            self._transport.close()
+            self._transport = None
+
+
+class _SyslogProtocol(asyncio.DatagramProtocol):
+    def __init__(self, hub: OltEventHub):
+        self.hub = hub
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        try:
+            self.hub.handle_datagram(data, addr[0])
+        except Exception as e:
+            logging.warning(f"Syslog dari {addr[0]} tidak bisa diproses: {e}")
+
+
+# Global Instance
+olt_events = OltEventHub()
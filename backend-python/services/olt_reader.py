@@ -0,0 +1,107 @@
+# services/olt_reader.py
+
+import logging
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.config import settings
+from core.olt_config import OLT_OPTIONS
+from services.pon_survey import olt_interface
+from services.rate_limit import EXPENSIVE_SHOW, command_class
+from services.snmp import SnmpClient, SnmpError
+
+TELNET = "telnet"
+SNMP = "snmp"
+
+# '1/1/1:5  enable  disable  LOS  1(GPON)' (C300) / 'gpon_onu-1/1/1:5 enable disable LOS ...' (C600)
+_STATE_LINE_RE = re.compile(r"^\s*(?:gpon[-_]onu[-_])?(\d+/\d+/\d+:\d+)\s+(\S+)\s+(\S+)\s+(\S+)", re.MULTILINE)
+# 'gpon-onu_1/1/1:5   -20.180(dbm)' (C300) / 'gpon_onu-1/1/1:5 -20.180(dbm)' (C600)
+_RX_LINE_RE = re.compile(r"^\s*(gpon[-_]onu[-_]\S+)\s+(-?\d+(?:\.\d+)?)\s*\(dbm\)", re.MULTILINE | re.IGNORECASE)
+
+_snmp_clients: Dict[str, SnmpClient] = {}
+
+
+def parse_onu_states(raw_output: str) -> Dict[str, str]:
+    """'show gpon onu state' -> {'1/1/1:5': phase state}."""
+    return {m.group(1): m.group(4) for m in _STATE_LINE_RE.finditer(raw_output)}
+
+
+def parse_onu_rx(raw_output: str) -> List[Tuple[str, float]]:
+    """(interface, rx dBm) for every ONU with a reading; N/A lines are skipped."""
+    return [(iface, float(rx)) for iface, rx in _RX_LINE_RE.findall(raw_output)]
+
+
+def read_backend(olt_name: str) -> str:
+    """Backend configured for an OLT in OLT_READ_BACKEND, else OLT_READ_BACKEND_DEFAULT."""
+    return settings.OLT_READ_BACKEND.get(olt_name, settings.OLT_READ_BACKEND_DEFAULT).lower()
+
+
+class OltReader:
+    """
+    Read-only ONU queries of one OLT (state, rx power, baseinfo) through
+    either the pooled Telnet session or SNMP GETBULK. Both return the same
+    shapes; an SNMP failure falls back to Telnet for that call.
+    """
+
+    def __init__(self, manager, olt_name: str, backend: Optional[str] = None):
+        self.manager = manager
+        self.olt_name = olt_name
+        self.olt_info = OLT_OPTIONS[olt_name]
+        self.backend = (backend or read_backend(olt_name)).lower()
+        self.snmp: Optional[SnmpClient] = None
+        if self.backend == SNMP:
+            try:
+                self.snmp = _snmp_client(self.olt_info["ip"], self.olt_info["c600"])
+            except ValueError as e:
+                logging.warning(f"{olt_name}: {e}, pakai Telnet")
+                self.backend = TELNET
+
+    async def telnet(self):
+        """Pooled Telnet session, also used for commands SNMP does not cover."""
+        return await self.manager.get_connection(
+            host=self.olt_info["ip"],
+            username=settings.OLT_USERNAME,
+            password=settings.OLT_PASSWORD,
+            is_c600=self.olt_info["c600"]
+        )
+
+    async def _show(self, command: str, port: str) -> str:
+        client = await self.telnet()
+        async with client.session(command_class(command)):
+            return await client._execute_command(f"{command} {olt_interface(port, self.olt_info['c600'])}")
+
+    async def _snmp_or_none(self, method: str, port: str):
+        if self.snmp is None:
+            return None
+        try:
+            return await getattr(self.snmp, method)(port)
+        except SnmpError as e:
+            logging.warning(f"{self.olt_name} {port}: {e}, fallback ke Telnet")
+            return None
+
+    async def onu_states(self, port: str) -> Dict[str, str]:
+        states = await self._snmp_or_none("get_onu_states", port)
+        if states is None:
+            states = parse_onu_states(await self._show("show gpon onu state", port))
+        return states
+
+    async def onu_rx(self, port: str) -> List[Tuple[str, float]]:
+        samples = await self._snmp_or_none("get_onu_rx", port)
+        if samples is None:
+            samples = parse_onu_rx(await self._show("show pon power onu-rx", port))
+        return samples
+
+    async def onu_baseinfo(self, port: str) -> List[Dict[str, Any]]:
+        onus = await self._snmp_or_none("get_onu_baseinfo", port)
+        if onus is None:
+            client = await self.telnet()
+            async with client.session(EXPENSIVE_SHOW):
+                onus = await client.get_onu_baseinfo(port)
+        return onus
+
+
+def _snmp_client(host: str, is_c600: bool) -> SnmpClient:
+    client = _snmp_clients.get(host)
+    if client is None:
+        client = _snmp_clients[host] = SnmpClient(host, is_c600)
+    return client
@@ -2,6 +2,7 @@
 
 import os
 import sys
+import json
 import time
 import argparse
 import logging
@@ -241,6 +242,47 @@ def find_result_row(driver, query: str):
         return rows[0]
     return None
 
+# Serializes the whole ticket table in a single WebDriver round trip instead of
+# one `.text` call per <tr>.
+TICKET_TABLE_SNAPSHOT_JS = """
+    const rows = document.querySelectorAll('#tickets-note tbody tr');
+    return JSON.stringify(Array.from(rows, (tr, i) => ({
+        index: i,
+        text: (tr.innerText || '').toUpperCase().trim(),
+    })));
+"""
+
+TICKET_ROW_BY_INDEX_JS = "return document.querySelectorAll('#tickets-note tbody tr')[arguments[0]] || null;"
+
+def snapshot_ticket_table(driver) -> list[dict]:
+    """Return every row of #tickets-note as a plain dict: {index, text}."""
+    return json.loads(driver.execute_script(TICKET_TABLE_SNAPSHOT_JS) or "[]")
+
+def match_ticket_row(snapshot: list[dict], query: str, statuses: Optional[tuple] = None) -> Optional[dict]:
+    """
+    One pass over the snapshot: first row containing the query and any of
+    `statuses` in its text (any status if None), same test as the old per-row scan.
+    """
+    query_upper = query.upper().strip()
+    for row in snapshot:
+        if query_upper not in row["text"]:
+            continue
+        if statuses and not any(status in row["text"] for status in statuses):
+            continue
+        return row
+    return None
+
+def find_ticket_row(driver, query: str, statuses: Optional[tuple] = None):
+    """
+    Resolve the ticket row for `query` from a table snapshot and only turn the
+    matching row back into a WebElement. Returns (WebElement | None, row_count).
+    """
+    snapshot = snapshot_ticket_table(driver)
+    match = match_ticket_row(snapshot, query, statuses)
+    if not match:
+        return None, len(snapshot)
+    return driver.execute_script(TICKET_ROW_BY_INDEX_JS, match["index"]), len(snapshot)
+
 def extract_search_results(driver, max_rows: int = 20) -> list[dict]:
     """Return rows from #create_note as list of dicts (best-effort)."""
     # wait until table rows exist
@@ -425,21 +467,11 @@ def process_ticket_as_noc(noc_username: str, noc_password: str, query: str, head
         time.sleep(2)
 
         # --- Step 2: Find the specific ticket row ---
-        ticket_row = None
         query_upper = query.upper().strip()
-        
-        rows = driver.find_elements(By.CSS_SELECTOR, "#tickets-note tbody tr")
-        log.info(f"[NOC] Found {len(rows)} rows, scanning for ticket containing '{query_upper}'...")
-
-        for row in rows:
-            row_text = row.text.upper().strip()
-            # Check if text contains Query AND is in valid status
-            if query_upper in row_text and ("FORWARD TO NOC" in row_text or "OPEN" in row_text):
-                ticket_row = row
-                log.info(f"[NOC] Found matching ticket row for '{query_upper}'.")
-                break # Stop searching once found
-            
-        # --- FIX: This check must be OUTSIDE the for loop ---
+
+        ticket_row, row_count = find_ticket_row(driver, query_upper, ("FORWARD TO NOC", "OPEN"))
+        log.info(f"[NOC] Scanned {row_count} rows for ticket containing '{query_upper}'.")
+
         if not ticket_row:
             log.error(f"[NOC] Ticket '{query_upper}' with an actionable status was not found.")
             driver.save_screenshot(f"log_{query}_02_ticket_not_found.png")
@@ -538,19 +570,12 @@ def close_ticket_as_noc(
         )
         time.sleep(2) # Allow JS to render
 
-        ticket_row = None
         query_upper = query.upper().strip()
-        rows = driver.find_elements(By.CSS_SELECTOR, "#tickets-note tbody tr")
-        log.info(f"[NOC-CLOSE] Found {len(rows)} rows, scanning for ticket '{query_upper}'...")
-
-        for row in rows:
-            row_text = row.text.upper().strip()
-            # Look for a ticket that has been processed and is ready to be closed
-            if query_upper in row_text and "PROCESSED BY NOC" in row_text:
-                ticket_row = row
-                log.info(f"[NOC-CLOSE] Found matching ticket row for '{query_upper}'.")
-                break
-        
+
+        # Look for a ticket that has been processed and is ready to be closed
+        ticket_row, row_count = find_ticket_row(driver, query_upper, ("PROCESSED BY NOC",))
+        log.info(f"[NOC-CLOSE] Scanned {row_count} rows for ticket '{query_upper}'.")
+
         if not ticket_row:
             log.error(f"[NOC-CLOSE] Ticket '{query}' with status 'PROCESSED BY NOC' not found.")
             driver.save_screenshot(f"noc_close_ticket_not_found_{query}.png")
@@ -652,16 +677,10 @@ def forward_ticket_as_noc(
         log.info(f"[NOC] Searching for ticket '{query}' to forward.")
         wait(driver, 20).until(EC.presence_of_element_located((By.ID, "tickets-note")))
 
-        ticket_row = None
-        rows = driver.find_elements(By.CSS_SELECTOR, "#tickets-note tbody tr")
-        if not rows:
+        ticket_row, row_count = find_ticket_row(driver, query)
+        if not row_count:
             raise NoSuchElementException("Ticket table is empty.")
 
-        for row in rows:
-            if query in row.text:
-                ticket_row = row
-                break
-
         if not ticket_row:
             raise NoSuchElementException(f"Could not find a ticket row for query '{query}'")
 
@@ -0,0 +1,276 @@
+# services/optical_power.py
+
+import asyncio
+import datetime as dt
+import logging
+import re
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from core.config import settings
+from core.database import get_pool
+from services.connection_manager import CircuitOpenError
+from services.pon_survey import dba_survey
+from services.olt_reader import OltReader
+
+RX_TABLE = "onu_rx_samples"
+
+# int16 centi-dBm: -27.93 dBm -> -2793; this value marks "no sample"
+MISSING = np.iinfo(np.int16).min
+
+
+def rx_table_ddl() -> List[str]:
+    return [
+        f"""
+        CREATE TABLE IF NOT EXISTS {RX_TABLE} (
+            olt_name   TEXT NOT NULL,
+            interface  TEXT NOT NULL,
+            rx_dbm     REAL NOT NULL,
+            sampled_at TIMESTAMPTZ NOT NULL
+        )
+        """,
+        f"CREATE INDEX IF NOT EXISTS {RX_TABLE}_series_idx ON {RX_TABLE} (olt_name, interface, sampled_at DESC)",
+    ]
+
+
+class RxPowerStore:
+    """
+    Ring buffer of rx power for every ONU, one column per collection cycle.
+
+    values[row, slot] holds int16 centi-dBm (2 bytes per ONU-sample) and
+    times[slot] the uint32 epoch second of that cycle. Rows are added as new
+    ONUs appear and capacity grows in fixed steps of `grow_rows`, so 30 days
+    at a 15-minute interval (2880 slots) for 20k ONUs takes 20480 rows, about
+    118 MB. While a step is copied the old array (one step smaller) is still
+    alive, so the peak during growth is about twice that.
+    """
+
+    def __init__(self, slots: int, initial_rows: int = 2048, grow_rows: int = 2048):
+        self.slots = slots
+        self.grow_rows = grow_rows
+        self.values = np.full((initial_rows, slots), MISSING, dtype=np.int16)
+        self.times = np.zeros(slots, dtype=np.uint32)
+        self.cycles = 0  # total cycles written; the current slot is (cycles - 1) % slots
+        self.keys: List[Tuple[str, str]] = []           # row -> (olt_name, interface)
+        self.ports: List[Tuple[str, str]] = []          # row -> (olt_name, port '1/1/1')
+        self.port_ids: List[int] = []                   # row -> index into port_keys, for vectorized grouping
+        self.port_keys: List[Tuple[str, str]] = []
+        self._rows: Dict[Tuple[str, str], int] = {}
+        self._port_index: Dict[Tuple[str, str], int] = {}
+
+    @property
+    def nbytes(self) -> int:
+        return self.values.nbytes + self.times.nbytes
+
+    def begin_cycle(self, timestamp: Optional[float] = None) -> int:
+        slot = self.cycles % self.slots
+        self.values[:, slot] = MISSING
+        self.times[slot] = int(timestamp or time.time())
+        self.cycles += 1
+        return slot
+
+    def _row(self, olt_name: str, interface: str) -> int:
+        key = (olt_name, interface)
+        row = self._rows.get(key)
+        if row is None:
+            row = len(self.keys)
+            if row >= self.values.shape[0]:
+                grown = np.full((self.values.shape[0] + self.grow_rows, self.slots), MISSING, dtype=np.int16)
+                grown[:row] = self.values
+                self.values = grown
+            self._rows[key] = row
+            self.keys.append(key)
+            port = re.search(r"(\d+/\d+/\d+)", interface)
+            port_key = (olt_name, port.group(1) if port else "")
+            self.ports.append(port_key)
+            if port_key not in self._port_index:
+                self._port_index[port_key] = len(self.port_keys)
+                self.port_keys.append(port_key)
+            self.port_ids.append(self._port_index[port_key])
+        return row
+
+    def add(self, olt_name: str, samples: List[Tuple[str, float]]) -> None:
+        """Write samples of one OLT into the current cycle's slot."""
+        if not self.cycles:
+            self.begin_cycle()
+        if not samples:
+            return
+        slot = (self.cycles - 1) % self.slots
+        # Resolve (and grow) rows first, then write the whole column slice at once
+        rows = np.fromiter((self._row(olt_name, iface) for iface, _ in samples), dtype=np.int64, count=len(samples))
+        rx = np.fromiter((v for _, v in samples), dtype=np.float64, count=len(samples))
+        self.values[rows, slot] = np.round(rx * 100).astype(np.int16)
+
+    def ordered_slots(self, since: Optional[float] = None) -> np.ndarray:
+        """Filled slot indexes oldest -> newest, optionally only those at or after `since`."""
+        filled = min(self.cycles, self.slots)
+        start = self.cycles - filled
+        slots = np.arange(start, self.cycles) % self.slots
+        if since is not None:
+            slots = slots[self.times[slots] >= since]
+        return slots
+
+    def raw(self, rows: Optional[np.ndarray], since: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """(times, int16 centi-dBm block) oldest column first; rows=None means every ONU."""
+        slots = self.ordered_slots(since)
+        block = self.values[: len(self.keys)] if rows is None else self.values[rows]
+        return self.times[slots], block[:, slots]
+
+    def matrix(self, rows: Optional[np.ndarray], since: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """(times, dBm float32 matrix with NaN gaps) for the given rows, oldest column first."""
+        times, raw = self.raw(rows, since)
+        dbm = raw.astype(np.float32)
+        dbm *= 0.01
+        dbm[raw == MISSING] = np.nan
+        return times, dbm
+
+    def rows_for(self, olt_name: Optional[str] = None, port: Optional[str] = None) -> np.ndarray:
+        ports = [i for i, (olt, p) in enumerate(self.port_keys)
+                 if (olt_name is None or olt == olt_name) and (port is None or p == port)]
+        return np.flatnonzero(np.isin(np.asarray(self.port_ids, dtype=np.int64), ports))
+
+    def history(self, olt_name: str, interface: str, since: Optional[float] = None) -> List[Dict[str, Any]]:
+        row = self._rows.get((olt_name, interface))
+        if row is None:
+            return []
+        times, dbm = self.matrix(np.array([row]), since)
+        return [
+            {"sampled_at": dt.datetime.fromtimestamp(int(t), dt.timezone.utc), "rx_dbm": round(float(v), 2)}
+            for t, v in zip(times, dbm[0]) if not np.isnan(v)
+        ]
+
+    def port_percentiles(self, olt_name: str, since: Optional[float] = None,
+                         percentiles: Tuple[int, ...] = (5, 50, 95)) -> List[Dict[str, Any]]:
+        """Per-port percentiles over every sample of the port's ONUs inside the window."""
+        rows = self.rows_for(olt_name)
+        if rows.size == 0:
+            return []
+        _, dbm = self.matrix(rows, since)
+        ports = np.array([self.ports[r][1] for r in rows])
+        result = []
+        for port in np.unique(ports):
+            values = dbm[ports == port].ravel()
+            values = values[~np.isnan(values)]
+            if values.size == 0:
+                continue
+            stats = np.percentile(values, percentiles)
+            result.append({
+                "port": port, "onus": int((ports == port).sum()), "samples": int(values.size),
+                **{f"p{p}": round(float(v), 2) for p, v in zip(percentiles, stats)},
+                "min": round(float(values.min()), 2),
+            })
+        return result
+
+
+class RxPowerCollector:
+    """
+    Polls 'show pon power onu-rx' per port on every OLT each
+    RX_POLL_INTERVAL_SECONDS (OLTs in parallel, ports one at a time on the
+    pooled session), keeps the samples in RxPowerStore and appends them to
+    Postgres when the pool is available.
+    """
+
+    def __init__(self):
+        # On-request only (interval 0) is sized as if polled every 15 minutes
+        interval = settings.RX_POLL_INTERVAL_SECONDS or 900
+        slots = max(1, settings.RX_RETENTION_DAYS * 86400 // interval)
+        self.store = RxPowerStore(slots)
+        self.last_cycle: Dict[str, Any] = {}
+        self._schema_ready = False
+        self._cycle_lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def _collect_olt(self, manager, olt_name: str, ports: List[str]) -> int:
+        reader = OltReader(manager, olt_name)
+        count = 0
+        for port in ports:
+            # One bad port must not cost the OLT the rest of its cycle;
+            # an open breaker means the whole OLT is down, so that still aborts
+            try:
+                samples = await reader.onu_rx(port)
+            except CircuitOpenError:
+                raise
+            except Exception as e:
+                logging.warning(f"Rx power {olt_name} {port} gagal: {e}")
+                continue
+            self.store.add(olt_name, samples)
+            count += len(samples)
+        return count
+
+    async def collect(self, manager, ports_by_olt: Optional[Dict[str, List[str]]] = None) -> Dict[str, Any]:
+        """One collection cycle over all OLTs; returns per-OLT sample counts or errors."""
+        if self._cycle_lock is None:
+            self._cycle_lock = asyncio.Lock()
+        async with self._cycle_lock:
+            ports_by_olt = ports_by_olt or await dba_survey.known_ports()
+            started = time.time()
+            slot = self.store.begin_cycle(started)
+
+            async def run(olt_name: str, ports: List[str]):
+                try:
+                    return await self._collect_olt(manager, olt_name, ports)
+                except Exception as e:
+                    logging.warning(f"Rx power {olt_name} gagal: {e}")
+                    return str(e)
+
+            names = list(ports_by_olt)
+            outcomes = await asyncio.gather(*(run(n, ports_by_olt[n]) for n in names))
+            self.last_cycle = {
+                "started_at": dt.datetime.fromtimestamp(started, dt.timezone.utc),
+                "seconds": round(time.time() - started, 2),
+                "olts": dict(zip(names, outcomes)),
+                "onus": len(self.store.keys),
+                "buffer_bytes": self.store.nbytes,
+            }
+            if settings.RX_SPILL_TO_DB:
+                await self._spill(slot, started)
+            return self.last_cycle
+
+    async def _spill(self, slot: int, started: float) -> None:
+        column = self.store.values[: len(self.store.keys), slot]
+        rows = np.flatnonzero(column != MISSING)
+        if rows.size == 0:
+            return
+        sampled_at = dt.datetime.fromtimestamp(started, dt.timezone.utc)
+        records = [
+            (*self.store.keys[r], float(column[r]) / 100.0, sampled_at) for r in rows
+        ]
+        try:
+            pool = get_pool()
+            async with pool.acquire() as conn:
+                if not self._schema_ready:
+                    for ddl in rx_table_ddl():
+                        await conn.execute(ddl)
+                    self._schema_ready = True
+                await conn.copy_records_to_table(
+                    RX_TABLE, records=records, columns=["olt_name", "interface", "rx_dbm", "sampled_at"],
+                )
+        except Exception as e:
+            logging.warning(f"Sampel rx power tidak tersimpan ke Postgres: {e}")
+
+    def start(self, manager) -> None:
+        if settings.RX_POLL_INTERVAL_SECONDS > 0 and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._poll_loop(manager))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _poll_loop(self, manager) -> None:
+        while True:
+            try:
+                await self.collect(manager)
+            except Exception as e:
+                logging.error(f"Koleksi rx power gagal: {e}")
+            await asyncio.sleep(settings.RX_POLL_INTERVAL_SECONDS)
+
+
+# Global Instance
+rx_collector = RxPowerCollector()
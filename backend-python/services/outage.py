@@ -0,0 +1,274 @@
+# services/outage.py
+
+import asyncio
+import datetime as dt
+import logging
+import re
+import time
+import uuid
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.config import settings
+from core.database import get_pool
+from core.olt_config import OLT_OPTIONS, OLT_ALIASES
+from services.pon_survey import dba_survey
+from services.olt_reader import OltReader
+from services.rate_limit import CHEAP_SHOW
+
+LOS = "los"
+DYING_GASP = "dying_gasp"
+OFFLINE = "offline"  # down, cause not known from the state table
+
+# Authpass/Offline log row of 'show gpon onu detail-info': id, auth time, offline time, cause
+_DETAIL_LOG_RE = re.compile(r"^\s*\d+\s+[\d-]{10}\s[\d:]{8}\s+[\d-]{10}\s[\d:]{8}\s*(.*)$", re.MULTILINE)
+
+_CUSTOMERS_SQL = (
+    "SELECT user_pppoe, name, alamat, onu_sn, substring(interface from '(\\d+/\\d+/\\d+:\\d+)') AS onu "
+    "FROM data_fiber WHERE upper(trim(olt_name)) = ANY($1::text[]) "
+    "AND substring(interface from '(\\d+/\\d+/\\d+):') = $2"
+)
+
+
+def classify_phase(phase: str) -> Optional[str]:
+    """None while the ONU is up, otherwise LOS / DYING_GASP / OFFLINE."""
+    phase = phase.lower()
+    if phase == "working":
+        return None
+    if "los" in phase:
+        return LOS
+    if "dying" in phase or "gasp" in phase:
+        return DYING_GASP
+    return OFFLINE
+
+
+def classify_offline_cause(detail_output: str) -> str:
+    """Cause column of the newest offline log row in 'show gpon onu detail-info'."""
+    causes = [c.strip().lower() for c in _DETAIL_LOG_RE.findall(detail_output) if c.strip()]
+    if not causes:
+        return OFFLINE
+    cause = causes[-1]
+    if "dying" in cause or "gasp" in cause or "power" in cause:
+        return DYING_GASP
+    if "los" in cause:
+        return LOS
+    return OFFLINE
+
+
+def olt_names_for(olt_name: str) -> List[str]:
+    """Canonical OLT name plus every workbook alias that maps to it."""
+    return sorted({olt_name, *(alias for alias, name in OLT_ALIASES.items() if name == olt_name)})
+
+
+class OutageEngine:
+    """
+    Polls 'show gpon onu state' for every known PON port and diffs it with the
+    previous snapshot of that port. When many ONUs drop between two polls, a
+    port incident is opened with the LOS / dying-gasp split and the affected
+    customers; it resolves once most of them are working again. Single-ONU
+    lookups on an incident port are answered from the incident.
+    """
+
+    def __init__(self):
+        self._snapshots: Dict[Tuple[str, str], Dict[str, str]] = {}
+        self.incidents: Dict[str, Dict[str, Any]] = {}
+        self._open_by_port: Dict[Tuple[str, str], str] = {}
+        self.last_cycle: Dict[str, Any] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._manager = None
+        self._stale: Dict[Tuple[str, str], asyncio.Task] = {}
+
+    # --- Diff / classification ---
+
+    @staticmethod
+    def went_down(previous: Dict[str, str], current: Dict[str, str]) -> Dict[str, str]:
+        """ONUs working in `previous` and down in `current` -> their down class."""
+        return {
+            onu: cls for onu, phase in current.items()
+            if (cls := classify_phase(phase)) and onu in previous and classify_phase(previous[onu]) is None
+        }
+
+    @staticmethod
+    def is_mass_outage(dropped: int, previously_up: int) -> bool:
+        if dropped >= settings.OUTAGE_MIN_ONUS:
+            return True
+        return dropped >= 2 and previously_up > 0 and dropped / previously_up >= settings.OUTAGE_MIN_FRACTION
+
+    async def _resolve_unknown_causes(self, reader: OltReader, olt_name: str, down: Dict[str, str]) -> None:
+        """
+        ONUs that only show 'OffLine' get their cause from the detail-info logs;
+        a few samples decide for the rest, so a cut never fans out into one
+        detail query per customer.
+        """
+        unknown = [onu for onu, cls in down.items() if cls == OFFLINE]
+        if not unknown:
+            return
+        prefix = "gpon_onu-" if OLT_OPTIONS[olt_name]["c600"] else "gpon-onu_"
+        client = await reader.telnet()
+        sampled = []
+        for onu in unknown[: settings.OUTAGE_CAUSE_SAMPLES]:
+            async with client.session(CHEAP_SHOW):
+                raw = await client._execute_command(f"show gpon onu detail-info {prefix}{onu}")
+            down[onu] = classify_offline_cause(raw)
+            sampled.append(down[onu])
+        majority = Counter(sampled).most_common(1)[0][0]
+        for onu in unknown[settings.OUTAGE_CAUSE_SAMPLES:]:
+            down[onu] = majority
+
+    async def _customers(self, olt_name: str, port: str) -> Dict[str, Dict[str, Any]]:
+        try:
+            rows = await get_pool().fetch(_CUSTOMERS_SQL, olt_names_for(olt_name), port)
+        except Exception as e:
+            logging.warning(f"Data pelanggan untuk insiden {olt_name} {port} tidak tersedia: {e}")
+            return {}
+        return {r["onu"]: {k: r[k] for k in ("user_pppoe", "name", "alamat", "onu_sn")} for r in rows if r["onu"]}
+
+    # --- Incidents ---
+
+    async def _open_or_extend(self, reader: OltReader, olt_name: str, port: str, down: Dict[str, str], previously_up: int) -> Dict[str, Any]:
+        await self._resolve_unknown_causes(reader, olt_name, down)
+        customers = await self._customers(olt_name, port)
+        now = dt.datetime.now(dt.timezone.utc)
+
+        incident_id = self._open_by_port.get((olt_name, port))
+        if incident_id is None:
+            incident_id = uuid.uuid4().hex
+            self._open_by_port[(olt_name, port)] = incident_id
+            self.incidents[incident_id] = {
+                "incident_id": incident_id, "olt_name": olt_name, "port": port, "status": "open",
+                "opened_at": now, "resolved_at": None, "previously_up": previously_up, "affected": {},
+            }
+            logging.warning(f"🚨 Insiden {olt_name} {port}: {len(down)} ONU down")
+        incident = self.incidents[incident_id]
+
+        for onu, cause in down.items():
+            incident["affected"].setdefault(onu, {
+                "interface": onu, "cause": cause, "down_at": now, "up": False, **customers.get(onu, {}),
+            })
+        counts = Counter(a["cause"] for a in incident["affected"].values())
+        incident["counts"] = dict(counts)
+        incident["cause"] = counts.most_common(1)[0][0] if len(counts) == 1 else "mixed"
+        return incident
+
+    def _update_recovery(self, olt_name: str, port: str, current: Dict[str, str]) -> None:
+        incident_id = self._open_by_port.get((olt_name, port))
+        if incident_id is None:
+            return
+        incident = self.incidents[incident_id]
+        for onu, entry in incident["affected"].items():
+            entry["up"] = onu in current and classify_phase(current[onu]) is None
+        recovered = sum(entry["up"] for entry in incident["affected"].values())
+        if recovered >= settings.OUTAGE_RECOVERY_FRACTION * len(incident["affected"]):
+            incident["status"] = "resolved"
+            incident["resolved_at"] = dt.datetime.now(dt.timezone.utc)
+            del self._open_by_port[(olt_name, port)]
+            logging.info(f"✅ Insiden {olt_name} {port} selesai ({recovered}/{len(incident['affected'])} ONU up)")
+
+    def incident_for(self, olt_name: str, interface: str) -> Optional[Dict[str, Any]]:
+        """Open incident that covers this ONU ('1/1/1:5' or 'gpon-onu_1/1/1:5'), if any."""
+        match = re.search(r"(\d+/\d+/\d+):\d+", interface)
+        if not match:
+            return None
+        incident_id = self._open_by_port.get((olt_name, match.group(1)))
+        if incident_id is None:
+            return None
+        incident = self.incidents[incident_id]
+        onu = re.search(r"\d+/\d+/\d+:\d+", interface).group(0)
+        return incident if onu in incident["affected"] else None
+
+    def list_incidents(self, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        items = [i for i in self.incidents.values() if status is None or i["status"] == status]
+        return sorted(items, key=lambda i: i["opened_at"], reverse=True)
+
+    # --- Polling ---
+
+    async def apply_snapshot(self, reader: OltReader, olt_name: str, port: str, current: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        """Diff a fresh port snapshot against the previous one; returns the incident touched, if any."""
+        previous = self._snapshots.get((olt_name, port))
+        self._snapshots[(olt_name, port)] = current
+        self._update_recovery(olt_name, port, current)
+        if previous is None:
+            return None
+        down = self.went_down(previous, current)
+        previously_up = sum(1 for phase in previous.values() if classify_phase(phase) is None)
+        if down and (self.is_mass_outage(len(down), previously_up) or (olt_name, port) in self._open_by_port):
+            return await self._open_or_extend(reader, olt_name, port, down, previously_up)
+        return None
+
+    async def poll_olt(self, manager, olt_name: str, ports: List[str]) -> int:
+        reader = OltReader(manager, olt_name)
+        touched = 0
+        for port in ports:
+            if await self.apply_snapshot(reader, olt_name, port, await reader.onu_states(port)):
+                touched += 1
+        return touched
+
+    async def poll(self, manager, ports_by_olt: Optional[Dict[str, List[str]]] = None) -> Dict[str, Any]:
+        ports_by_olt = ports_by_olt or await dba_survey.known_ports()
+        started = time.time()
+
+        async def run(olt_name: str, ports: List[str]):
+            try:
+                return await self.poll_olt(manager, olt_name, ports)
+            except Exception as e:
+                logging.warning(f"Poll status ONU {olt_name} gagal: {e}")
+                return str(e)
+
+        names = list(ports_by_olt)
+        outcomes = await asyncio.gather(*(run(n, ports_by_olt[n]) for n in names))
+        self.last_cycle = {
+            "started_at": dt.datetime.fromtimestamp(started, dt.timezone.utc),
+            "seconds": round(time.time() - started, 2),
+            "olts": dict(zip(names, outcomes)),
+            "open_incidents": len(self._open_by_port),
+        }
+        return self.last_cycle
+
+    def mark_stale(self, olt_name: str, port: str) -> None:
+        """
+        An event (e.g. syslog) says this port changed: re-poll it after a short
+        debounce instead of waiting for the next cycle. The old snapshot stays
+        as the baseline, so a burst of events becomes one diff and one command.
+        """
+        key = (olt_name, port)
+        if self._manager is None or olt_name not in OLT_OPTIONS:
+            return
+        pending = self._stale.get(key)
+        if pending is None or pending.done():
+            self._stale[key] = asyncio.create_task(self._repoll(olt_name, port))
+
+    async def _repoll(self, olt_name: str, port: str) -> None:
+        await asyncio.sleep(settings.OUTAGE_EVENT_DEBOUNCE_SECONDS)
+        try:
+            await self.poll_olt(self._manager, olt_name, [port])
+        except Exception as e:
+            logging.warning(f"Re-poll {olt_name} {port} setelah event gagal: {e}")
+
+    def start(self, manager) -> None:
+        self._manager = manager
+        if settings.OUTAGE_POLL_INTERVAL_SECONDS > 0 and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._poll_loop(manager))
+
+    async def stop(self) -> None:
+        for pending in self._stale.values():
+            pending.cancel()
+        self._stale.clear()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _poll_loop(self, manager) -> None:
+        while True:
+            try:
+                await self.poll(manager)
+            except Exception as e:
+                logging.error(f"Outage poll gagal: {e}")
+            await asyncio.sleep(settings.OUTAGE_POLL_INTERVAL_SECONDS)
+
+
+# Global Instance
+outage_engine = OutageEngine()
@@ -0,0 +1,277 @@
+# services/pon_survey.py
+
+import asyncio
+import datetime as dt
+import logging
+import re
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.config import settings
+from core.database import get_pool
+from core.olt_config import OLT_OPTIONS, OLT_ALIASES
+from services.rate_limit import CHEAP_SHOW, EXPENSIVE_SHOW, OltBusyError
+
+DBA_TABLE = "pon_dba_samples"
+
+# PON ports with at least one customer in data_fiber, as '1/<slot>/<port>', with their customer count
+_PORTS_SQL = (
+    "SELECT upper(trim(olt_name)) AS olt_name, "
+    "substring(interface from '(\\d+/\\d+/\\d+):') AS port, count(*) AS customers "
+    "FROM data_fiber WHERE interface ~ '\\d+/\\d+/\\d+:' GROUP BY 1, 2"
+)
+# 'show card': Rack Shelf Slot CfgType RealType Port HardVer SoftVer Status
+_CARD_LINE_RE = re.compile(
+    r"^[ \t]*\d+[ \t]+(\d+)[ \t]+(\d+)[ \t]+(\S+)[ \t]+\S+[ \t]+(\d+)[ \t].*?(\S+)[ \t\r]*$", re.MULTILINE
+)
+_HISTORY_SQL = (
+    f"SELECT interface, rate, sampled_at FROM {DBA_TABLE} "
+    f"WHERE olt_name = $1 AND ($2::text IS NULL OR interface = $2) AND sampled_at >= $3 "
+    f"ORDER BY interface, sampled_at"
+)
+
+
+def dba_table_ddl() -> List[str]:
+    return [
+        f"""
+        CREATE TABLE IF NOT EXISTS {DBA_TABLE} (
+            olt_name   TEXT NOT NULL,
+            interface  TEXT NOT NULL,
+            rate       REAL NOT NULL,
+            sampled_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+        """,
+        f"CREATE INDEX IF NOT EXISTS {DBA_TABLE}_series_idx ON {DBA_TABLE} (olt_name, interface, sampled_at DESC)",
+    ]
+
+
+def parse_pon_ports(raw_output: str) -> List[str]:
+    """Every port ('<shelf>/<slot>/<port>') of the in-service GPON cards in 'show card'."""
+    prefixes = tuple(p.upper() for p in settings.OLT_PON_CARD_PREFIXES)
+    ports = []
+    for shelf, slot, card_type, count, status in _CARD_LINE_RE.findall(raw_output):
+        if card_type.upper().startswith(prefixes) and status.upper() == "INSERVICE":
+            ports.extend(f"{shelf}/{slot}/{n}" for n in range(1, int(count) + 1))
+    return ports
+
+
+def olt_interface(port: str, is_c600: bool) -> str:
+    if port.startswith("gpon"):
+        return port
+    return f"{'gpon_olt-' if is_c600 else 'gpon-olt_'}{port}"
+
+
+class DbaSurvey:
+    """
+    Collects 'show pon bandwidth dba' for every PON port of every OLT; the
+    ports come from the OLT's card layout, data_fiber only adds the customer
+    count per port. OLTs are surveyed in parallel through their pooled
+    session, one admitted command at a time, so provisioning interleaves
+    with the survey instead of waiting for it.
+    Samples go to Postgres as a time series; the newest rate per port stays
+    in memory for ranking and for provisioning.
+    """
+
+    def __init__(self):
+        self._latest: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._schema_ready = False
+        self._task: Optional[asyncio.Task] = None
+
+    # --- Cache ---
+
+    def record(self, olt_name: str, interface: str, rate: float, customers: Optional[int] = None) -> None:
+        host = OLT_OPTIONS[olt_name]["ip"]
+        self._latest[(host, interface)] = {
+            "olt_name": olt_name, "interface": interface, "rate": rate, "customers": customers,
+            "sampled_at": time.time(),
+        }
+
+    def latest_rate(self, host: str, interface: str, max_age: Optional[float] = None) -> Optional[float]:
+        """Newest surveyed rate for a port, or None when missing or older than max_age seconds."""
+        sample = self._latest.get((host, interface))
+        max_age = settings.DBA_CACHE_MAX_AGE_SECONDS if max_age is None else max_age
+        if sample is None or time.time() - sample["sampled_at"] > max_age:
+            return None
+        return sample["rate"]
+
+    def ranked(self, olt_name: Optional[str] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """olt_name -> ports ordered by utilization, busiest first."""
+        table: Dict[str, List[Dict[str, Any]]] = {}
+        for sample in self._latest.values():
+            if olt_name and sample["olt_name"] != olt_name:
+                continue
+            table.setdefault(sample["olt_name"], []).append(dict(sample))
+        for rows in table.values():
+            rows.sort(key=lambda r: r["rate"], reverse=True)
+            for rank, row in enumerate(rows, start=1):
+                row["rank"] = rank
+                row["sampled_at"] = dt.datetime.fromtimestamp(row["sampled_at"], dt.timezone.utc)
+        return table
+
+    # --- Storage ---
+
+    async def _ensure_schema(self, pool) -> None:
+        if self._schema_ready:
+            return
+        async with pool.acquire() as conn:
+            for ddl in dba_table_ddl():
+                await conn.execute(ddl)
+        self._schema_ready = True
+
+    async def _store(self, samples: List[Tuple[str, str, float]]) -> None:
+        try:
+            pool = get_pool()
+            await self._ensure_schema(pool)
+            async with pool.acquire() as conn:
+                await conn.executemany(
+                    f"INSERT INTO {DBA_TABLE} (olt_name, interface, rate) VALUES ($1, $2, $3)", samples,
+                )
+        except Exception as e:
+            logging.warning(f"Sampel DBA tidak tersimpan ke Postgres: {e}")
+
+    async def history(self, olt_name: str, interface: Optional[str], hours: float) -> List[Dict[str, Any]]:
+        pool = get_pool()
+        await self._ensure_schema(pool)
+        since = dt.datetime.now(dt.timezone.utc) - dt.timedelta(hours=hours)
+        rows = await pool.fetch(_HISTORY_SQL, olt_name, interface, since)
+        return [dict(r) for r in rows]
+
+    async def port_customers(self) -> Dict[str, Dict[str, int]]:
+        """olt_name -> port -> customers placed on it in data_fiber."""
+        rows = await get_pool().fetch(_PORTS_SQL)
+        counts: Dict[str, Dict[str, int]] = {}
+        for row in rows:
+            name = OLT_ALIASES.get(row["olt_name"], row["olt_name"])
+            if name in OLT_OPTIONS and row["port"]:
+                ports = counts.setdefault(name, {})
+                ports[row["port"]] = ports.get(row["port"], 0) + row["customers"]
+        return counts
+
+    async def known_ports(self) -> Dict[str, List[str]]:
+        """PON ports per OLT taken from data_fiber placements."""
+        return {name: sorted(ports) for name, ports in (await self.port_customers()).items()}
+
+    # --- Survey ---
+
+    async def _client(self, olt_name: str):
+        # Imported here: services.telnet reads this module's cache during provisioning
+        from services.connection_manager import olt_manager
+
+        olt_info = OLT_OPTIONS[olt_name]
+        return await olt_manager.get_connection(
+            host=olt_info["ip"],
+            username=settings.OLT_USERNAME,
+            password=settings.OLT_PASSWORD,
+            is_c600=olt_info["c600"]
+        )
+
+    async def olt_ports(self, olt_name: str) -> List[str]:
+        """Every PON port of the OLT, read from its card layout."""
+        client = await self._client(olt_name)
+        async with client.session(CHEAP_SHOW):
+            return parse_pon_ports(await client._execute_command("show card"))
+
+    async def survey_olt(self, olt_name: str, ports: List[str], customers: Optional[Dict[str, int]] = None) -> List[Dict[str, Any]]:
+        olt_info = OLT_OPTIONS[olt_name]
+        customers = customers or {}
+        client = await self._client(olt_name)
+        results: List[Dict[str, Any]] = []
+
+        for port in ports:
+            interface = olt_interface(port, olt_info["c600"])
+            try:
+                async with client.session(EXPENSIVE_SHOW):
+                    rate = await client.read_dba_rate(interface)
+            except OltBusyError as e:
+                # Interactive requests fill the queue: leave this port for the next survey
+                logging.warning(f"DBA {olt_name} {interface} dilewati: {e}")
+                continue
+            if rate is None:
+                logging.warning(f"DBA {olt_name} {interface} tidak terbaca")
+                continue
+            self.record(olt_name, interface, rate, customers.get(port, 0))
+            results.append({"interface": interface, "rate": rate})
+
+        await self._store([(olt_name, r["interface"], r["rate"]) for r in results])
+        return results
+
+    def start(self, ports_by_olt: Dict[str, Optional[List[str]]]) -> str:
+        """Ports of None are read from the OLT's card layout when its scan starts."""
+        job_id = uuid.uuid4().hex
+        self._jobs[job_id] = {
+            "job_id": job_id,
+            "status": "running",
+            "olts": {
+                name: {"status": "pending", "ports": len(ports) if ports else None, "sampled": 0, "seconds": None, "error": None}
+                for name, ports in ports_by_olt.items()
+            },
+            "started_at": dt.datetime.utcnow(),
+            "finished_at": None,
+        }
+        asyncio.create_task(self._run(job_id, ports_by_olt))
+        return job_id
+
+    async def _run(self, job_id: str, ports_by_olt: Dict[str, Optional[List[str]]]) -> None:
+        job = self._jobs[job_id]
+        try:
+            customers = await self.port_customers()
+        except Exception as e:
+            logging.warning(f"Jumlah pelanggan per port tidak tersedia: {e}")
+            customers = {}
+
+        async def scan(olt_name: str, ports: Optional[List[str]]) -> None:
+            state = job["olts"][olt_name]
+            state["status"] = "running"
+            start = time.perf_counter()
+            try:
+                if not ports:
+                    ports = await self.olt_ports(olt_name)
+                    state["ports"] = len(ports)
+                state["sampled"] = len(await self.survey_olt(olt_name, ports, customers.get(olt_name)))
+                state["status"] = "done"
+            except Exception as e:
+                logging.error(f"Survey DBA gagal untuk OLT {olt_name}: {e}")
+                state.update(status="error", error=str(e))
+            finally:
+                state["seconds"] = round(time.perf_counter() - start, 2)
+
+        try:
+            await asyncio.gather(*(scan(name, ports) for name, ports in ports_by_olt.items()))
+            job["status"] = "success"
+        finally:
+            job["finished_at"] = dt.datetime.utcnow()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self._jobs.get(job_id)
+
+    # --- Periodic sampling ---
+
+    def start_periodic(self) -> None:
+        """Samples every PON port of every OLT each DBA_SURVEY_INTERVAL_SECONDS (0 disables it)."""
+        if settings.DBA_SURVEY_INTERVAL_SECONDS > 0 and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._periodic_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _periodic_loop(self) -> None:
+        while True:
+            try:
+                job_id = self.start({name: None for name in OLT_OPTIONS})
+                while self._jobs[job_id]["finished_at"] is None:
+                    await asyncio.sleep(1)
+            except Exception as e:
+                logging.error(f"Survey DBA periodik gagal: {e}")
+            await asyncio.sleep(settings.DBA_SURVEY_INTERVAL_SECONDS)
+
+
+# Global Instance
+dba_survey = DbaSurvey()
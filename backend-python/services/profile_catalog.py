@@ -0,0 +1,151 @@
+# services/profile_catalog.py
+
+import asyncio
+import logging
+import re
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from core.config import settings
+from core.olt_config import OLT_OPTIONS
+from services.rate_limit import CHEAP_SHOW
+
+# Show commands per OLT model; every kind maps to the profile names a template references
+CATALOG_COMMANDS = {
+    "c300": {
+        "tcont": "show gpon profile tcont",
+        "traffic": "show gpon profile traffic",
+        "vlan": "show vlan summary",
+    },
+    "c600": {
+        "tcont": "show gpon profile tcont",
+        "qos": "show qos traffic-policy",
+        "vlan": "show vlan summary",
+    },
+}
+
+_NAME_RE = re.compile(r"(?i)(?:name\s*:\s*|traffic-policy\s+)(\S+)")
+_VLAN_LINE_RE = re.compile(r"^[\d,\-\s]+$")
+_VLAN_RANGE_RE = re.compile(r"(\d+)(?:-(\d+))?")
+
+
+class ProfileValidationError(ValueError):
+    """The request references a profile or VLAN the target OLT does not have."""
+
+
+def parse_profile_names(raw_output: str) -> Set[str]:
+    return {match.group(1) for match in _NAME_RE.finditer(raw_output)}
+
+
+def parse_vlans(raw_output: str) -> Set[int]:
+    """'1,100,901-905' style lists from 'show vlan summary'."""
+    vlans: Set[int] = set()
+    for line in raw_output.splitlines():
+        if not _VLAN_LINE_RE.match(line.strip() or "x"):
+            continue
+        for start, end in _VLAN_RANGE_RE.findall(line):
+            vlans.update(range(int(start), int(end or start) + 1))
+    return vlans
+
+
+class ProfileCatalog:
+    """
+    Per-OLT snapshot of tcont / traffic-limit / qos profiles and VLANs, keyed
+    by host. Validation runs purely in memory; a kind that is not loaded (or
+    came back empty) is not checked, so a missing snapshot never blocks
+    provisioning.
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    async def load(self, client) -> Dict[str, Any]:
+        """Reads the catalog through an already connected TelnetClient."""
+        commands = CATALOG_COMMANDS["c600" if client.is_c600 else "c300"]
+        entry: Dict[str, Any] = {}
+        async with client.session(CHEAP_SHOW):
+            for kind, command in commands.items():
+                output = await client._execute_command(command)
+                entry[kind] = parse_vlans(output) if kind == "vlan" else parse_profile_names(output)
+        entry["loaded_at"] = time.time()
+        self._entries[client.host] = entry
+        return entry
+
+    def get(self, host: str) -> Optional[Dict[str, Any]]:
+        return self._entries.get(host)
+
+    def validate(self, host: str, checks: Iterable[Tuple[str, Tuple[Any, ...]]]) -> None:
+        """
+        Each check is (kind, candidates) and passes when any candidate is in the
+        OLT's catalog. Raises ProfileValidationError listing every failed check.
+        """
+        entry = self._entries.get(host)
+        if entry is None:
+            return
+        missing = [
+            f"{kind} {' / '.join(map(str, candidates))}"
+            for kind, candidates in checks
+            if entry.get(kind) and not any(c in entry[kind] for c in candidates)
+        ]
+        if missing:
+            raise ProfileValidationError(f"Tidak ada di OLT {host}: {', '.join(missing)}")
+
+    async def refresh_all(self, manager) -> Dict[str, Optional[str]]:
+        """Reloads every OLT concurrently; returns olt_name -> error (None on success)."""
+        async def refresh(olt_name: str, olt_info: Dict[str, Any]) -> Optional[str]:
+            try:
+                client = await manager.get_connection(
+                    host=olt_info["ip"],
+                    username=settings.OLT_USERNAME,
+                    password=settings.OLT_PASSWORD,
+                    is_c600=olt_info["c600"]
+                )
+                entry = await self.load(client)
+                logging.info(f"📚 Katalog profil {olt_name}: " + ", ".join(
+                    f"{kind}={len(values)}" for kind, values in entry.items() if kind != "loaded_at"
+                ))
+                return None
+            except Exception as e:
+                logging.warning(f"Gagal memuat katalog profil {olt_name}: {e}")
+                return str(e)
+
+        names = list(OLT_OPTIONS)
+        errors = await asyncio.gather(*(refresh(name, OLT_OPTIONS[name]) for name in names))
+        return dict(zip(names, errors))
+
+    def start(self, manager) -> None:
+        """Background refresher: first load right away, then every PROFILE_CATALOG_REFRESH_SECONDS."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._refresh_loop(manager))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _refresh_loop(self, manager) -> None:
+        while True:
+            await self.refresh_all(manager)
+            await asyncio.sleep(settings.PROFILE_CATALOG_REFRESH_SECONDS)
+
+
+def provisioning_checks(is_c600: bool, base_paket: str, vlan: str, up_profile: Optional[str] = None) -> List[Tuple[str, Tuple[Any, ...]]]:
+    """
+    Catalog checks for one provisioning request. Without up_profile either
+    tcont variant (-FIX/-MBW) is accepted, since DBA picks one later.
+    """
+    ups = (f"UP-{up_profile}",) if up_profile else (f"UP-{base_paket}-FIX", f"UP-{base_paket}-MBW")
+    down = f"DOWN-{base_paket.replace('MB', 'M')}"
+    checks = [("tcont", ups), ("qos" if is_c600 else "traffic", (down,))]
+    if str(vlan).isdigit():
+        checks.append(("vlan", (int(vlan),)))
+    return checks
+
+
+# Global Instance
+profile_catalog = ProfileCatalog()
@@ -0,0 +1,143 @@
+# services/provisioning_templates.py
+
+import logging
+import re
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, List, Mapping
+
+import yaml
+from jinja2 import Environment, Template, StrictUndefined
+
+# Resolved from this file, not the process CWD
+TEMPLATE_DIR = Path(__file__).resolve().parent.parent / "templates"
+
+# OLT model -> template file
+TEMPLATE_FILES = {
+    "c300": "config_c300.yaml",
+    "c600": "config_c600.yaml",
+    "bridge": "config_bridge.yaml",
+}
+
+_ITEM_RE = re.compile(r'^-\s+"(.*)$')
+
+
+class TemplateError(RuntimeError):
+    """A provisioning template could not be loaded, compiled or validated."""
+
+
+def _single_line(value: Any) -> Any:
+    # Every {{ expression }} must stay inside its own command line
+    if isinstance(value, str):
+        return value.replace("\r", " ").replace("\n", " ")
+    return value
+
+
+def yaml_to_command_source(name: str, source: str) -> str:
+    """
+    Turn a YAML list of double-quoted Jinja commands into a Jinja template
+    that emits one command per line. Multi-line quoted items are folded with
+    a single space, exactly like YAML does; comments and blank lines go away
+    and {% ... %} block lines are kept as-is.
+    """
+    lines = source.splitlines()
+    out: List[str] = []
+    i = 0
+    while i < len(lines):
+        stripped = lines[i].strip()
+        if not stripped or stripped.startswith("#"):
+            i += 1
+            continue
+        if stripped.startswith("{%"):
+            out.append(stripped)
+            i += 1
+            continue
+
+        match = _ITEM_RE.match(stripped)
+        if not match:
+            raise TemplateError(f"{name}:{i + 1}: expected '- \"command\"', got {stripped!r}")
+
+        start = i
+        body = match.group(1).rstrip()
+        while not body.endswith('"'):
+            i += 1
+            if i >= len(lines):
+                raise TemplateError(f"{name}:{start + 1}: unterminated quoted command")
+            body = f"{body} {lines[i].strip()}".rstrip()
+        out.append(body[:-1])
+        i += 1
+    return "\n".join(out)
+
+
+class TemplateRegistry:
+    """
+    Loads the provisioning templates once, compiles them to Jinja templates
+    that render straight to command lists (no YAML round trip per request)
+    and checks each against the YAML rendering of a sample context.
+    """
+
+    def __init__(self, template_dir: Path = TEMPLATE_DIR):
+        self.template_dir = template_dir
+        self._env = Environment(
+            trim_blocks=True, lstrip_blocks=True, undefined=StrictUndefined, finalize=_single_line,
+        )
+        self._compiled: Dict[str, Template] = {}
+
+    def load(self) -> None:
+        """Compile and validate every template; raises TemplateError on the first bad one."""
+        compiled = {}
+        for model, filename in TEMPLATE_FILES.items():
+            path = self.template_dir / filename
+            try:
+                source = path.read_text(encoding="utf-8")
+                compiled[model] = self._env.from_string(yaml_to_command_source(filename, source))
+                self._validate(filename, source, compiled[model])
+            except TemplateError:
+                raise
+            except Exception as e:
+                raise TemplateError(f"{filename}: {e}") from e
+        self._compiled = compiled
+        logging.info(f"📄 Provisioning templates loaded: {', '.join(compiled)}")
+
+    def _validate(self, filename: str, source: str, template: Template) -> None:
+        """The compiled output must equal what Jinja -> yaml.safe_load gives for a sample ONT."""
+        context = self.sample_context()
+        expected = yaml.safe_load(Environment(trim_blocks=True, lstrip_blocks=True).from_string(source).render(context))
+        if not isinstance(expected, list) or not all(isinstance(c, str) and c for c in expected):
+            raise TemplateError(f"{filename}: must render to a list of non-empty command strings")
+        actual = self._to_commands(template, context)
+        if actual != expected:
+            raise TemplateError(f"{filename}: compiled commands differ from the YAML rendering")
+
+    @staticmethod
+    def sample_context() -> Dict[str, Any]:
+        customer = SimpleNamespace(name="SAMPLE NAME", address="SAMPLE ADDRESS", pppoe_user="sample", pppoe_pass="secret")
+        return {
+            "interface_olt": "gpon-olt_1/1/1", "interface_onu": "gpon-onu_1/1/1:1",
+            "pon_slot": "1", "pon_port": "1", "onu_id": 1, "sn": "ZTEG00000000",
+            "customer": customer, "vlan": "900", "up_profile": "10MB-FIX", "down_profile": "10M",
+            "paket": "10M", "jenismodem": "ALL", "eth_locks": [False, True, False, True],
+        }
+
+    @staticmethod
+    def _to_commands(template: Template, context: Mapping[str, Any]) -> List[str]:
+        return [line.strip() for line in template.render(context).splitlines() if line.strip()]
+
+    def _template(self, model: str) -> Template:
+        if not self._compiled:
+            self.load()
+        try:
+            return self._compiled[model]
+        except KeyError:
+            raise TemplateError(f"No provisioning template for model '{model}'")
+
+    def render(self, model: str, context: Mapping[str, Any]) -> List[str]:
+        return self._to_commands(self._template(model), context)
+
+
+def template_model(is_c600: bool) -> str:
+    return "c600" if is_c600 else "c300"
+
+
+# Global Instance
+template_registry = TemplateRegistry()
@@ -0,0 +1,165 @@
+# services/rate_limit.py
+
+import asyncio
+import math
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional, Tuple
+
+from core.config import settings
+
+# Read-only commands: safe to run again on a fresh session when the old one drops
+IDEMPOTENT_PREFIXES = ("show ", "terminal length ")
+
+CHEAP_SHOW = "show"
+EXPENSIVE_SHOW = "show_heavy"
+CONFIG = "config"
+
+
+class OltBusyError(Exception):
+    """Too many commands already queued for this OLT and command class."""
+
+    def __init__(self, host: str, command_class: str, retry_after: float):
+        self.host = host
+        self.command_class = command_class
+        self.retry_after = max(1, math.ceil(retry_after))
+        super().__init__(
+            f"OLT {host} sedang sibuk ({command_class}), coba lagi dalam {self.retry_after} detik"
+        )
+
+
+def is_idempotent(command: str) -> bool:
+    return command.strip().lower().startswith(IDEMPOTENT_PREFIXES)
+
+
+def command_class(command: str) -> str:
+    if not is_idempotent(command):
+        return CONFIG
+    command = command.strip().lower()
+    if command.startswith(tuple(settings.OLT_EXPENSIVE_SHOW_PREFIXES)):
+        return EXPENSIVE_SHOW
+    return CHEAP_SHOW
+
+
+class TokenBucket:
+    """
+    `rate` tokens per second, at most `burst` saved up. A command that finds
+    no token reserves the next one and sleeps until it is due. Request
+    handlers also count here while they wait for the session lock
+    (`queued`); once `max_queue` callers wait, new ones are rejected.
+    """
+
+    def __init__(self, rate: float, burst: float, max_queue: int):
+        self.rate = rate
+        self.burst = burst
+        self.max_queue = max_queue
+        self.tokens = burst
+        self.waiting = 0
+        self.queued = 0
+        self.admitted = 0
+        self.rejected = 0
+        self._updated: Optional[float] = None
+
+    def _refill(self, now: float) -> None:
+        if self._updated is not None:
+            self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def retry_after(self) -> float:
+        """Seconds until a new caller would get a token, behind everyone already queued."""
+        return max(0.0, self.queued + 1 - self.tokens) / self.rate
+
+    def check(self, host: str, cls: str) -> None:
+        """Rejects a new caller when `max_queue` callers already wait for the lock or a token."""
+        self._refill(asyncio.get_running_loop().time())
+        if self.queued + self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise OltBusyError(host, cls, self.retry_after())
+
+    async def acquire(self, host: str, cls: str, reject: bool = True) -> None:
+        loop = asyncio.get_running_loop()
+        self._refill(loop.time())
+        if reject and self.tokens < 1 and self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise OltBusyError(host, cls, self.retry_after())
+        self.tokens -= 1
+        self.admitted += 1
+        if self.tokens >= 0:
+            return
+        self.waiting += 1
+        try:
+            await asyncio.sleep(-self.tokens / self.rate)
+        except asyncio.CancelledError:
+            self.tokens += 1  # hand the reserved token back
+            raise
+        finally:
+            self.waiting -= 1
+
+
+class CommandLimiter:
+    """
+    One token bucket per OLT and command class (cheap show, expensive show,
+    config), shared by every session to that OLT. Rates come from
+    OLT_COMMAND_RATES for the OLT's model ("c300" / "c600").
+    """
+
+    def __init__(self):
+        self._buckets: Dict[Tuple[str, str], TokenBucket] = {}
+
+    def bucket(self, host: str, is_c600: bool, cls: str) -> Optional[TokenBucket]:
+        key = (host, cls)
+        if key not in self._buckets:
+            rate = settings.OLT_COMMAND_RATES.get("c600" if is_c600 else "c300", {}).get(cls)
+            if not rate:
+                return None  # not limited
+            burst = max(1.0, rate * settings.OLT_COMMAND_BURST_SECONDS)
+            self._buckets[key] = TokenBucket(rate, burst, settings.OLT_COMMAND_MAX_QUEUE)
+        return self._buckets[key]
+
+    async def acquire(self, host: str, is_c600: bool, command: str, reject: bool = True) -> None:
+        cls = command_class(command)
+        bucket = self.bucket(host, is_c600, cls)
+        if bucket is not None:
+            await bucket.acquire(host, cls, reject=reject)
+
+    def check(self, host: str, is_c600: bool, cls: str) -> Optional[TokenBucket]:
+        bucket = self.bucket(host, is_c600, cls)
+        if bucket is not None:
+            bucket.check(host, cls)
+        return bucket
+
+    @asynccontextmanager
+    async def queued(self, host: str, is_c600: bool, cls: str):
+        """
+        Counts the caller as queued for the OLT while the body waits for the
+        session lock. Rejects with OltBusyError before the wait when the
+        queue of that class is already full.
+        """
+        bucket = self.check(host, is_c600, cls)
+        if bucket is None:
+            yield
+            return
+        bucket.queued += 1
+        try:
+            yield
+        finally:
+            bucket.queued -= 1
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        result: Dict[str, Dict[str, Any]] = {}
+        loop_time = asyncio.get_event_loop().time()
+        for (host, cls), bucket in self._buckets.items():
+            bucket._refill(loop_time)
+            result.setdefault(host, {})[cls] = {
+                "rate": bucket.rate,
+                "burst": bucket.burst,
+                "tokens": round(bucket.tokens, 2),
+                "waiting": bucket.waiting,
+                "queued": bucket.queued,
+                "admitted": bucket.admitted,
+                "rejected": bucket.rejected,
+            }
+        return result
+
+
+# Global Instance
+command_limiter = CommandLimiter()
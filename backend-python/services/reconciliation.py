@@ -0,0 +1,188 @@
+# services/reconciliation.py
+
+import asyncio
+import datetime as dt
+import logging
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from core.olt_config import OLT_OPTIONS, OLT_ALIASES
+from services.connection_manager import olt_manager
+from services.data_fiber import DataFiberRepository
+from services.olt_reader import OltReader
+
+# Mismatch classes reported by `reconcile`
+SN_MOVED = "sn_moved"                  # SN is live, but on another OLT/interface than the workbook says
+SN_MISMATCH = "sn_mismatch"            # workbook interface is live with a different (or no recorded) SN
+GHOST_ROW = "ghost_row"                # workbook row whose SN/interface is not on the OLT at all
+UNREGISTERED_ONU = "unregistered_onu"  # live ONU no workbook row refers to
+
+REPORT_COLUMNS = [
+    "class", "olt_name", "user_pppoe", "name",
+    "excel_interface", "live_interface", "excel_sn", "live_sn", "live_state",
+]
+
+
+def normalize_excel(rows: List[Dict[str, Any]]) -> pd.DataFrame:
+    """data_fiber rows -> olt_name (canonical), interface '1/1/1:5', port, onu_sn."""
+    df = pd.DataFrame(rows, columns=["user_pppoe", "name", "olt_name", "olt_port", "interface", "onu_sn"])
+    olt = df["olt_name"].fillna("").str.upper().str.strip()
+    df["olt_name"] = olt.map(lambda n: OLT_ALIASES.get(n, n))
+    parts = df["interface"].fillna("").str.extract(r"(\d+/\d+/\d+):(\d+)")
+    df["port"] = parts[0]
+    df["interface"] = (parts[0] + ":" + parts[1]).where(parts[0].notna())
+    df["onu_sn"] = df["onu_sn"].fillna("").str.upper().str.strip().replace("", None)
+    return df
+
+
+def reconcile(excel: pd.DataFrame, live: pd.DataFrame) -> pd.DataFrame:
+    """
+    Classify drift between workbook rows and live ONUs with vectorized joins.
+    `excel` must only contain rows for the OLT ports that were scanned.
+    """
+    live = live[["olt_name", "interface", "onu_sn", "state"]]
+
+    # 1. Join on SN (globally unique), then on placement
+    with_sn = excel[excel["onu_sn"].notna()]
+    by_sn = with_sn.merge(
+        live[live["onu_sn"].notna()].rename(columns={"olt_name": "live_olt", "interface": "live_interface"}),
+        on="onu_sn", how="left",
+    )
+    found = by_sn["live_interface"].notna()
+    moved = by_sn[found & (
+        (by_sn["live_olt"] != by_sn["olt_name"]) | (by_sn["live_interface"] != by_sn["interface"])
+    )]
+
+    # 2. Rows whose SN is not live (or that have no SN): what sits on their interface?
+    unmatched = pd.concat([by_sn[~found][excel.columns], excel[excel["onu_sn"].isna()]])
+    by_iface = unmatched.merge(
+        live.rename(columns={"onu_sn": "live_sn"}), on=["olt_name", "interface"], how="left", indicator=True,
+    )
+    occupied = by_iface["_merge"] == "both"
+
+    # 3. Live ONUs that no workbook row claims by SN or by interface
+    claimed_sn = set(with_sn["onu_sn"])
+    claimed_iface = excel[["olt_name", "interface"]].dropna().drop_duplicates()
+    loose = live[~live["onu_sn"].isin(claimed_sn)].merge(
+        claimed_iface, on=["olt_name", "interface"], how="left", indicator=True,
+    )
+    unregistered = loose[loose["_merge"] == "left_only"]
+
+    frames = [
+        pd.DataFrame({
+            "class": SN_MOVED, "olt_name": moved["olt_name"], "user_pppoe": moved["user_pppoe"],
+            "name": moved["name"], "excel_interface": moved["interface"],
+            "live_interface": moved["live_olt"] + " " + moved["live_interface"],
+            "excel_sn": moved["onu_sn"], "live_sn": moved["onu_sn"], "live_state": moved["state"],
+        }),
+        pd.DataFrame({
+            "class": SN_MISMATCH, "olt_name": by_iface.loc[occupied, "olt_name"],
+            "user_pppoe": by_iface.loc[occupied, "user_pppoe"], "name": by_iface.loc[occupied, "name"],
+            "excel_interface": by_iface.loc[occupied, "interface"], "live_interface": by_iface.loc[occupied, "interface"],
+            "excel_sn": by_iface.loc[occupied, "onu_sn"], "live_sn": by_iface.loc[occupied, "live_sn"],
+            "live_state": by_iface.loc[occupied, "state"],
+        }),
+        pd.DataFrame({
+            "class": GHOST_ROW, "olt_name": by_iface.loc[~occupied, "olt_name"],
+            "user_pppoe": by_iface.loc[~occupied, "user_pppoe"], "name": by_iface.loc[~occupied, "name"],
+            "excel_interface": by_iface.loc[~occupied, "interface"], "live_interface": None,
+            "excel_sn": by_iface.loc[~occupied, "onu_sn"], "live_sn": None, "live_state": None,
+        }),
+        pd.DataFrame({
+            "class": UNREGISTERED_ONU, "olt_name": unregistered["olt_name"], "user_pppoe": None, "name": None,
+            "excel_interface": None, "live_interface": unregistered["interface"],
+            "excel_sn": None, "live_sn": unregistered["onu_sn"], "live_state": unregistered["state"],
+        }),
+    ]
+    report = pd.concat([f for f in frames if not f.empty], ignore_index=True)
+    if report.empty:
+        return pd.DataFrame(columns=REPORT_COLUMNS)
+    return report[REPORT_COLUMNS].sort_values(["olt_name", "class", "excel_interface"], na_position="last")
+
+
+async def collect_live_onus(olt_name: str, ports: List[str]) -> List[Dict[str, Any]]:
+    """Read every registered ONU (interface + SN) on the given ports of one OLT."""
+    reader = OltReader(olt_manager, olt_name)
+    onus = []
+    for port in ports:
+        port_onus = await reader.onu_baseinfo(port)
+        for onu in port_onus:
+            onu["olt_name"] = olt_name
+        onus.extend(port_onus)
+    return onus
+
+
+class ReconciliationManager:
+    """Runs reconciliation jobs in the background and keeps their reports in memory."""
+
+    def __init__(self):
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._reports: Dict[str, pd.DataFrame] = {}
+
+    def start(self, repo: DataFiberRepository, olt_names: Optional[List[str]] = None) -> str:
+        job_id = uuid.uuid4().hex
+        olts = [n.upper() for n in olt_names] if olt_names else list(OLT_OPTIONS)
+        self._jobs[job_id] = {
+            "job_id": job_id,
+            "status": "running",
+            "olts": {name: {"status": "pending", "ports": 0, "onus": 0, "seconds": None, "error": None} for name in olts},
+            "summary": None,
+            "started_at": dt.datetime.utcnow(),
+            "finished_at": None,
+            "error": None,
+        }
+        asyncio.create_task(self._run(job_id, repo, olts))
+        return job_id
+
+    async def _run(self, job_id: str, repo: DataFiberRepository, olts: List[str]) -> None:
+        job = self._jobs[job_id]
+        try:
+            excel = normalize_excel(await repo.list_placements())
+
+            async def scan(olt_name: str) -> List[Dict[str, Any]]:
+                state = job["olts"][olt_name]
+                ports = sorted(excel.loc[excel["olt_name"] == olt_name, "port"].dropna().unique())
+                state.update(status="running", ports=len(ports))
+                start = time.perf_counter()
+                try:
+                    onus = await collect_live_onus(olt_name, ports)
+                    state.update(status="done", onus=len(onus))
+                    return onus
+                except Exception as e:
+                    logging.error(f"Reconciliation gagal untuk OLT {olt_name}: {e}")
+                    state.update(status="error", error=str(e))
+                    return []
+                finally:
+                    state["seconds"] = round(time.perf_counter() - start, 2)
+
+            # One session per OLT, all OLTs in parallel
+            results = await asyncio.gather(*(scan(name) for name in olts))
+
+            scanned = [name for name in olts if job["olts"][name]["status"] == "done"]
+            live = pd.DataFrame(
+                [onu for onus in results for onu in onus],
+                columns=["olt_name", "interface", "port", "onu_id", "type", "onu_sn", "state"],
+            )
+            report = reconcile(excel[excel["olt_name"].isin(scanned) & excel["port"].notna()], live)
+
+            self._reports[job_id] = report
+            job["summary"] = report["class"].value_counts().to_dict()
+            job["status"] = "success"
+        except Exception as e:
+            logging.error(f"Reconciliation job {job_id} gagal: {e}")
+            job.update(status="error", error=str(e))
+        finally:
+            job["finished_at"] = dt.datetime.utcnow()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self._jobs.get(job_id)
+
+    def report(self, job_id: str) -> Optional[pd.DataFrame]:
+        return self._reports.get(job_id)
+
+
+# Global Instance
+reconciliation_manager = ReconciliationManager()
@@ -0,0 +1,117 @@
+# services/rx_analytics.py
+
+import time
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from core.config import settings
+from services.optical_power import MISSING, RxPowerStore
+
+
+def _last_valid(dbm: np.ndarray, valid: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Newest sampled value per row and whether the row has one at all."""
+    has = valid.any(axis=1)
+    last = dbm.shape[1] - 1 - np.argmax(valid[:, ::-1], axis=1)
+    latest = np.where(has, dbm[np.arange(dbm.shape[0]), last], np.nan)
+    return latest, has
+
+
+def _slopes(times: np.ndarray, dbm: np.ndarray, valid: np.ndarray, min_samples: int) -> np.ndarray:
+    """
+    Least-squares slope (dB/day) per row over its sampled columns, via four
+    matrix-vector products; NaN when a row has fewer than min_samples points.
+    `dbm` must hold 0 where `valid` is False.
+    """
+    x = (times.astype(np.float64) - float(times.mean())) / 86400.0
+    x = x.astype(np.float32)
+    w = valid.astype(np.float32)
+    n = w.sum(axis=1)
+    sx, sxx = w @ x, w @ (x * x)
+    sy, sxy = dbm.sum(axis=1), dbm @ x
+    with np.errstate(invalid="ignore", divide="ignore"):
+        denom = n * sxx - sx * sx
+        slope = (n * sxy - sx * sy) / denom
+    return np.where((n >= min_samples) & (denom > 1e-9), slope, np.nan)
+
+
+def _port_zscores(latest: np.ndarray, groups: np.ndarray) -> np.ndarray:
+    """z-score of every ONU's latest rx against the other ONUs on its PON port."""
+    valid = ~np.isnan(latest)
+    values = np.where(valid, latest, 0.0)
+    count = np.bincount(groups, weights=valid)
+    total = np.bincount(groups, weights=values)
+    squares = np.bincount(groups, weights=values * values)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = total / count
+        std = np.sqrt(np.maximum(squares / count - mean * mean, 0.0))
+        z = (latest - mean[groups]) / std[groups]
+    return np.where(std[groups] > 0, z, 0.0)
+
+
+def analyze_rx(store: RxPowerStore, olt_name: Optional[str] = None, hours: float = 24 * 7,
+               limit: int = 50, min_samples: int = 4) -> Dict[str, Any]:
+    """
+    Ranks ONUs by how bad their optics look, fully vectorized over the ring buffer:
+    - threshold deficit below RX_WEAK_DBM (RX_CRITICAL_DBM flags critical)
+    - per-port z-score of the latest reading (negative = weaker than neighbours)
+    - least-squares slope over the window in dB/day (negative = degrading)
+    """
+    started = time.perf_counter()
+    rows = np.arange(len(store.keys)) if olt_name is None else store.rows_for(olt_name)
+    empty = {"onus": 0, "flagged": 0, "seconds": 0.0, "items": []}
+    if rows.size == 0:
+        return empty
+
+    times, raw = store.raw(None if olt_name is None else rows, since=time.time() - hours * 3600)
+    if raw.shape[1] == 0:
+        return empty
+
+    valid = raw != MISSING
+    dbm = raw.astype(np.float32)
+    dbm *= 0.01
+    dbm[~valid] = 0.0
+
+    latest, has = _last_valid(dbm, valid)
+    latest = latest.astype(np.float64)
+    groups = np.asarray(store.port_ids, dtype=np.int64)[rows]
+    z = _port_zscores(latest, groups)
+    slope = _slopes(times, dbm, valid, min_samples)
+
+    weak, critical = settings.RX_WEAK_DBM, settings.RX_CRITICAL_DBM
+    deficit = np.clip(weak - latest, 0.0, None)
+    degrading = np.clip(-np.nan_to_num(slope), 0.0, None)
+    # dB below threshold + sigmas below the port + dB lost per week
+    score = np.where(has, deficit + np.clip(-z, 0.0, None) + degrading * 7.0, -np.inf)
+
+    flags = {
+        "critical": has & (latest < critical),
+        "weak": has & (latest < weak),
+        "outlier": has & (z < -settings.RX_ZSCORE_OUTLIER),
+        "degrading": np.nan_to_num(slope) < -settings.RX_DEGRADATION_DB_PER_DAY,
+    }
+    flagged = np.logical_or.reduce(list(flags.values()))
+
+    candidates = np.flatnonzero(flagged)
+    order = candidates[np.argsort(-score[candidates], kind="stable")][:limit]
+    items = []
+    for i in order:
+        olt, interface = store.keys[rows[i]]
+        items.append({
+            "olt_name": olt,
+            "interface": interface,
+            "port": store.ports[rows[i]][1],
+            "rx_dbm": round(float(latest[i]), 2),
+            "port_zscore": round(float(z[i]), 2),
+            "slope_db_per_day": None if np.isnan(slope[i]) else round(float(slope[i]), 3),
+            "score": round(float(score[i]), 2),
+            "flags": [name for name, mask in flags.items() if mask[i]],
+        })
+
+    return {
+        "onus": int(has.sum()),
+        "flagged": int(flagged.sum()),
+        "thresholds": {"weak_dbm": weak, "critical_dbm": critical},
+        "seconds": round(time.perf_counter() - started, 4),
+        "items": items,
+    }
@@ -0,0 +1,147 @@
+# services/snmp.py
+
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.config import settings
+
+# ZXAN (C300/C320) GPON ONU tables, indexed by <PON ifIndex>.<onu id>[.<sub>]
+ZTE_C300_OIDS = {
+    "onu_type": "1.3.6.1.4.1.3902.1012.3.28.1.1.1",
+    "onu_name": "1.3.6.1.4.1.3902.1012.3.28.1.1.2",
+    "onu_sn": "1.3.6.1.4.1.3902.1012.3.28.1.1.5",
+    "onu_phase": "1.3.6.1.4.1.3902.1012.3.28.2.1.4",
+    "onu_rx": "1.3.6.1.4.1.3902.1012.3.50.12.1.1.10",
+}
+# Only the ZXAN tables are mapped; C600 OLTs stay on Telnet
+SNMP_OIDS = {"c300": ZTE_C300_OIDS}
+
+# zxGponOntPhaseState -> the phase text 'show gpon onu state' prints
+PHASE_STATES = {
+    1: "logging", 2: "LOS", 3: "syncMib", 4: "working", 5: "DyingGasp", 6: "AuthFailed", 7: "OffLine",
+}
+RX_NO_READING = 65535
+
+
+class SnmpError(ConnectionError):
+    pass
+
+
+def _hlapi():
+    """pysnmp, imported on first use so Telnet-only deployments boot without it."""
+    try:
+        from pysnmp.hlapi.v3arch import asyncio as hlapi
+    except ImportError as e:
+        raise ValueError(f"pysnmp tidak terpasang ({e})")
+    return hlapi
+
+
+def port_ifindex(port: str) -> int:
+    """'1/2/1' (rack/slot/port) -> ZXAN PON ifIndex, e.g. 268566784 (0x10020100)."""
+    rack, slot, pon = (int(part) for part in port.split("/"))
+    return (1 << 28) | ((rack - 1) << 24) | (slot << 16) | (pon << 8)
+
+
+def rx_dbm(raw: int) -> Optional[float]:
+    """ONU rx in 0.002 dB steps above -30 dBm; 65535 means no reading."""
+    if raw == RX_NO_READING:
+        return None
+    return round(raw * 0.002 - 30.0, 3)
+
+
+def format_sn(value: Any) -> Optional[str]:
+    """8-byte GPON serial (4 vendor chars + 4 bytes) -> 'ZTEGC8A1B2C3'."""
+    raw = value.asOctets() if hasattr(value, "asOctets") else bytes(value)
+    if len(raw) == 8 and raw[:4].isalpha():
+        return (raw[:4].decode("ascii") + raw[4:].hex()).upper()
+    text = raw.decode("ascii", errors="ignore").replace(":", "").strip()
+    return text.upper() or None
+
+
+class SnmpClient:
+    """
+    Read-only ONU queries over SNMP GETBULK: one walk per MIB column per
+    PON port, columns walked concurrently. Returns the same shapes as the
+    Telnet parsers so callers can switch per OLT.
+    """
+
+    _engine: Optional[Any] = None  # pysnmp SnmpEngine, shared by every client
+
+    def __init__(self, host: str, is_c600: bool, community: Optional[str] = None, port: Optional[int] = None):
+        model = "c600" if is_c600 else "c300"
+        if model not in SNMP_OIDS:
+            raise ValueError(f"SNMP belum dipetakan untuk model {model}")
+        self.hlapi = _hlapi()
+        self.host = host
+        self.is_c600 = is_c600
+        self.oids = SNMP_OIDS[model]
+        self.community = community or settings.SNMP_COMMUNITY
+        self.port = port or settings.SNMP_PORT
+        self._target: Optional[Any] = None
+
+    @classmethod
+    def engine(cls):
+        if cls._engine is None:
+            cls._engine = _hlapi().SnmpEngine()
+        return cls._engine
+
+    async def _walk(self, column: str, port: str) -> List[Tuple[Tuple[int, ...], Any]]:
+        """(index suffix after the ifIndex, value) for every row of one column on one port."""
+        hlapi = self.hlapi
+        if self._target is None:
+            self._target = await hlapi.UdpTransportTarget.create(
+                (self.host, self.port), timeout=settings.SNMP_TIMEOUT, retries=settings.SNMP_RETRIES,
+            )
+        base = f"{self.oids[column]}.{port_ifindex(port)}"
+        prefix = tuple(int(part) for part in base.split("."))
+        rows = []
+        async for error_indication, error_status, error_index, var_binds in hlapi.bulk_walk_cmd(
+            self.engine(), hlapi.CommunityData(self.community), self._target, hlapi.ContextData(),
+            0, settings.SNMP_MAX_REPETITIONS, hlapi.ObjectType(hlapi.ObjectIdentity(base)),
+            lexicographicMode=False, lookupMib=False,
+        ):
+            if error_indication:
+                raise SnmpError(f"SNMP {self.host}: {error_indication}")
+            if error_status:
+                raise SnmpError(f"SNMP {self.host}: {error_status.prettyPrint()} at {error_index}")
+            for oid, value in var_binds:
+                rows.append((tuple(oid)[len(prefix):], value))
+        return rows
+
+    def _onu_interface(self, port: str, onu_id: int) -> str:
+        return f"{'gpon_onu-' if self.is_c600 else 'gpon-onu_'}{port}:{onu_id}"
+
+    async def get_onu_states(self, port: str) -> Dict[str, str]:
+        """{'1/1/1:5': phase} like parse_onu_states on 'show gpon onu state'."""
+        rows = await self._walk("onu_phase", port)
+        return {f"{port}:{index[0]}": PHASE_STATES.get(int(value), str(value)) for index, value in rows}
+
+    async def get_onu_rx(self, port: str) -> List[Tuple[str, float]]:
+        """(interface, rx dBm) like parse_onu_rx on 'show pon power onu-rx'."""
+        rows = await self._walk("onu_rx", port)
+        return [
+            (self._onu_interface(port, index[0]), dbm)
+            for index, value in rows if (dbm := rx_dbm(int(value))) is not None
+        ]
+
+    async def get_onu_baseinfo(self, port: str) -> List[Dict[str, Any]]:
+        """Same rows as TelnetClient.get_onu_baseinfo, plus the ONU name."""
+        types, names, sns, phases = await asyncio.gather(
+            *(self._walk(column, port) for column in ("onu_type", "onu_name", "onu_sn", "onu_phase"))
+        )
+        by_id: Dict[int, Dict[str, Any]] = {}
+        for index, value in types:
+            by_id[index[0]] = {
+                "interface": f"{port}:{index[0]}", "port": port, "onu_id": index[0],
+                "type": str(value), "onu_sn": None, "state": None, "name": None,
+            }
+        for index, value in names:
+            if index[0] in by_id:
+                by_id[index[0]]["name"] = str(value)
+        for index, value in sns:
+            if index[0] in by_id:
+                by_id[index[0]]["onu_sn"] = format_sn(value)
+        for index, value in phases:
+            if index[0] in by_id:
+                by_id[index[0]]["state"] = PHASE_STATES.get(int(value), str(value))
+        return [by_id[onu_id] for onu_id in sorted(by_id)]
@@ -2,33 +2,45 @@ import asyncio
 import re
 import telnetlib3
 import logging
-from typing import Optional, Dict, Any
-from jinja2 import Environment, FileSystemLoader
+import time
+import itertools
+from contextlib import asynccontextmanager
+from typing import Optional, Dict, Any, AsyncIterator
+from core.config import settings
 from core.olt_config import PACKAGE_OPTIONS, OLT_OPTIONS
 from schemas.config_handler import UnconfiguredOnt, ConfigurationRequest, ConfigurationBridgeRequest
-import yaml
+from services.provisioning_templates import template_registry, template_model
+from services.profile_catalog import profile_catalog, provisioning_checks, ProfileValidationError
+from services.pon_survey import dba_survey
+from services.rate_limit import CHEAP_SHOW, command_limiter, is_idempotent
 
 logging.basicConfig(level=logging.INFO)
 logging.getLogger("telnetlib3").setLevel(logging.ERROR)
 
 # --- Removed SessionLoggedOutError ---
 
-try:
-    jinja_env = Environment(loader=FileSystemLoader('templates'), trim_blocks=True, lstrip_blocks=True)
-except Exception as e:
-    logging.error(f"[FATAL ERROR] Tidak dapat memuat folder 'templates' Jinja2: {e}")
-    jinja_env = None
+# Retries of idempotent commands after a dropped session (served at /config/api/olts/sessions)
+retry_stats = {"attempted": 0, "succeeded": 0, "failed": 0, "not_retried": 0, "rerouted": 0, "added_seconds_total": 0.0, "added_seconds_max": 0.0}
+
 
 class TelnetClient:
-    def __init__(self, host: str, username: str, password: str, is_c600: bool):
+    def __init__(self, host: str, username: str, password: str, is_c600: bool, port: int = 23):
         self.host = host
+        self.port = port
         self.username = username
         self.password = password
         self.is_c600 = is_c600
         self._lock = None
         self.reader = None
         self.writer = None
-        self.last_activity = 0
+        self.last_activity = 0  # loop time of the last command (keepalives excluded)
+        self.connected_at = 0
+        self.last_keepalive = 0
+        self.keepalives = 0
+        self.resyncs = 0  # commands that found stale output in front of them
+        self._marker_seq = itertools.count(1)
+        self._prompt: Optional[str] = None  # prompt text seen behind the last resync marker
+        self.pool = None  # ConnectionManager that owns this session; idempotent retries reconnect through it
         self._prompt_re = re.compile(r"(.+[>#])\s*$")
         self._pagination_prompt = "--More--"
 
@@ -38,6 +50,20 @@ class TelnetClient:
         if self._lock is None:
             self._lock = asyncio.Lock()
         return self._lock
+
+    @asynccontextmanager
+    async def session(self, command_class: str = CHEAP_SHOW):
+        """
+        Session lock for request handlers. The caller passes the per-OLT
+        limiter before it starts waiting, so a full queue is answered with
+        429 instead of piling more requests up behind the lock.
+        """
+        async with command_limiter.queued(self.host, self.is_c600, command_class):
+            await self.lock.acquire()
+        try:
+            yield self
+        finally:
+            self.lock.release()
     
     async def connect(self):
         """Fungsi connect manual (pengganti __aenter__)"""
@@ -46,11 +72,12 @@ class TelnetClient:
             
         logging.info(f"🔌 Membuka koneksi baru ke {self.host}...")
         self.reader, self.writer = await asyncio.wait_for(
-            telnetlib3.open_connection(self.host, 23), timeout=20
+            telnetlib3.open_connection(self.host, self.port), timeout=20
         )
         await self._login()
-        await self._disable_pagination()
-        self.last_activity = asyncio.get_event_loop().time()
+        async with self.lock:
+            await self._disable_pagination()
+        self.connected_at = self.last_activity = asyncio.get_event_loop().time()
 
     async def close(self):
         """Fungsi close manual"""
@@ -64,10 +91,11 @@ class TelnetClient:
         self.reader = None
 
 
-    async def _read_until_prompt(self, timeout: int = 20) -> str:
+    async def _read_until_prompt(self, timeout: int = 20, after: Optional[str] = None) -> str:
         """
         Simplified reader. It ONLY looks for the main prompt.
         It does NOT check for "Username:"
+        With `after`, only a prompt that follows that text counts.
         """
         if not self.reader:
             raise ConnectionError("Telnet reader is not available.")
@@ -76,12 +104,16 @@ class TelnetClient:
             while True:
                 chunk = await asyncio.wait_for(self.reader.read(1024), timeout=timeout)
                 if not chunk:
-                    break
+                    raise ConnectionError("session closed by the OLT")
                 data += chunk
 
                 # --- Re-login check is REMOVED ---
 
-                if re.search(self._prompt_re, data):
+                if after is None:
+                    tail = data
+                else:
+                    tail = data.rpartition(after)[2] if after in data else ""
+                if re.search(self._prompt_re, tail):
                     break
                 
                 if self._pagination_prompt in data:
@@ -116,10 +148,10 @@ class TelnetClient:
             logging.info(f"Successfully logged in to OLT {self.host}")
             
         except asyncio.TimeoutError:
-            await self._cleanup_connection()
+            await self.close()
             raise ConnectionError(f"Timeout during login to {self.host}")
         except Exception as e:
-            await self._cleanup_connection()
+            await self.close()
             raise ConnectionError(f"Failed to login: {e}")
 
     async def _disable_pagination(self):
@@ -130,10 +162,96 @@ class TelnetClient:
         await self._execute_command("terminal length 0", timeout=20)
         logging.info(f"Pagination disabled on {self.host}.")
 
-    async def _execute_command(self, command: str, timeout: int = 20) -> str:
+    async def _drain_pending(self) -> str:
+        """Reads whatever the OLT already sent, giving each chunk OLT_DRAIN_TIMEOUT_SECONDS to show up."""
+        stale = ""
+        while True:
+            try:
+                chunk = await asyncio.wait_for(self.reader.read(4096), timeout=settings.OLT_DRAIN_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                return stale
+            if not chunk:
+                raise ConnectionError("session closed by the OLT")
+            stale += chunk
+
+    async def _resync(self, timeout: int = 20) -> None:
+        """
+        Puts the reader right after a fresh prompt: sends a unique comment line
+        and reads up to its echo plus the prompt behind it. Output still in
+        flight from a timed-out command, a late keepalive echo or a banner is
+        consumed here, not by the next command. With OLT_RESYNC_ALWAYS off the
+        marker is only sent when pending bytes are found first.
+        Only the holder of self.lock may read, or another task's output is lost.
+        """
+        if not self.lock.locked():
+            raise RuntimeError(f"Command ke {self.host} dikirim tanpa memegang session lock")
+        stale = ""
+        if not settings.OLT_RESYNC_ALWAYS:
+            stale = await self._drain_pending()
+            if not stale:
+                return
+        marker = f"!sync-{next(self._marker_seq)}"
+        self.writer.write(marker + "\n")
+        await asyncio.wait_for(self.writer.drain(), timeout=10)
+        skipped = await self._read_until_prompt(timeout=timeout, after=marker)
+        self._prompt = skipped.rpartition(marker)[2].strip().splitlines()[-1].strip()
+        if stale or skipped.partition(marker)[0].strip():
+            self.resyncs += 1
+            logging.debug(f"Resync {self.host}: output basi dibuang ({len(stale)} byte di buffer)")
+
+    async def _execute_command(self, command: str, timeout: int = 20, retry: bool = True) -> str:
         """
-        Simplified executor. It does NOT try to re-login.
+        Runs one command. If the session drops, an idempotent (show) command
+        issued from exec mode is run once more on a fresh pooled session,
+        within OLT_RETRY_DEADLINE_SECONDS of the first attempt. Configuration
+        commands, and shows issued from config mode, are never retried.
+        Once this session is closed, the caller's later show commands go
+        straight to the pooled session; they are counted as rerouted, not
+        as retries.
         """
+        in_config = bool(self._prompt and "(config" in self._prompt)
+        if self.writer is None and retry and self.pool is not None and is_idempotent(command) and not in_config:
+            retry_stats["rerouted"] += 1
+            return await self._run_on_fresh_session(command, timeout)
+
+        loop = asyncio.get_event_loop()
+        started = loop.time()
+        try:
+            return await self._run_command(command, timeout)
+        except ConnectionError as e:
+            if not retry or self.pool is None or not is_idempotent(command):
+                raise
+            if self._prompt and "(config" in self._prompt:
+                # A fresh session starts in exec mode, not where this sequence left off
+                retry_stats["not_retried"] += 1
+                raise
+            error = e
+
+        failed_at = loop.time()
+        remaining = settings.OLT_RETRY_DEADLINE_SECONDS - (failed_at - started)
+        await self.close()  # the pool drops this session and connects a new one
+        if remaining <= 0:
+            retry_stats["not_retried"] += 1
+            raise error
+        retry_stats["attempted"] += 1
+        logging.warning(f"🔁 Session {self.host} putus ({error}), '{command}' diulang di session baru")
+        try:
+            output = await asyncio.wait_for(self._run_on_fresh_session(command, timeout), timeout=remaining)
+        except Exception:
+            retry_stats["failed"] += 1
+            raise
+        added = loop.time() - failed_at
+        retry_stats["succeeded"] += 1
+        retry_stats["added_seconds_total"] = round(retry_stats["added_seconds_total"] + added, 3)
+        retry_stats["added_seconds_max"] = round(max(retry_stats["added_seconds_max"], added), 3)
+        return output
+
+    async def _run_on_fresh_session(self, command: str, timeout: int) -> str:
+        fresh = await self.pool.get_connection(self.host, self.username, self.password, self.is_c600)
+        async with fresh.lock:
+            return await fresh._execute_command(command, timeout=timeout, retry=False)
+
+    async def _run_command(self, command: str, timeout: int) -> str:
         if not self.reader or not self.writer:
             raise ConnectionError("Connection not established to execute command.")
         if not command:
@@ -141,15 +259,24 @@ class TelnetClient:
         
         # --- Re-login try/except block is REMOVED ---
         
+        # Per-OLT rate limit; inside a config sequence a command waits but is never rejected
+        in_config = bool(self._prompt and "(config" in self._prompt)
+        await command_limiter.acquire(self.host, self.is_c600, command, reject=not in_config)
+        await self._resync(timeout=timeout)
         self.writer.write(command + "\n")
         await asyncio.wait_for(self.writer.drain(), timeout=10)
         raw_output = await self._read_until_prompt(timeout=timeout)
+        self.last_activity = asyncio.get_event_loop().time()
         
         cleaned_lines = []
         lines = raw_output.splitlines()
+        end = len(lines) - 1
+        if self._prompt:
+            # Output ends at the first prompt behind the echo; anything after it arrived late
+            end = next((i for i, line in enumerate(lines[1:], 1) if line.strip() == self._prompt), end)
 
-        if len(lines) > 2:
-            for line in lines[1:-1]:
+        if end > 1:
+            for line in lines[1:end]:
                 stripped = line.strip()
                 if stripped:
                     cleaned_lines.append(stripped)
@@ -210,6 +337,80 @@ class TelnetClient:
         # If no valid IP was found, return a default
         return "0.0.0.0"
 
+    @staticmethod
+    def _parse_running_config(raw_output: str, interface_onu: str) -> list[str]:
+        """Normalised config lines of one running-config block, without banners, '!' and the section header."""
+        headers = {f"interface {interface_onu}", f"pon-onu-mng {interface_onu}"}
+        lines = []
+        for line in raw_output.splitlines():
+            line = " ".join(line.split())
+            if not line or line in headers or line in ("exit", "end") or line.endswith("#"):
+                continue
+            if line.startswith(("!", "$", "Building configuration")):
+                continue
+            lines.append(line)
+        return lines
+
+    @staticmethod
+    def _verify_intent(commands: list[str], interface_onu: str) -> tuple[dict, int]:
+        """
+        Splits rendered commands into the two blocks the read-back covers:
+        'interface' (interface <onu>) and 'onu' (pon-onu-mng <onu>).
+        Commands in any other block are only counted as unchecked.
+        """
+        intent = {"interface": [], "onu": []}
+        section, unchecked = None, 0
+        for cmd in commands:
+            cmd = " ".join(cmd.split())
+            if cmd == f"interface {interface_onu}":
+                section = "interface"
+            elif cmd == f"pon-onu-mng {interface_onu}":
+                section = "onu"
+            elif cmd == "exit" or (cmd.startswith("interface ") and section != "onu"):
+                # 'interface eth ...' lines belong to the pon-onu-mng block
+                section = None
+            elif section:
+                intent[section].append(cmd)
+            elif cmd != "configure terminal":
+                unchecked += 1
+        return intent, unchecked
+
+    @staticmethod
+    def _line_matches(intent: str, running: str) -> bool:
+        """Running line equals the intent or extends it; password values are masked by the OLT."""
+        want, have = intent.split(), running.split()
+        if len(have) < len(want):
+            return False
+        return all(
+            have[i] == token or (i > 0 and want[i - 1] == "password")
+            for i, token in enumerate(want)
+        )
+
+    @staticmethod
+    def _parse_onu_baseinfo(raw_output: str) -> list[dict]:
+        """
+        Parses 'show gpon onu baseinfo' rows, e.g.
+        gpon-onu_1/2/1:1   ZTE-F609   sn   SN:ZTEGC8A1B2C3   ready
+        """
+        baseinfo_regex = re.compile(
+            r"^\s*gpon[-_]onu[-_](\d+/\d+/\d+):(\d+)\s+(\S+)\s+(\S+)\s+(\S+)\s+(\S+)",
+            re.MULTILINE
+        )
+
+        results = []
+        for match in baseinfo_regex.finditer(raw_output):
+            port, onu_id, onu_type, mode, auth_info, state = match.groups()
+            sn = auth_info[3:] if auth_info.upper().startswith("SN:") else None
+            results.append({
+                "interface": f"{port}:{onu_id}",
+                "port": port,
+                "onu_id": int(onu_id),
+                "type": onu_type,
+                "onu_sn": sn.upper() if sn else None,
+                "state": state,
+            })
+        return results
+
     @staticmethod
     def _parse_onu_attenuation(raw_output: str) -> str:
         # Regex to find the line starting with "down",
@@ -325,6 +526,25 @@ class TelnetClient:
 
         return raw_output
 
+    async def get_onu_baseinfo(self, base_interface: str) -> list[dict]:
+        """
+        Semua ONU terdaftar di 1 port beserta SN-nya
+        """
+        prefix = "gpon_olt-" if self.is_c600 else "gpon-olt_"
+
+        if not base_interface.startswith("gpon"):
+            full_interface = f"{prefix}{base_interface}"
+        else:
+            full_interface = base_interface
+
+        cmd = f"show gpon onu baseinfo {full_interface}"
+        raw_output = await self._execute_command(cmd)
+
+        if not raw_output or "No related information" in raw_output:
+            return []
+
+        return TelnetClient._parse_onu_baseinfo(raw_output)
+
     async def get_attenuation(self, interface: str) -> str:
         prefix = "gpon_onu-" if self.is_c600 else "gpon-onu_"
 
@@ -372,17 +592,15 @@ class TelnetClient:
             full_interface = f"{prefix}{interface}"
         else:
             full_interface = interface
-        
-        full_interface = f"{prefix}{interface}"
         commands_to_send = [
             "configure terminal",
             f"interface {full_interface}"
         ]
         
         if self.is_c600:
-            commands_to_send.extend(["admin disable", "admin enable", "exit"])
+            commands_to_send.extend(["admin disable", "admin enable", "exit", "exit"])
         else:
-            commands_to_send.extend(["shut", "no shut", "exit"])
+            commands_to_send.extend(["shut", "no shut", "exit", "exit"])
 
         try:
             # 2. Execute each command
@@ -401,7 +619,7 @@ class TelnetClient:
         commands_to_send = [
             "configure terminal",
             f"interface {interface_olt}",
-            f"no onu {onu_id}"
+            f"no onu {onu_id}",
             "exit",
             "exit"
         ]
@@ -553,37 +771,81 @@ class TelnetClient:
         logging.info(f"✅ Onu ID kosong ditemukan pada {interface}:{calculation}")
         return calculation
 
-    async def get_dba_rate(self, interface: str) -> float:
-        # The command to check bandwidth
-        command = f"show pon bandwidth dba interface {interface}"
-        
-        # FIX: Increase timeout to 20 seconds because OLT CPU is slow to calculate this
-        # You might need to adjust your _execute_command method to accept a 'timeout' arg
-        # If your class doesn't support it, hardcode the read_until timeout in the class.
-        output = await self._execute_command(command) 
-        
-        # Debug log to see what the script actually saw (remove later)
-        logging.info(f"DBA OUTPUT RAW: {output}")
-
-        # Your Regex (It is correct based on your output)
-        if self.is_c600:
-             # C600 usually has an extra column or different spacing, keep as is if tested
+    @staticmethod
+    def _parse_dba_rate(raw_output: str, interface: str, is_c600: bool) -> Optional[float]:
+        if is_c600:
+            # C600 has an extra column before the rate
             pattern = rf"{re.escape(interface)}\s+\S+\s+\d+\s+\d+\s+\S*\s*(\d+(?:\.\d+)?)"
         else:
             # Matches: interface | channel | config | free | RATE (79.3)
             pattern = rf"{re.escape(interface)}\s+\S+\s+\d+\s+\d+\s+(\d+(?:\.\d+)?)"
-        
-        match = re.search(pattern, output)
-        
-        if match:
-            rate_str = match.group(1)
-            logging.info(f"DBA Rate found: {rate_str}%")
-            return float(rate_str)
-        else:
+        match = re.search(pattern, raw_output)
+        return float(match.group(1)) if match else None
+
+    async def read_dba_rate(self, interface: str) -> Optional[float]:
+        """DBA utilization (%) of one PON port, or None if the output cannot be parsed."""
+        output = await self._execute_command(f"show pon bandwidth dba interface {interface}")
+        logging.debug(f"DBA OUTPUT RAW: {output}")
+        rate = self._parse_dba_rate(output, interface, self.is_c600)
+        if rate is not None:
+            logging.debug(f"DBA Rate {interface}: {rate}%")
+        return rate
+
+    async def get_dba_rate(self, interface: str) -> float:
+        rate = await self.read_dba_rate(interface)
+        if rate is None:
             logging.warning(f"Could not parse DBA rate for {interface}. Defaulting to 0.0")
             return 0.0
+        return rate
+
+    async def verify_configuration(self, commands: list[str], interface_onu: str) -> Dict[str, Any]:
+        """
+        Reads the ONU config back with one 'show running-config interface' and
+        one 'show onu running config', then checks every rendered line of those
+        two blocks against it.
+        """
+        started = time.perf_counter()
+        intent, unchecked = self._verify_intent(commands, interface_onu)
+        running = {
+            "interface": self._parse_running_config(
+                await self._execute_command(f"show running-config interface {interface_onu}"), interface_onu
+            ),
+            "onu": self._parse_running_config(
+                await self._execute_command(f"show onu running config {interface_onu}"), interface_onu
+            ),
+        }
+
+        lines = []
+        for section, expected in intent.items():
+            for cmd in expected:
+                matched = next((line for line in running[section] if self._line_matches(cmd, line)), None)
+                lines.append({"section": section, "line": cmd, "passed": matched is not None, "matched": matched})
+
+        fail_count = sum(1 for line in lines if not line["passed"])
+        return {
+            "interface": interface_onu,
+            "passed": fail_count == 0,
+            "pass_count": len(lines) - fail_count,
+            "fail_count": fail_count,
+            "unchecked": unchecked,
+            "lines": lines,
+            "running": running,
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+
+    async def stream_configuration(self, config_request: ConfigurationRequest, vlan: str, verify: bool = False) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Provisions one ONT and yields an event as soon as each step completes:
+        'start' (interface + command count), one 'command' per CLI line with
+        its OLT output and timing, an optional 'verify' read-back and a final
+        'summary'. Every event carries the SN.
+        """
+        if config_request.package not in PACKAGE_OPTIONS:
+            raise ProfileValidationError(f"Paket '{config_request.package}' tidak dikenal.")
+        base_paket_name = PACKAGE_OPTIONS[config_request.package]
+        # In-memory catalog check before any command reaches the OLT
+        profile_catalog.validate(self.host, provisioning_checks(self.is_c600, base_paket_name, vlan))
 
-    async def apply_configuration(self, config_request: ConfigurationRequest, vlan: str):
         ont_list = await self.find_unconfigured_onts()
         target_ont = next((ont for ont in ont_list if ont.sn == config_request.sn), None)
         if not target_ont:
@@ -594,10 +856,13 @@ class TelnetClient:
             base_iface = f"gpon_olt-1/{target_ont.pon_port}/{target_ont.pon_slot}"
         
         onu_id = await self.find_next_available_onu_id(base_iface)
-        rate = await self.get_dba_rate(base_iface)
+        # Latest survey sample if fresh enough, otherwise ask the OLT
+        rate = dba_survey.latest_rate(self.host, base_iface)
+        if rate is None:
+            rate = await self.get_dba_rate(base_iface)
         up_profile_suffix = "-MBW" if rate > 75.0 else "-FIX"
-        base_paket_name = PACKAGE_OPTIONS[config_request.package]
         up_paket = f"{base_paket_name}{up_profile_suffix}"
+        profile_catalog.validate(self.host, [("tcont", (f"UP-{up_paket}",))])
         down_paket = base_paket_name.replace("MB", "M")
         olt_profile_type = "F670" if config_request.modem_type == "ZTEG-F670" else "ALL"
         
@@ -632,40 +897,58 @@ class TelnetClient:
             "eth_locks": locks  # <--- PASS THE PROCESSED LIST HERE
         }
         
-        template_name = "config_c600.yaml" if self.is_c600 else "config_c300.yaml"
+        # Precompiled at startup; renders straight to the command list
+        commands = template_registry.render(template_model(self.is_c600), context)
+        logging.debug(f"🔍 eth_locks = {context['eth_locks']}")
         
-        def _render_and_parse_yaml():
-            if jinja_env is None:
-                raise RuntimeError("Jinja2 environment not loaded.")
-            template = jinja_env.get_template(template_name)
-            rendered = template.render(context)
-            
-            # Debugging logs to verify data
-            logging.info(f"🔍 DEBUG CHECK: eth_locks content = {context['eth_locks']}")
-            logging.info(f"🔍 DEBUG CHECK: eth_locks length = {len(context['eth_locks'])}")
-            
-            return yaml.safe_load(rendered)
-        
-        commands = await asyncio.to_thread(_render_and_parse_yaml)
-        
-        logs = [f"Memulai konfigurasi untuk SN: {config_request.sn} di {iface_onu}"]
+        sn = config_request.sn
+        yield {"event": "start", "sn": sn, "interface": iface_onu, "commands": len(commands)}
         logging.info(f"🚀 Starting configuration loop. Total commands: {len(commands)}")
+        provision_started = time.perf_counter()
         
-        for cmd in commands:
-            logs.append(f"CMD > {cmd}")
+        for index, cmd in enumerate(commands, start=1):
             logging.info(f"➡️ Executing: {cmd}")
+            started = time.perf_counter()
             output = await self._execute_command(cmd)
-            if output:
-                logs.append(f"LOG < {output}")
+            yield {
+                "event": "command", "sn": sn, "index": index, "cmd": cmd,
+                "output": output, "seconds": round(time.perf_counter() - started, 3),
+            }
             await asyncio.sleep(0.3) 
+        provision_seconds = round(time.perf_counter() - provision_started, 3)
+
+        if verify:
+            report = await self.verify_configuration(commands, iface_onu)
+            logging.info(f"🔎 Verifikasi {sn}: {report['pass_count']} pass / {report['fail_count']} fail ({report['seconds']}s)")
+            yield {"event": "verify", "sn": sn, **report}
 
         summary = {
-            "Serial Number": config_request.sn,
+            "Serial Number": sn,
             "ID Pelanggan": config_request.customer.pppoe_user,
             "Nama Pelanggan": config_request.customer.name,
             "OLT dan ONU": iface_onu,
             "Profil yang dipakai": f"UP-{up_paket} / DOWN-{down_paket}"
         }
+        yield {"event": "summary", "sn": sn, "summary": summary, "seconds": provision_seconds}
+
+    async def apply_configuration(self, config_request: ConfigurationRequest, vlan: str, verify: bool = False):
+        logs, summary, verification = [], {}, None
+        async for event in self.stream_configuration(config_request, vlan, verify=verify):
+            if event["event"] == "start":
+                logs.append(f"Memulai konfigurasi untuk SN: {event['sn']} di {event['interface']}")
+            elif event["event"] == "command":
+                logs.append(f"CMD > {event['cmd']}")
+                if event["output"]:
+                    logs.append(f"LOG < {event['output']}")
+            elif event["event"] == "verify":
+                verification = event
+                for line in event["lines"]:
+                    logs.append(f"VERIFY {'PASS' if line['passed'] else 'FAIL'} > {line['line']}")
+            elif event["event"] == "summary":
+                summary = event["summary"]
+
+        if verification is not None:
+            summary["Verifikasi"] = verification
 
         logs.extend([
             "",
@@ -674,8 +957,8 @@ class TelnetClient:
             f"Serial Number         : {config_request.sn}",
             f"ID pelanggan          : {config_request.customer.pppoe_user}",
             f"Nama pelanggan        : {config_request.customer.name}",
-            f"OLT dan ONU           : {iface_onu}",
-            f"Profil yang dipakai   : UP-{up_paket} / DOWN-{down_paket}",
+            f"OLT dan ONU           : {summary['OLT dan ONU']}",
+            f"Profil yang dipakai   : {summary['Profil yang dipakai']}",
             "========================================================="
         ])
 
@@ -695,13 +978,12 @@ class TelnetClient:
         onu_id = await self.find_next_available_onu_id(base_iface)
         package = PACKAGE_OPTIONS[config_bridge_request.package]
         olt_profile_type = "F670" if config_bridge_request.modem_type == "ZTEG-F670" else "ALL"
-        vlan = vlan(config_bridge_request.vlan)
 
         iface_onu = f"{'gpon_onu-1' if self.is_c600 else 'gpon-onu_1'}/{target_ont.pon_slot}/{target_ont.pon_port}:{onu_id}"
         if self.is_c600:
             iface_onu = f"gpon_onu-1/{target_ont.pon_port}/{target_ont.pon_slot}:{onu_id}"
         
-            context = { 
+        context = { 
             "interface_olt": base_iface, 
             "interface_onu": iface_onu, 
             "pon_slot": target_ont.pon_slot, 
@@ -714,15 +996,7 @@ class TelnetClient:
             "jenismodem": olt_profile_type,
         }
             
-        template_name = "config_bridge.yaml"
-        
-        def _render_and_parse_yaml():
-            if jinja_env is None:
-                raise RuntimeError("Jinja2 environment not loaded!")
-            template = jinja_env(template_name)
-            rendered = template.render(context)
-
-        commands = await asyncio.to_thread(_render_and_parse_yaml)
+        commands = template_registry.render("bridge", context)
         logs = [f"Memulai konfigurasi untuk SN: {config_bridge_request.sn} di {iface_onu}"]
         logging.info(f"Memulai konfigurasi. Total Command: {len(commands)}")
 
@@ -737,7 +1011,7 @@ class TelnetClient:
         summary = {
             "Serial Number": config_bridge_request.sn,
             "ID Pelanggan": config_bridge_request.customer.pppoe_user,
-            "Nama Pelanggan": config_bridge_request.customer,
+            "Nama Pelanggan": config_bridge_request.customer.name,
             "OLT dan ONU": iface_onu,
             "Profil yang dipakai": config_bridge_request.package
         }
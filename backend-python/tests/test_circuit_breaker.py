@@ -0,0 +1,139 @@
+import asyncio
+import time
+
+import pytest
+
+from core.config import settings
+from services.connection_manager import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError, ConnectionManager
+from services.telnet import TelnetClient
+
+
+@pytest.fixture(autouse=True)
+def breaker_settings(monkeypatch):
+    monkeypatch.setattr(settings, "OLT_BREAKER_FAILURE_THRESHOLD", 3)
+    monkeypatch.setattr(settings, "OLT_BREAKER_BACKOFF_SECONDS", 5.0)
+    monkeypatch.setattr(settings, "OLT_BREAKER_MAX_BACKOFF_SECONDS", 20.0)
+
+
+def trip(breaker: CircuitBreaker) -> None:
+    for _ in range(settings.OLT_BREAKER_FAILURE_THRESHOLD):
+        breaker.before_connect()
+        breaker.record_failure(ConnectionError("timeout"))
+
+
+def expire(breaker: CircuitBreaker) -> None:
+    breaker.retry_at = time.monotonic() - 1
+
+
+def test_stays_closed_below_threshold():
+    breaker = CircuitBreaker("10.0.0.1")
+    breaker.record_failure(ConnectionError("timeout"))
+    breaker.record_failure(ConnectionError("timeout"))
+    assert breaker.state == CLOSED
+    breaker.before_connect()
+
+
+def test_success_resets_failure_count():
+    breaker = CircuitBreaker("10.0.0.1")
+    breaker.record_failure(ConnectionError("timeout"))
+    breaker.record_failure(ConnectionError("timeout"))
+    breaker.record_success()
+    breaker.record_failure(ConnectionError("timeout"))
+    assert breaker.state == CLOSED
+    assert breaker.failures == 1
+
+
+def test_opens_at_threshold_and_fails_fast():
+    breaker = CircuitBreaker("10.0.0.1")
+    trip(breaker)
+    assert breaker.state == OPEN
+    assert breaker.status()["retry_after"] == 5
+    with pytest.raises(CircuitOpenError) as exc:
+        breaker.before_connect()
+    assert exc.value.retry_after == 5
+    assert "timeout" in str(exc.value)
+
+
+def test_single_probe_after_backoff():
+    breaker = CircuitBreaker("10.0.0.1")
+    trip(breaker)
+    expire(breaker)
+    breaker.before_connect()
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_connect()
+
+
+def test_successful_probe_closes():
+    breaker = CircuitBreaker("10.0.0.1")
+    trip(breaker)
+    expire(breaker)
+    breaker.before_connect()
+    breaker.record_success()
+    assert breaker.status() == {
+        "state": CLOSED, "failures": 0, "trips": 0, "opened_at": None, "retry_after": 0, "last_error": None,
+    }
+
+
+def test_failed_probe_reopens_with_doubled_backoff_up_to_max():
+    breaker = CircuitBreaker("10.0.0.1")
+    trip(breaker)
+    backoffs = [breaker.backoff()]
+    for _ in range(3):
+        expire(breaker)
+        breaker.before_connect()
+        breaker.record_failure(ConnectionError("refused"))
+        assert breaker.state == OPEN
+        backoffs.append(breaker.backoff())
+    assert backoffs == [5.0, 10.0, 20.0, 20.0]
+
+
+def test_aborted_probe_lets_next_caller_probe():
+    breaker = CircuitBreaker("10.0.0.1")
+    trip(breaker)
+    expire(breaker)
+    breaker.before_connect()
+    breaker.abort_probe()
+    assert breaker.state == OPEN
+    breaker.before_connect()
+    assert breaker.state == HALF_OPEN
+
+
+def test_check_does_not_claim_the_probe():
+    breaker = CircuitBreaker("10.0.0.1")
+    trip(breaker)
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+    expire(breaker)
+    breaker.check()
+    assert breaker.state == OPEN
+    breaker.before_connect()
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+
+def test_callers_fail_fast_while_a_probe_connects(monkeypatch):
+    async def hang(self):
+        await asyncio.Event().wait()
+
+    monkeypatch.setattr(TelnetClient, "connect", hang)
+
+    async def run():
+        manager = ConnectionManager()
+        trip(manager.breaker("10.0.0.1"))
+        expire(manager.breaker("10.0.0.1"))
+        probe = asyncio.create_task(manager.get_connection("10.0.0.1", "user", "pass", False))
+        await asyncio.sleep(0)
+        assert manager.breaker("10.0.0.1").state == HALF_OPEN
+        try:
+            # Without the check before the connect lock this would wait for the probe
+            with pytest.raises(CircuitOpenError):
+                await asyncio.wait_for(manager.get_connection("10.0.0.1", "user", "pass", False), timeout=1)
+        finally:
+            probe.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await probe
+        return manager.breaker("10.0.0.1").state
+
+    assert asyncio.run(run()) == OPEN
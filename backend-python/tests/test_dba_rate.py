@@ -0,0 +1,46 @@
+import asyncio
+
+import pytest
+
+from services.telnet import TelnetClient
+
+C300_OUTPUT = """Interface          Channel  Config(kbps)  Free(kbps)  Rate(%)
+-------------------------------------------------------------------
+gpon-olt_1/2/10    1        1244160       24883       98.0
+gpon-olt_1/2/1     1        1244160       257527      79.3"""
+
+C600_OUTPUT = """Interface          Channel  Config(kbps)  Free(kbps)  Type   Rate(%)
+-------------------------------------------------------------------------
+gpon_olt-1/3/1     1        2488320       2488320     XG     0
+gpon_olt-1/3/2     1        2488320       1194393     XG     52.0"""
+
+
+@pytest.mark.parametrize("output, interface, is_c600, expected", [
+    (C300_OUTPUT, "gpon-olt_1/2/1", False, 79.3),
+    (C300_OUTPUT, "gpon-olt_1/2/10", False, 98.0),
+    (C600_OUTPUT, "gpon_olt-1/3/1", True, 0.0),
+    (C600_OUTPUT, "gpon_olt-1/3/2", True, 52.0),
+])
+def test_parse_dba_rate(output, interface, is_c600, expected):
+    assert TelnetClient._parse_dba_rate(output, interface, is_c600) == expected
+
+
+@pytest.mark.parametrize("output, interface", [
+    (C300_OUTPUT, "gpon-olt_1/2/3"),
+    ("%Code 32310-GPONSRV : Invalid interface.", "gpon-olt_1/2/1"),
+    ("", "gpon-olt_1/2/1"),
+])
+def test_parse_dba_rate_unparseable(output, interface):
+    assert TelnetClient._parse_dba_rate(output, interface, is_c600=False) is None
+
+
+def test_get_dba_rate_defaults_to_zero():
+    client = TelnetClient("10.0.0.1", "user", "pass", is_c600=False)
+
+    async def execute(command, timeout=20, retry=True):
+        assert command == "show pon bandwidth dba interface gpon-olt_1/2/3"
+        return C300_OUTPUT
+
+    client._execute_command = execute
+    assert asyncio.run(client.read_dba_rate("gpon-olt_1/2/3")) is None
+    assert asyncio.run(client.get_dba_rate("gpon-olt_1/2/3")) == 0.0
@@ -0,0 +1,139 @@
+import io
+
+import pandas as pd
+import pytest
+
+from services import exceltopostgress
+from services.exceltopostgress import ExcelHandler
+
+from test_excel_records import HEADER, workbook
+
+FIELDS = ExcelHandler.COLUMNS
+
+
+class FakeCursor:
+    """Answers the diff SELECT from an in-memory table; every other statement is a no-op."""
+
+    def __init__(self, table):
+        self.table = table
+        self.result = []
+
+    def execute(self, sql, params=None):
+        self.result = []
+        if sql.startswith("SELECT user_pppoe, sheet,"):
+            columns = [c.strip() for c in sql.split("FROM")[0][len("SELECT "):].split(",")]
+            self.result = [
+                tuple(row[FIELDS.index(c)] for c in columns)
+                for pppoe, row in self.table.items() if pppoe in params[0]
+            ]
+
+    def fetchall(self):
+        return self.result
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, table):
+        self.table = table
+
+    def cursor(self):
+        return FakeCursor(self.table)
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def stored(pppoe, name, sheet, olt_port):
+    values = {
+        "user_pppoe": pppoe, "name": name, "alamat": "Jl. Mawar 1", "olt_name": "BEJI", "olt_port": olt_port,
+        "onu_sn": None, "pppoe_password": None, "interface": None, "onu_id": None, "sheet": sheet,
+        "paket": "10M", "updated_at": None,
+    }
+    return tuple(values[c] for c in FIELDS)
+
+
+def sheet(*customers):
+    return [HEADER, *([str(i), name, pppoe, "Jl. Mawar 1", "", "", "", "10M"] for i, (pppoe, name) in enumerate(customers, 1))]
+
+
+@pytest.fixture
+def db(monkeypatch):
+    table = {}
+    written = []
+
+    def upsert_rows(cur, rows):
+        written.extend(rows)
+        table.update((row[0], row) for row in rows)
+
+    monkeypatch.setattr(exceltopostgress, "SHEET_WORKERS", 1)
+    monkeypatch.setattr(exceltopostgress.psycopg2, "connect", lambda **kw: FakeConnection(table))
+    monkeypatch.setattr(ExcelHandler, "upsert_rows", staticmethod(upsert_rows))
+    monkeypatch.setattr(ExcelHandler, "save_sheet_hashes", staticmethod(lambda cur, reports: None))
+    monkeypatch.setattr(ExcelHandler, "load_sheet_hashes", staticmethod(lambda cur: {}))
+    return table, written
+
+
+def test_later_sheet_wins_over_changed_earlier_duplicate(db):
+    table, written = db
+    table["1120001"] = stored("1120001", "Budi", "BEJI 1.2", "1.2")
+    data = workbook({"BEJI 1.1": sheet(("1120001", "Budi Baru"), ("1120002", "Sari")), "BEJI 1.2": sheet(("1120001", "Budi"))})
+
+    result = ExcelHandler.process_file(io.BytesIO(data))
+
+    assert [row[0] for row in written] == ["1120002"]
+    assert table["1120001"][FIELDS.index("name")] == "Budi"
+    assert (result["changes"]["rows_changed"], result["changes"]["rows_unchanged"]) == (1, 1)
+
+
+def test_later_sheet_skipped_by_hash_still_wins(db, monkeypatch):
+    table, written = db
+    table["1120001"] = stored("1120001", "Budi", "BEJI 1.2", "1.2")
+    data = workbook({"BEJI 1.1": sheet(("1120001", "Budi Baru")), "BEJI 1.2": sheet(("1120001", "Budi"))})
+    later_hash = ExcelHandler.parse_sheet_report(pd.ExcelFile(io.BytesIO(data)), "BEJI 1.2")["content_hash"]
+    monkeypatch.setattr(ExcelHandler, "load_sheet_hashes", staticmethod(lambda cur: {"BEJI 1.2": later_hash}))
+
+    result = ExcelHandler.process_file(io.BytesIO(data))
+
+    assert result["sheets_skipped"] == 1
+    assert written == []
+    assert table["1120001"][FIELDS.index("name")] == "Budi"
+
+
+def test_earlier_sheet_skipped_by_hash_loses(db, monkeypatch):
+    table, written = db
+    table["1120001"] = stored("1120001", "Budi", "BEJI 1.1", "1.1")
+    data = workbook({"BEJI 1.1": sheet(("1120001", "Budi")), "BEJI 1.2": sheet(("1120001", "Budi"))})
+    earlier_hash = ExcelHandler.parse_sheet_report(pd.ExcelFile(io.BytesIO(data)), "BEJI 1.1")["content_hash"]
+    monkeypatch.setattr(ExcelHandler, "load_sheet_hashes", staticmethod(lambda cur: {"BEJI 1.1": earlier_hash}))
+
+    ExcelHandler.process_file(io.BytesIO(data))
+
+    assert [(row[0], row[FIELDS.index("olt_port")]) for row in written] == [("1120001", "1.2")]
+
+
+def test_bulk_counts_match_the_change_summary(db, monkeypatch):
+    table, written = db
+    staged = []
+
+    def merge_staging(cur):
+        inserted = sum(1 for row in staged if row[0] not in table)
+        table.update((row[0], row) for row in staged)
+        return {"inserted": inserted, "updated": len(staged) - inserted, "unchanged": 0}
+
+    monkeypatch.setattr(ExcelHandler, "init_staging", classmethod(lambda cls, cur: None))
+    monkeypatch.setattr(ExcelHandler, "copy_rows", classmethod(lambda cls, cur, rows: staged.extend(rows)))
+    monkeypatch.setattr(ExcelHandler, "merge_staging", classmethod(lambda cls, cur: merge_staging(cur)))
+    table["1120001"] = stored("1120001", "Budi", "BEJI 1.1", "1.1")
+    table["1120003"] = stored("1120003", "Rina", "BEJI 1.1", "1.1")
+    data = workbook({"BEJI 1.1": sheet(("1120001", "Budi"), ("1120002", "Sari"), ("1120003", "Rina Baru"))})
+
+    result = ExcelHandler.process_file(io.BytesIO(data), bulk=True)
+
+    assert (result["inserted"], result["updated"], result["unchanged"]) == (1, 1, 1)
+    assert result["unchanged"] == result["changes"]["rows_unchanged"]
+    assert result["inserted"] + result["updated"] == result["changes"]["rows_changed"]
@@ -0,0 +1,97 @@
+import io
+
+import openpyxl
+import pandas as pd
+import pytest
+
+from services.exceltopostgress import ExcelHandler
+
+HEADER = ["No", "Nama", "User PPPoE", "Alamat", "Port ONU", "SN", "Password", "Paket"]
+ROWS = [
+    ["1", "Budi", "1120001", "Jl. Mawar 1", "1/1/1:5", "zteg1234abcd", "pw1", "10M"],
+    ["", "", "", "", "", "", "", ""],
+    ["2", "Sari", "1120002", "Jl. Melati 2", "", "", "", "20M"],
+]
+
+
+def raw_sheet(rows=ROWS, header=HEADER):
+    # Title rows above the header, as in the field workbooks
+    return pd.DataFrame([["DATA PELANGGAN"] + [None] * 7, [None] * 8, header, *rows], dtype=object)
+
+
+def workbook(sheets: dict) -> bytes:
+    wb = openpyxl.Workbook()
+    wb.remove(wb.active)
+    for name, rows in sheets.items():
+        ws = wb.create_sheet(name)
+        for row in rows:
+            ws.append(row)
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+@pytest.mark.parametrize("sheet, expected", [
+    ("BEJI 1.1", ("BEJI", "1.1")),
+    ("BEJI PORT 2.3", ("BEJI", "2.3")),
+    ("DURENAN", ("DURENAN", None)),
+    ("TOTAL", (None, None)),
+    ("Summary", (None, None)),
+])
+def test_parse_sheet_name(sheet, expected):
+    assert ExcelHandler.parse_sheet_name(sheet) == expected
+
+
+def test_norm_cols_deduplicates_like_pandas():
+    assert ExcelHandler.norm_cols([" Nama ", "SN", None, "sn", "SN"]) == ["nama", "sn", "", "sn.1", "sn.2"]
+
+
+def test_find_header_row():
+    assert ExcelHandler.find_header_row(raw_sheet()) == 2
+    assert ExcelHandler.find_header_row(pd.DataFrame([["a", "b"], ["c", "d"]])) == -1
+
+
+def test_columns_from_raw_builds_records():
+    warnings = []
+    columns = ExcelHandler.columns_from_raw(raw_sheet(), "BEJI 1.1", warnings)
+    records = [dict(zip(ExcelHandler.COLUMNS, row)) for row in zip(*columns)]
+    assert warnings == []
+    assert len(columns) == len(ExcelHandler.COLUMNS)
+    assert len(records) == 2  # the blank row is dropped
+
+    budi, sari = records
+    assert {k: v for k, v in budi.items() if k != "updated_at"} == {
+        "user_pppoe": "1120001", "name": "Budi", "alamat": "Jl. Mawar 1", "olt_name": "BEJI",
+        "olt_port": "1/1/1", "onu_sn": "ZTEG1234ABCD", "pppoe_password": "pw1",
+        "interface": "1/1/1:5", "onu_id": "5", "sheet": "BEJI 1.1", "paket": "10M",
+    }
+    # No ONU port: the port comes from the sheet name and blanks become NULL
+    assert (sari["olt_port"], sari["onu_id"], sari["interface"], sari["onu_sn"], sari["pppoe_password"]) == (
+        "1.1", None, None, None, None,
+    )
+
+
+def test_columns_from_raw_skips_sheets_without_required_columns():
+    warnings = []
+    header = ["No", "Nama", "Alamat PPPoE", "SN", "", "", "", ""]
+    assert ExcelHandler.columns_from_raw(raw_sheet(header=header), "BEJI 1.1", warnings) == []
+    assert warnings == ["Missing name/pppoe/alamat columns in 'BEJI 1.1'. Skipping."]
+
+
+def test_workbook_sheets_and_reports():
+    rows = [["DATA PELANGGAN"], [], HEADER, *ROWS]
+    data = workbook({"TOTAL": [["x"]], "BEJI 1.1": rows, "BEJI 1.2": [["no header here"]]})
+    assert ExcelHandler.sheet_names(data) == ["TOTAL", "BEJI 1.1", "BEJI 1.2"]
+
+    xl = pd.ExcelFile(io.BytesIO(data))
+    assert ExcelHandler.records_from_sheet(xl, "TOTAL") == []
+    assert [r[0] for r in ExcelHandler.records_from_sheet(xl, "BEJI 1.1")] == ["1120001", "1120002"]
+
+    report = ExcelHandler.parse_sheet_report(xl, "BEJI 1.1")
+    assert (report["rows"], report["unchanged"], report["warnings"]) == (2, False, [])
+    again = ExcelHandler.parse_sheet_report(xl, "BEJI 1.1", known_hash=report["content_hash"])
+    assert (again["unchanged"], again["columns"]) == (True, [])
+
+    missing = ExcelHandler.parse_sheet_report(xl, "BEJI 1.2")
+    assert missing["rows"] == 0
+    assert missing["warnings"] == ["Could not find valid header in 'BEJI 1.2'. Skipping."]
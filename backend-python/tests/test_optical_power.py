@@ -0,0 +1,40 @@
+import asyncio
+
+import pytest
+
+from services import optical_power
+from services.connection_manager import CircuitOpenError
+from services.optical_power import RxPowerCollector
+
+OLT = "BOYOLANGU"
+
+
+class FakeReader:
+    def __init__(self, manager, olt_name):
+        self.failures = manager
+
+    async def onu_rx(self, port):
+        if port in self.failures:
+            raise self.failures[port]
+        return [(f"gpon-onu_{port}:1", -20.5), (f"gpon-onu_{port}:2", -21.0)]
+
+
+def collect(monkeypatch, failures, ports):
+    monkeypatch.setattr(optical_power, "OltReader", FakeReader)
+    collector = RxPowerCollector()
+    count = asyncio.run(collector._collect_olt(failures, OLT, ports))
+    return collector, count
+
+
+def test_failing_port_does_not_abort_the_olt(monkeypatch):
+    collector, count = collect(monkeypatch, {"1/1/2": TimeoutError("no prompt")}, ["1/1/1", "1/1/2", "1/1/3"])
+
+    assert count == 4
+    assert [iface for _, iface in collector.store.keys] == [
+        "gpon-onu_1/1/1:1", "gpon-onu_1/1/1:2", "gpon-onu_1/1/3:1", "gpon-onu_1/1/3:2",
+    ]
+
+
+def test_open_breaker_still_aborts_the_olt(monkeypatch):
+    with pytest.raises(CircuitOpenError):
+        collect(monkeypatch, {"1/1/2": CircuitOpenError(OLT, 30)}, ["1/1/1", "1/1/2", "1/1/3"])
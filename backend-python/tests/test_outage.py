@@ -0,0 +1,134 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+
+from core.config import settings
+from services.outage import DYING_GASP, LOS, OFFLINE, OutageEngine, classify_offline_cause, classify_phase
+from services.rate_limit import CHEAP_SHOW
+
+OLT = "BOYOLANGU"
+PORT = "1/1/1"
+
+
+@pytest.fixture(autouse=True)
+def outage_settings(monkeypatch):
+    monkeypatch.setattr(settings, "OUTAGE_MIN_ONUS", 4)
+    monkeypatch.setattr(settings, "OUTAGE_MIN_FRACTION", 0.5)
+    monkeypatch.setattr(settings, "OUTAGE_RECOVERY_FRACTION", 0.8)
+    monkeypatch.setattr(settings, "OUTAGE_CAUSE_SAMPLES", 2)
+
+
+class FakeClient:
+    def __init__(self, causes):
+        self.causes = causes
+        self.commands = []
+        self.classes = []
+
+    @asynccontextmanager
+    async def session(self, command_class):
+        self.classes.append(command_class)
+        yield self
+
+    async def _execute_command(self, command, timeout=20, retry=True):
+        self.commands.append(command)
+        cause = self.causes[command.rsplit(":", 1)[1]]
+        return (
+            "AuthpassTime          OfflineTime           Cause\n"
+            f"   1   2026-10-01 08:00:00 2026-10-02 09:00:00    {cause}"
+        )
+
+
+class FakeReader:
+    def __init__(self, causes=None):
+        self.client = FakeClient(causes or {})
+
+    async def telnet(self):
+        return self.client
+
+
+def ports(phases):
+    return {f"{PORT}:{i}": phase for i, phase in enumerate(phases, 1)}
+
+
+def test_classify_phase():
+    assert classify_phase("working") is None
+    assert classify_phase("LOS") == LOS
+    assert classify_phase("DyingGasp") == DYING_GASP
+    assert classify_phase("OffLine") == OFFLINE
+
+
+def test_classify_offline_cause_uses_newest_row():
+    output = (
+        "   1   2026-10-01 08:00:00 2026-10-01 09:00:00    LOS\n"
+        "   2   2026-10-02 08:00:00 2026-10-02 09:00:00    DyingGasp\n"
+    )
+    assert classify_offline_cause(output) == DYING_GASP
+    assert classify_offline_cause("no log rows") == OFFLINE
+
+
+def test_went_down_only_counts_working_to_down():
+    previous = {"1/1/1:1": "working", "1/1/1:2": "LOS", "1/1/1:3": "working"}
+    current = {"1/1/1:1": "LOS", "1/1/1:2": "LOS", "1/1/1:3": "working", "1/1/1:4": "DyingGasp"}
+    assert OutageEngine.went_down(previous, current) == {"1/1/1:1": LOS}
+
+
+@pytest.mark.parametrize("dropped, previously_up, expected", [
+    (4, 100, True),
+    (3, 6, True),
+    (3, 7, False),
+    (1, 1, False),
+])
+def test_is_mass_outage(dropped, previously_up, expected):
+    assert OutageEngine.is_mass_outage(dropped, previously_up) is expected
+
+
+def test_first_snapshot_and_single_drop_open_nothing():
+    engine = OutageEngine()
+    reader = FakeReader()
+    assert asyncio.run(engine.apply_snapshot(reader, OLT, PORT, ports(["working"] * 10))) is None
+    assert asyncio.run(engine.apply_snapshot(reader, OLT, PORT, ports(["LOS"] + ["working"] * 9))) is None
+    assert engine.incidents == {}
+
+
+def test_mass_drop_opens_extends_and_resolves_incident():
+    engine = OutageEngine()
+    reader = FakeReader()
+
+    async def run():
+        await engine.apply_snapshot(reader, OLT, PORT, ports(["working"] * 10))
+        incident = await engine.apply_snapshot(reader, OLT, PORT, ports(["LOS"] * 4 + ["working"] * 6))
+        assert incident["status"] == "open"
+        assert incident["cause"] == LOS
+        assert incident["previously_up"] == 10
+        assert engine.incident_for(OLT, "gpon-onu_1/1/1:2") is incident
+        assert engine.incident_for(OLT, "gpon-onu_1/1/1:9") is None
+
+        # One more ONU drops while the incident is open: it joins the incident
+        extended = await engine.apply_snapshot(reader, OLT, PORT, ports(["LOS"] * 4 + ["DyingGasp"] + ["working"] * 5))
+        assert extended is incident
+        assert incident["counts"] == {LOS: 4, DYING_GASP: 1}
+        assert incident["cause"] == "mixed"
+
+        await engine.apply_snapshot(reader, OLT, PORT, ports(["working"] * 10))
+        return incident
+
+    incident = asyncio.run(run())
+    assert incident["status"] == "resolved"
+    assert all(entry["up"] for entry in incident["affected"].values())
+    assert engine.incident_for(OLT, "1/1/1:2") is None
+    assert engine.list_incidents("resolved") == [incident]
+
+
+def test_offline_causes_are_sampled():
+    engine = OutageEngine()
+    reader = FakeReader({"1": "DyingGasp", "2": "DyingGasp", "3": "LOS"})
+
+    async def run():
+        await engine.apply_snapshot(reader, OLT, PORT, ports(["working"] * 6))
+        return await engine.apply_snapshot(reader, OLT, PORT, ports(["OffLine"] * 5 + ["working"]))
+
+    incident = asyncio.run(run())
+    assert reader.client.commands == ["show gpon onu detail-info gpon-onu_1/1/1:1", "show gpon onu detail-info gpon-onu_1/1/1:2"]
+    assert incident["counts"] == {DYING_GASP: 5}
+    assert reader.client.classes == [CHEAP_SHOW, CHEAP_SHOW]
@@ -0,0 +1,92 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+
+from services import pon_survey
+from services.pon_survey import DbaSurvey, parse_pon_ports
+from services.rate_limit import EXPENSIVE_SHOW, OltBusyError
+
+C300_CARDS = """Rack Shelf Slot CfgType RealType Port  HardVer SoftVer         Status
+-------------------------------------------------------------------------------
+1    1     1    GTGOG   GTGOG    8     V1.2.0  V2.1.0          INSERVICE
+1    1     2    GTGHK   GTGHK    16    V1.0.0  V2.1.0          INSERVICE
+1    1     3    GTGOG            8                             OFFLINE
+1    1     10   SCXN    SCXN     4     V1.0.0  V2.1.0          INSERVICE
+1    1     19   PRWG    PRWG     0     V1.0.0                  INSERVICE"""
+
+C600_CARDS = """Rack Shelf Slot CfgType  RealType Port HardVer   SoftVer  Status
+------------------------------------------------------------------------------
+1    1     3    GFGH     GFGH     16   V1.0.0    V1.2.1   INSERVICE
+1    1     5    GFGM     GFGM     8    V1.0.0    V1.2.1   CONFIGING"""
+
+
+def test_parse_pon_ports_c300():
+    ports = parse_pon_ports(C300_CARDS)
+    assert ports[:8] == [f"1/1/{n}" for n in range(1, 9)]
+    assert ports[8:] == [f"1/2/{n}" for n in range(1, 17)]
+
+
+def test_parse_pon_ports_c600():
+    assert parse_pon_ports(C600_CARDS) == [f"1/3/{n}" for n in range(1, 17)]
+
+
+class FakeClient:
+    def __init__(self, busy=()):
+        self.busy = set(busy)
+        self.classes = []
+
+    @asynccontextmanager
+    async def session(self, command_class):
+        self.classes.append(command_class)
+        yield self
+
+    async def _execute_command(self, command, timeout=20, retry=True):
+        assert command == "show card"
+        return "1    1     2    GTGOG   GTGOG    2     V1.0.0  V2.1.0          INSERVICE"
+
+    async def read_dba_rate(self, interface):
+        if interface in self.busy:
+            raise OltBusyError("10.0.0.1", EXPENSIVE_SHOW, 2)
+        return {"gpon-olt_1/2/1": 12.5, "gpon-olt_1/2/2": 70.0}.get(interface)
+
+
+@pytest.fixture
+def survey(monkeypatch):
+    survey = DbaSurvey()
+    client = FakeClient()
+
+    async def pooled(olt_name):
+        return client
+
+    monkeypatch.setattr(survey, "_client", pooled)
+    monkeypatch.setattr(pon_survey, "OLT_OPTIONS", {"BEJI": {"ip": "10.0.0.1", "c600": False}})
+    return survey, client
+
+
+def test_survey_walks_every_port_of_the_olt(survey):
+    survey, client = survey
+
+    async def run():
+        job_id = survey.start({"BEJI": None})
+        while survey.get(job_id)["finished_at"] is None:
+            await asyncio.sleep(0)
+        return survey.get(job_id)
+
+    job = asyncio.run(run())
+    assert job["olts"]["BEJI"] == {"status": "done", "ports": 2, "sampled": 2, "seconds": job["olts"]["BEJI"]["seconds"], "error": None}
+    ranked = survey.ranked("BEJI")["BEJI"]
+    assert [(r["interface"], r["rate"], r["customers"]) for r in ranked] == [
+        ("gpon-olt_1/2/2", 70.0, 0), ("gpon-olt_1/2/1", 12.5, 0),
+    ]
+
+
+def test_survey_annotates_customers_and_skips_busy_ports(survey):
+    survey, client = survey
+    client.busy = {"gpon-olt_1/2/2"}
+
+    results = asyncio.run(survey.survey_olt("BEJI", ["1/2/1", "1/2/2", "1/2/3"], {"1/2/1": 31}))
+
+    assert results == [{"interface": "gpon-olt_1/2/1", "rate": 12.5}]
+    assert survey.ranked("BEJI")["BEJI"][0]["customers"] == 31
+    assert client.classes == [EXPENSIVE_SHOW] * 3
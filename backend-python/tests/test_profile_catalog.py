@@ -0,0 +1,40 @@
+from services.profile_catalog import parse_profile_names, parse_vlans
+
+TCONT_OUTPUT = """
+Profile name :UP-10M
+  Type  FBW(kbps)  ABW(kbps)  MBW(kbps)
+  4     0          0          10240
+Profile name : UP-20M
+  Type  FBW(kbps)  ABW(kbps)  MBW(kbps)
+  4     0          0          20480
+"""
+
+QOS_OUTPUT = """
+traffic-policy 10M-DOWN
+  cir 10240 pir 10240
+TRAFFIC-POLICY 20M-DOWN
+  cir 20480 pir 20480
+"""
+
+VLAN_OUTPUT = """
+The Number of VLANs: 5
+  -----------------------------------
+  100-102,200
+"""
+
+
+def test_profile_names_from_name_lines_and_traffic_policies():
+    assert parse_profile_names(TCONT_OUTPUT) == {"UP-10M", "UP-20M"}
+    assert parse_profile_names(QOS_OUTPUT) == {"10M-DOWN", "20M-DOWN"}
+
+
+def test_profile_names_ignore_other_lines():
+    assert parse_profile_names("  Type  FBW(kbps)\n  4     0\n") == set()
+
+
+def test_vlan_ranges_are_expanded():
+    assert parse_vlans(VLAN_OUTPUT) == {100, 101, 102, 200}
+
+
+def test_vlan_lists_span_lines_and_skip_text():
+    assert parse_vlans("1,901-903\n905\nTotal: 5 VLANs\n") == {1, 901, 902, 903, 905}
@@ -0,0 +1,110 @@
+import asyncio
+
+import pytest
+
+from core.config import settings
+from services.rate_limit import (
+    CHEAP_SHOW, CONFIG, EXPENSIVE_SHOW, CommandLimiter, OltBusyError, TokenBucket, command_class, is_idempotent,
+)
+from services.telnet import TelnetClient
+
+
+@pytest.fixture(autouse=True)
+def limiter_settings(monkeypatch):
+    monkeypatch.setattr(settings, "OLT_COMMAND_RATES", {"c300": {"show": 100.0, "show_heavy": 50.0}})
+    monkeypatch.setattr(settings, "OLT_COMMAND_BURST_SECONDS", 0.02)
+    monkeypatch.setattr(settings, "OLT_COMMAND_MAX_QUEUE", 2)
+
+
+def test_command_class():
+    assert is_idempotent("  SHOW gpon onu state gpon-olt_1/1/1")
+    assert not is_idempotent("interface gpon-onu_1/1/1:1")
+    assert command_class("show gpon onu state gpon-olt_1/1/1") == CHEAP_SHOW
+    assert command_class("show pon bandwidth dba interface gpon-olt_1/1/1") == EXPENSIVE_SHOW
+    assert command_class("configure terminal") == CONFIG
+
+
+def test_unlimited_class_has_no_bucket():
+    limiter = CommandLimiter()
+    assert limiter.bucket("10.0.0.1", False, CONFIG) is None
+    assert limiter.bucket("10.0.0.1", True, CHEAP_SHOW) is None
+    assert limiter.bucket("10.0.0.1", False, CHEAP_SHOW).burst == 2.0
+
+
+def test_burst_then_waits_then_rejects():
+    async def run():
+        bucket = TokenBucket(rate=100.0, burst=2.0, max_queue=2)
+        await bucket.acquire("h", CHEAP_SHOW)
+        await bucket.acquire("h", CHEAP_SHOW)
+        waiters = [asyncio.create_task(bucket.acquire("h", CHEAP_SHOW)) for _ in range(2)]
+        await asyncio.sleep(0)
+        assert bucket.waiting == 2
+        with pytest.raises(OltBusyError) as exc:
+            await bucket.acquire("h", CHEAP_SHOW)
+        assert exc.value.retry_after == 1
+        await bucket.acquire("h", CONFIG, reject=False)  # inside a config sequence: waits, never rejected
+        await asyncio.gather(*waiters)
+        return bucket
+
+    bucket = asyncio.run(run())
+    assert (bucket.admitted, bucket.rejected, bucket.waiting) == (5, 1, 0)
+
+
+def test_cancelled_waiter_returns_its_token():
+    async def run():
+        bucket = TokenBucket(rate=1.0, burst=1.0, max_queue=2)
+        await bucket.acquire("h", CHEAP_SHOW)
+        waiter = asyncio.create_task(bucket.acquire("h", CHEAP_SHOW))
+        await asyncio.sleep(0)
+        assert bucket.tokens == pytest.approx(-1, abs=0.01)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        return bucket
+
+    bucket = asyncio.run(run())
+    assert bucket.tokens == pytest.approx(0, abs=0.01)
+    assert bucket.waiting == 0
+
+
+def test_queued_callers_count_against_the_queue():
+    async def run():
+        limiter = CommandLimiter()
+        async with limiter.queued("10.0.0.1", False, EXPENSIVE_SHOW):
+            async with limiter.queued("10.0.0.1", False, EXPENSIVE_SHOW):
+                bucket = limiter.bucket("10.0.0.1", False, EXPENSIVE_SHOW)
+                assert bucket.queued == 2
+                with pytest.raises(OltBusyError):
+                    async with limiter.queued("10.0.0.1", False, EXPENSIVE_SHOW):
+                        pass
+        assert bucket.queued == 0
+        async with limiter.queued("10.0.0.1", False, CONFIG):  # not limited
+            pass
+        return limiter.status()
+
+    status = asyncio.run(run())
+    assert status["10.0.0.1"][EXPENSIVE_SHOW]["rejected"] == 1
+    assert status["10.0.0.1"][EXPENSIVE_SHOW]["queued"] == 0
+
+
+def test_session_rejects_once_the_lock_queue_is_full(monkeypatch):
+    monkeypatch.setattr("services.telnet.command_limiter", CommandLimiter())
+
+    async def run():
+        client = TelnetClient("10.0.0.1", "user", "pass", is_c600=False)
+        order = []
+
+        async def request(name):
+            async with client.session(CHEAP_SHOW):
+                order.append(name)
+
+        async with client.session(CHEAP_SHOW):
+            waiters = [asyncio.create_task(request(name)) for name in ("a", "b")]
+            await asyncio.sleep(0)
+            with pytest.raises(OltBusyError):
+                await request("c")
+        await asyncio.gather(*waiters)
+        assert not client.lock.locked()
+        return order
+
+    assert asyncio.run(run()) == ["a", "b"]
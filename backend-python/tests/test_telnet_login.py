@@ -0,0 +1,44 @@
+import asyncio
+
+import pytest
+
+from services.telnet import TelnetClient
+
+
+class SilentReader:
+    async def readuntil(self, separator):
+        await asyncio.sleep(1)
+
+
+class ClosedReader:
+    async def readuntil(self, separator):
+        raise asyncio.IncompleteReadError(b"", None)
+
+
+class FakeWriter:
+    def __init__(self):
+        self.closed = False
+
+    def write(self, data):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    async def wait_closed(self):
+        pass
+
+
+@pytest.mark.parametrize("reader, message", [
+    (SilentReader(), "Timeout during login to 10.0.0.1"),
+    (ClosedReader(), "Failed to login"),
+])
+def test_failed_login_closes_the_socket(reader, message):
+    client = TelnetClient("10.0.0.1", "user", "pass", is_c600=False)
+    writer = FakeWriter()
+    client.reader, client.writer = reader, writer
+
+    with pytest.raises(ConnectionError, match=message):
+        asyncio.run(client._login(timeout=0.01))
+    assert writer.closed
+    assert client.writer is None and client.reader is None
@@ -0,0 +1,49 @@
+from services.provisioning_templates import TemplateRegistry, template_registry
+from services.telnet import TelnetClient
+
+
+def render(model):
+    context = TemplateRegistry.sample_context()
+    return template_registry.render(model, context), context["interface_onu"]
+
+
+def test_bridge_vport_block_is_unchecked_not_read_back():
+    commands, interface_onu = render("bridge")
+
+    intent, unchecked = TelnetClient._verify_intent(commands, interface_onu)
+
+    assert intent["interface"] == [
+        "name SAMPLE NAME",
+        "description SAMPLE ADDRESS",
+        "tcont 1 name CIGNAL profile UP-10M",
+        "gemport 1 name CIGNAL tcont 1",
+    ]
+    assert intent["onu"] == [
+        "service CIGNAL gemport 1 vlan 900",
+        *(f"vlan port eth_0/{i} mode tag vlan 900" for i in range(1, 5)),
+    ]
+    # onu registration, service-port and qos lines live outside both blocks
+    assert unchecked == 3
+
+
+def test_interface_eth_lines_stay_in_the_onu_block():
+    commands = [
+        "configure terminal",
+        "interface gpon-onu_1/1/1:1",
+        "name SAMPLE",
+        "exit",
+        "pon-onu-mng gpon-onu_1/1/1:1",
+        "interface eth eth_0/1 state lock",
+        "interface eth eth_0/2 state unlock",
+        "exit",
+        "interface gpon-olt_1/1/2",
+        "onu 2 type ALL sn ZTEG00000001",
+    ]
+
+    intent, unchecked = TelnetClient._verify_intent(commands, "gpon-onu_1/1/1:1")
+
+    assert intent == {
+        "interface": ["name SAMPLE"],
+        "onu": ["interface eth eth_0/1 state lock", "interface eth eth_0/2 state unlock"],
+    }
+    assert unchecked == 1